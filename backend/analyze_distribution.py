@@ -1,8 +1,12 @@
-import pandas as pd
 import matplotlib.pyplot as plt
+from dataset import load_dataset
+from eda_report import grouped_statistics
+from rebalance import load_views, ratio_indices, save_indices
 
-# Load the processed dataset
-df = pd.read_csv('processed_diabetes.csv')
+REBALANCED_INDICES = 'processed_diabetes_rebalanced.npz'
+
+# Load the processed dataset (memory-mapped column bundle, converted on first use)
+df = load_dataset('processed_diabetes.csv')
 
 # Calculate the distribution
 total_cases = len(df)
@@ -19,15 +23,16 @@ print(f"Total cases: {total_cases}")
 print(f"Diabetes cases: {diabetes_cases} ({diabetes_percentage:.1f}%)")
 print(f"Non-diabetes cases: {non_diabetes_cases} ({non_diabetes_percentage:.1f}%)")
 
-# Print summary statistics for key features by outcome
+# Print summary statistics for key features by outcome (one grouped pass over all features)
 print("\nSummary Statistics by Diabetes Status:")
 key_features = ['Glucose', 'BloodPressure', 'SkinThickness', 'Insulin', 'BMI', 'Age']
+summary = grouped_statistics(df, features=key_features)
 for feature in key_features:
     print(f"\n{feature}:")
     print("Diabetes cases:")
-    print(df[df['Outcome'] == 1][feature].describe())
+    print(summary.loc[(1, feature)])
     print("\nNon-diabetes cases:")
-    print(df[df['Outcome'] == 0][feature].describe())
+    print(summary.loc[(0, feature)])
 
 # Create a pie chart
 plt.figure(figsize=(8, 6))
@@ -40,56 +45,11 @@ plt.title('Distribution of Diabetes Cases in Processed Dataset')
 plt.savefig('processed_diabetes_distribution.png')
 plt.close()
 
-# Create modified datasets with different distributions
-def create_modified_dataset(df, target_percentage, output_file):
-    """
-    Create a modified dataset with a specific target percentage of diabetes cases.
-    
-    Parameters:
-    -----------
-    df : pandas.DataFrame
-        Original dataset
-    target_percentage : float
-        Target percentage of diabetes cases (0-100)
-    output_file : str
-        Name of the output CSV file
-    """
-    # Calculate target number of cases
-    total_cases = len(df)
-    target_diabetes_cases = int((target_percentage / 100) * total_cases)
-    
-    # Get diabetes and non-diabetes cases
-    diabetes_df = df[df['Outcome'] == 1]
-    non_diabetes_df = df[df['Outcome'] == 0]
-    
-    # If we need more diabetes cases
-    if target_percentage > diabetes_percentage:
-        # Calculate how many more diabetes cases we need
-        additional_cases_needed = target_diabetes_cases - len(diabetes_df)
-        # Duplicate some diabetes cases
-        additional_cases = diabetes_df.sample(n=additional_cases_needed, replace=True)
-        diabetes_df = pd.concat([diabetes_df, additional_cases])
-        # Remove some non-diabetes cases to maintain total
-        non_diabetes_df = non_diabetes_df.sample(n=total_cases - len(diabetes_df))
-    # If we need fewer diabetes cases
-    else:
-        # Calculate how many diabetes cases to keep
-        diabetes_df = diabetes_df.sample(n=target_diabetes_cases)
-        # Add non-diabetes cases to maintain total
-        non_diabetes_df = non_diabetes_df.sample(n=total_cases - len(diabetes_df))
-    
-    # Combine the datasets
-    modified_df = pd.concat([diabetes_df, non_diabetes_df])
-    # Shuffle the dataset
-    modified_df = modified_df.sample(frac=1, random_state=42)
-    
-    # Save to CSV
-    modified_df.to_csv(output_file, index=False)
-    
-    # Print statistics
-    actual_percentage = (len(modified_df[modified_df['Outcome'] == 1]) / len(modified_df)) * 100
-    print(f"\nCreated {output_file} with {actual_percentage:.1f}% diabetes cases")
-
-# Create datasets with different distributions
-create_modified_dataset(df, 75, 'processed_diabetes_75_percent.csv')  # 75% diabetes cases
-create_modified_dataset(df, 25, 'processed_diabetes_25_percent.csv')  # 25% diabetes cases 
\ No newline at end of file
+# Rebalanced variants with 75% and 25% diabetes cases, kept as row indices into the
+# processed dataset rather than as copies of it (see rebalance.py)
+target_ratios = [0.75, 0.25]
+indices = ratio_indices(df['Outcome'].to_numpy(), target_ratios, seed=42)
+save_indices(REBALANCED_INDICES, df, target_ratios, indices)
+for ratio, view in load_views(REBALANCED_INDICES, df).items():
+    print(f"\n{ratio:.0%} target: {len(view)} rows with {view.fraction() * 100:.1f}% diabetes cases")
+print(f"Saved the row indices as '{REBALANCED_INDICES}'")
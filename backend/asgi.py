@@ -0,0 +1,364 @@
+import asyncio
+import io
+import json
+import logging
+import os
+import re
+import secrets
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+
+from dotenv import load_dotenv
+from werkzeug.http import dump_cookie
+from werkzeug.wrappers import Request
+
+import app as routes
+from metrics import REGISTRY, REQUEST_SECONDS, REQUESTS, configure_logging, record_error
+from session_store import MemorySessionStore, ServerSideSession, create_session_store, reload_session
+
+# ASGI entry point with the same /api contract as the Flask app:
+#
+#     uvicorn asgi:app --host 0.0.0.0 --port 5000   (run from the backend directory)
+#
+# One event loop holds every open request. Model inference and rendering run on a
+# thread pool and voice jobs are awaited rather than waited on, so a slow
+# recognizer only occupies a voice worker, not a request slot. Start several
+# uvicorn workers to use more CPU cores; set SESSION_BACKEND=redis when doing so.
+
+logger = logging.getLogger(__name__)
+
+SESSION_COOKIE_NAME = 'session'
+
+# Request bodies above this many bytes are refused with 413 before being parsed
+MAX_BODY_BYTES = int(os.getenv('ASGI_MAX_BODY_BYTES', 16 * 1024 * 1024))
+
+# Methods flask-cors allows in answer to a preflight request
+CORS_METHODS = 'DELETE, GET, HEAD, OPTIONS, PATCH, POST, PUT'
+
+def _environ(scope, body):
+    """A WSGI environ for the request, so werkzeug parses forms, JSON and query strings as Flask does."""
+    server_name, server_port = scope.get('server') or ('localhost', 80)
+    environ = {
+        'REQUEST_METHOD': scope['method'],
+        'SCRIPT_NAME': scope.get('root_path', '').encode().decode('latin1'),
+        'PATH_INFO': scope['path'].encode().decode('latin1'),
+        'QUERY_STRING': scope.get('query_string', b'').decode('latin1'),
+        'SERVER_NAME': str(server_name),
+        'SERVER_PORT': str(server_port),
+        'SERVER_PROTOCOL': f"HTTP/{scope.get('http_version', '1.1')}",
+        'CONTENT_LENGTH': str(len(body)),
+        'wsgi.url_scheme': scope.get('scheme', 'http'),
+        'wsgi.input': io.BytesIO(body),
+        'wsgi.errors': io.StringIO(),
+        'wsgi.multithread': True,
+        'wsgi.multiprocess': True,
+        'wsgi.run_once': False,
+    }
+    for name, value in scope['headers']:
+        name = name.decode('latin1').upper().replace('-', '_')
+        value = value.decode('latin1')
+        if name == 'CONTENT_LENGTH':
+            continue
+        key = name if name == 'CONTENT_TYPE' else f'HTTP_{name}'
+        environ[key] = f'{environ[key]},{value}' if key in environ else value
+    return environ
+
+class Route:
+    """
+    One endpoint: a Flask-style path pattern and the coroutine serving it.
+
+    The handler is called with the app, the werkzeug request, the session and
+    the path parameters, and returns a JSON payload or a
+    (status, content_type, body) tuple.
+    """
+
+    def __init__(self, pattern, methods, handler):
+        self.pattern = pattern
+        self.methods = set(methods)
+        if 'GET' in self.methods:
+            self.methods.add('HEAD')
+        self.handler = handler
+        self.regex = re.compile('^' + re.sub(r'<(\w+)>', r'(?P<\1>[^/]+)', pattern) + '$')
+
+class AsgiApp:
+    """
+    The conversation API as an ASGI application.
+
+    Routes call the same payload functions as the Flask routes in app.py, with
+    conversation state kept in the same session stores behind the same
+    cookie, so clients cannot tell the two apart.
+
+    Parameters:
+    -----------
+    store : session store, optional
+        Where conversation state lives (default: create_session_store())
+    inference_workers : int
+        Threads running model inference and rendering
+    warm_up : bool
+        Load the model when the server starts (lifespan startup) rather than
+        on the first request
+    """
+
+    def __init__(self, store=None, inference_workers=4, warm_up=False):
+        self.store = store if store is not None else create_session_store()
+        self.warm_up = warm_up
+        self.executor = ThreadPoolExecutor(max_workers=inference_workers, thread_name_prefix='inference')
+        # Redis round trips block, so they leave the event loop too; the memory store is a dict lookup
+        self._store_blocks = not isinstance(self.store, MemorySessionStore)
+        self.routes = []
+
+    def route(self, pattern, methods=('GET',)):
+        def register(handler):
+            self.routes.append(Route(pattern, methods, handler))
+            return handler
+        return register
+
+    async def run(self, func, *args):
+        """Run a blocking call on the inference pool and await its result."""
+        return await asyncio.get_running_loop().run_in_executor(self.executor, partial(func, *args))
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            await self._lifespan(receive, send)
+        elif scope['type'] == 'http':
+            await self._http(scope, receive, send)
+        else:
+            raise RuntimeError(f"Unsupported ASGI scope type: {scope['type']}")
+
+    async def _lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                try:
+                    if self.warm_up:
+                        timings = await self.run(routes.warm_up)
+                        logger.info("Warm-up finished: %s",
+                                    ', '.join(f"{name} {ms:.0f}" for name, ms in timings.items()))
+                except Exception as e:
+                    logger.exception("Warm-up failed")
+                    await send({'type': 'lifespan.startup.failed', 'message': str(e)})
+                    return
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                self.executor.shutdown(wait=False)
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+    async def _read_body(self, receive):
+        chunks, size = [], 0
+        while True:
+            message = await receive()
+            if message['type'] == 'http.disconnect':
+                return None
+            chunk = message.get('body', b'')
+            size += len(chunk)
+            if size > MAX_BODY_BYTES:
+                return False
+            chunks.append(chunk)
+            if not message.get('more_body', False):
+                return b''.join(chunks)
+
+    def _match(self, path):
+        for route in self.routes:
+            match = route.regex.match(path)
+            if match:
+                return route, match.groupdict()
+        return None, {}
+
+    async def _http(self, scope, receive, send):
+        start = time.perf_counter()
+        method = scope['method']
+        route, params = self._match(scope['path'])
+        headers = {}
+        cookies = []
+
+        body = await self._read_body(receive)
+        if body is None:
+            return
+        if body is False:
+            status, content_type, payload = 413, 'text/plain', b'Request body too large'
+        elif route is None:
+            status, content_type, payload = 404, 'text/plain', b'Not Found'
+        elif method == 'OPTIONS':
+            status, content_type, payload = 200, 'text/plain', b''
+            headers['allow'] = ', '.join(sorted(route.methods | {'OPTIONS'}))
+        elif method not in route.methods:
+            status, content_type, payload = 405, 'text/plain', b'Method Not Allowed'
+            headers['allow'] = ', '.join(sorted(route.methods | {'OPTIONS'}))
+        else:
+            request = Request(_environ(scope, body))
+            status, content_type, payload = await self._dispatch(route, request, params, cookies)
+
+        request_headers = {name.decode('latin1').lower(): value.decode('latin1') for name, value in scope['headers']}
+        self._cors(request_headers, headers)
+        response_headers = [(b'content-type', content_type.encode('latin1')),
+                            (b'content-length', str(len(payload)).encode())]
+        response_headers += [(name.encode('latin1'), value.encode('latin1')) for name, value in headers.items()]
+        response_headers += [(b'set-cookie', cookie.encode('latin1')) for cookie in cookies]
+        await send({'type': 'http.response.start', 'status': status, 'headers': response_headers})
+        await send({'type': 'http.response.body', 'body': b'' if method == 'HEAD' else payload})
+
+        # Labelled by route pattern, as in the Flask app's record_request
+        label = route.pattern if route is not None else 'unmatched'
+        REQUESTS.inc(route=label, method=method, status=status)
+        REQUEST_SECONDS.observe(time.perf_counter() - start, route=label)
+
+    async def _dispatch(self, route, request, params, cookies):
+        state = await self._open_session(request)
+        try:
+            result = await route.handler(self, request, state, **params)
+        except Exception as e:
+            record_error('asgi', e)
+            logger.exception("Unhandled error in %s", route.pattern)
+            return 500, 'application/json', json.dumps({'status': 'error', 'message': str(e)}).encode()
+        cookie = await self._save_session(state)
+        if cookie:
+            cookies.append(cookie)
+        if isinstance(result, tuple):
+            return result
+        return 200, 'application/json', (json.dumps(result) + '\n').encode()
+
+    async def _store_call(self, func, *args):
+        if self._store_blocks:
+            return await self.run(func, *args)
+        return func(*args)
+
+    async def _open_session(self, request):
+        sid = request.cookies.get(SESSION_COOKIE_NAME)
+        if sid:
+            data = await self._store_call(self.store.load, sid)
+            if data is not None:
+                return ServerSideSession(data, sid=sid)
+        return ServerSideSession(sid=secrets.token_urlsafe(32), new=True)
+
+    async def reload_session(self, state):
+        """Pick up changes other requests saved while this one was waiting (see session_store.reload_session)."""
+        await self._store_call(reload_session, self.store, state)
+
+    async def _save_session(self, state):
+        """Write the session back like ServerSideSessionInterface; returns a Set-Cookie value or None."""
+        if not state:
+            if state.modified and not state.new:
+                await self._store_call(self.store.delete, state.sid)
+                return dump_cookie(SESSION_COOKIE_NAME, '', expires=0, max_age=0, path='/')
+            return None
+        await self._store_call(self.store.save, state.sid, dict(state))
+        if state.new:
+            return dump_cookie(SESSION_COOKIE_NAME, state.sid, httponly=True, path='/')
+        return None
+
+    @staticmethod
+    def _cors(request_headers, headers):
+        # flask-cors with supports_credentials: echo the caller's origin and allow cookies
+        origin = request_headers.get('origin')
+        if not origin:
+            return
+        headers['access-control-allow-origin'] = origin
+        headers['access-control-allow-credentials'] = 'true'
+        headers['vary'] = 'Origin'
+        if 'access-control-request-method' in request_headers:
+            headers['access-control-allow-methods'] = CORS_METHODS
+            if 'access-control-request-headers' in request_headers:
+                headers['access-control-allow-headers'] = request_headers['access-control-request-headers']
+
+async def await_voice_job(job, timeout):
+    """Wait up to timeout seconds for a voice job without holding a thread."""
+    if timeout > 0 and not job.finished and job.future is not None:
+        # asyncio.wait leaves the job running if the timeout expires first
+        await asyncio.wait([asyncio.wrap_future(job.future)], timeout=timeout)
+
+def register_routes(app):
+    """Attach the /api routes; handlers touching the model or speech stack run on the pool."""
+
+    @app.route('/metrics')
+    async def metrics(app, request, state):
+        return 200, 'text/plain; version=0.0.4', REGISTRY.render().encode()
+
+    @app.route('/api/voice-jobs', methods=['POST'])
+    async def create_voice_job(app, request, state):
+        return await app.run(routes.create_voice_job_payload, state, request)
+
+    @app.route('/api/voice-jobs/<job_id>')
+    async def get_voice_job(app, request, state, job_id):
+        job, wait, error = await app.run(routes.find_voice_job, state, job_id, request)
+        if error:
+            return error
+        if wait > 0:
+            await await_voice_job(job, wait)
+            await app.reload_session(state)
+        return routes.voice_job_response(job, state)
+
+    @app.route('/api/process-voice', methods=['POST'])
+    async def process_voice(app, request, state):
+        try:
+            job, error = await app.run(routes.submit_voice_job, state, request)
+            if error:
+                return error
+            await await_voice_job(job, routes.VOICE_MAX_WAIT)
+            await app.reload_session(state)
+            return routes.voice_job_response(job, state)
+        except Exception as e:
+            return routes.voice_error_payload('process_voice', e)
+
+    @app.route('/api/process-text', methods=['POST'])
+    async def process_text(app, request, state):
+        return routes.text_payload(state, request)
+
+    @app.route('/api/predict')
+    async def predict(app, request, state):
+        return await app.run(routes.predict_payload, state)
+
+    @app.route('/api/predict/batch', methods=['POST'])
+    async def predict_batch(app, request, state):
+        return await app.run(routes.batch_payload, request)
+
+    @app.route('/api/prediction-cache/stats')
+    async def prediction_cache_stats(app, request, state):
+        return await app.run(routes.prediction_cache_payload)
+
+    @app.route('/api/model')
+    async def model_info(app, request, state):
+        return await app.run(routes.model_info_payload)
+
+    @app.route('/api/model/shadow')
+    async def shadow_stats(app, request, state):
+        return await app.run(routes.shadow_payload)
+
+    @app.route('/api/reset', methods=['POST'])
+    async def reset(app, request, state):
+        return routes.reset_payload(state)
+
+    @app.route('/api/current-question')
+    async def get_current_question(app, request, state):
+        return routes.current_question_payload(state)
+
+    @app.route('/api/preventive-measures', methods=['POST'])
+    async def get_preventive_measures(app, request, state):
+        return await app.run(routes.preventive_measures_payload, state)
+
+def create_asgi_app(store=None, warm_up=None):
+    """
+    Build the ASGI application.
+
+    ASGI_INFERENCE_WORKERS  threads for inference and rendering (default 4)
+    WARM_UP                 load the model at startup (default true)
+
+    Parameters:
+    -----------
+    store : session store, optional
+        Overrides create_session_store(), e.g. in tests
+    warm_up : bool, optional
+        Overrides WARM_UP
+    """
+    load_dotenv()
+    if warm_up is None:
+        warm_up = os.getenv('WARM_UP', 'true').lower() in ('1', 'true', 'yes')
+    app = AsgiApp(store, inference_workers=int(os.getenv('ASGI_INFERENCE_WORKERS', 4)), warm_up=warm_up)
+    register_routes(app)
+    return app
+
+# Logging is the server's concern, so it is set up here rather than in create_asgi_app()
+load_dotenv()
+configure_logging()
+app = create_asgi_app()
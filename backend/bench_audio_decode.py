@@ -0,0 +1,88 @@
+import argparse
+import io
+import os
+import shutil
+import time
+import wave
+
+import numpy as np
+
+from voice import decode_audio, decode_audio_ffmpeg, soundfile
+
+def synth_recording(seconds, rate, channels):
+    """A few seconds of speech-like noise-modulated tones, as int16 frames."""
+    rng = np.random.default_rng(0)
+    t = np.arange(int(seconds * rate)) / rate
+    signal = 0.3 * np.sin(2 * np.pi * 220 * t) * (1 + np.sin(2 * np.pi * 3 * t))
+    signal += 0.05 * rng.standard_normal(len(t))
+    frames = (np.clip(signal, -1, 1) * 32767).astype(np.int16)
+    return np.column_stack([frames] * channels)
+
+def encode_wav(frames, rate):
+    buffer = io.BytesIO()
+    with wave.open(buffer, 'wb') as wav:
+        wav.setnchannels(frames.shape[1])
+        wav.setsampwidth(2)
+        wav.setframerate(rate)
+        wav.writeframes(frames.tobytes())
+    return buffer.getvalue()
+
+def encode_soundfile(frames, rate, fmt, subtype=None):
+    buffer = io.BytesIO()
+    soundfile.write(buffer, frames, rate, format=fmt, subtype=subtype)
+    return buffer.getvalue()
+
+def measure(decode, audio_data, runs):
+    """
+    Time repeated decodes of one upload.
+
+    Returns:
+    --------
+    dict
+        Median and p95 wall-clock latency and mean CPU time per call in
+        milliseconds. CPU includes child processes, so ffmpeg is counted.
+    """
+    decode(audio_data)  # warm-up
+    latencies = []
+    cpu_start = os.times()
+    for _ in range(runs):
+        start = time.perf_counter()
+        decode(audio_data)
+        latencies.append(time.perf_counter() - start)
+    cpu_end = os.times()
+    cpu = sum(cpu_end[i] - cpu_start[i] for i in range(4))
+    latencies = np.array(latencies) * 1000
+    return {
+        'p50_ms': float(np.percentile(latencies, 50)),
+        'p95_ms': float(np.percentile(latencies, 95)),
+        'cpu_ms': cpu * 1000 / runs,
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare in-process audio decoding with the ffmpeg path.')
+    parser.add_argument('--runs', type=int, default=50, help='decodes per input (default: 50)')
+    parser.add_argument('--seconds', type=float, default=3.0, help='length of each recording (default: 3)')
+    args = parser.parse_args()
+
+    inputs = {
+        'wav 16kHz mono': encode_wav(synth_recording(args.seconds, 16000, 1), 16000),
+        'wav 48kHz stereo': encode_wav(synth_recording(args.seconds, 48000, 2), 48000),
+    }
+    if soundfile is not None:
+        inputs['ogg/vorbis 48kHz mono'] = encode_soundfile(synth_recording(args.seconds, 48000, 1), 48000, 'OGG', 'VORBIS')
+        inputs['flac 44.1kHz stereo'] = encode_soundfile(synth_recording(args.seconds, 44100, 2), 44100, 'FLAC')
+
+    paths = {'in-process': decode_audio}
+    if shutil.which('ffmpeg'):
+        paths['ffmpeg (pydub)'] = decode_audio_ffmpeg
+    else:
+        print("ffmpeg not found; only the in-process path is measured.\n")
+
+    print(f"{'input':<24}{'path':<16}{'p50 ms':>10}{'p95 ms':>10}{'cpu ms':>10}")
+    for name, audio_data in inputs.items():
+        for path, decode in paths.items():
+            stats = measure(decode, audio_data, args.runs)
+            print(f"{name:<24}{path:<16}{stats['p50_ms']:>10.2f}{stats['p95_ms']:>10.2f}{stats['cpu_ms']:>10.2f}")
+
+if __name__ == "__main__":
+    main()
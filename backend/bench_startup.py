@@ -0,0 +1,84 @@
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+import numpy as np
+
+# Modules that must stay out of `import app` + create_app(); they load on first use
+HEAVY_MODULES = ('numpy', 'pandas', 'scipy', 'sklearn', 'joblib', 'speech_recognition', 'pydub', 'vosk')
+
+# Default budget for importing the app and building it in a fresh interpreter
+IMPORT_BUDGET_MS = 500
+
+_PROBE = """
+import json, sys, time
+start = time.perf_counter()
+import app
+flask_app = app.create_app()
+import_ms = (time.perf_counter() - start) * 1000
+heavy = [name for name in {heavy!r} if name in sys.modules]
+result = {{'import_ms': import_ms, 'heavy_modules': heavy}}
+if {warm!r}:
+    start = time.perf_counter()
+    result['warm_up'] = app.warm_up()
+    result['warm_up_ms'] = (time.perf_counter() - start) * 1000
+    client = flask_app.test_client()
+    start = time.perf_counter()
+    client.get('/api/current-question')
+    result['first_request_ms'] = (time.perf_counter() - start) * 1000
+print(json.dumps(result))
+"""
+
+def startup_profile(warm=False):
+    """
+    Import and build the app in a fresh interpreter.
+
+    Parameters:
+    -----------
+    warm : bool
+        Also time warm_up() and the first request afterwards
+
+    Returns:
+    --------
+    dict
+        import_ms, the heavy modules that were imported, and warm-up timings if requested
+    """
+    output = subprocess.run([sys.executable, '-c', _PROBE.format(heavy=HEAVY_MODULES, warm=warm)],
+                            cwd=os.path.dirname(os.path.abspath(__file__)), capture_output=True,
+                            text=True, check=True, env=dict(os.environ, LOG_LEVEL='WARNING'))
+    return json.loads(output.stdout.strip().splitlines()[-1])
+
+def main():
+    parser = argparse.ArgumentParser(description='Measure app import time and check it against a budget.')
+    parser.add_argument('--runs', type=int, default=5, help='fresh interpreters to time (default: 5)')
+    parser.add_argument('--budget-ms', type=float, default=IMPORT_BUDGET_MS,
+                        help=f'maximum median import + create_app time (default: {IMPORT_BUDGET_MS})')
+    parser.add_argument('--warm', action='store_true', help='also time warm_up() and the first request')
+    args = parser.parse_args()
+
+    profiles = [startup_profile() for _ in range(args.runs)]
+    import_ms = np.array([profile['import_ms'] for profile in profiles])
+    heavy = sorted({name for profile in profiles for name in profile['heavy_modules']})
+    print(f"import app + create_app(): median {np.median(import_ms):.1f} ms, "
+          f"max {import_ms.max():.1f} ms over {args.runs} runs (budget {args.budget_ms:.0f} ms)")
+
+    if args.warm:
+        warm = startup_profile(warm=True)
+        print(f"warm_up(): {warm['warm_up_ms']:.1f} ms {warm['warm_up']}")
+        print(f"first request after warm-up: {warm['first_request_ms']:.1f} ms")
+
+    failed = False
+    if heavy:
+        print(f"FAIL: heavy modules imported eagerly: {', '.join(heavy)}")
+        failed = True
+    if np.median(import_ms) > args.budget_ms:
+        print("FAIL: import time is over budget")
+        failed = True
+    if failed:
+        sys.exit(1)
+    print("OK")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,527 @@
+import logging
+import operator
+import re
+
+from metrics import record_error, timed
+from speech_backends import build_grammar, parse_number_words
+
+logger = logging.getLogger(__name__)
+
+# Main questions in the order they are asked
+questions = [
+    ("Gender", "What is your gender? (male/female)"),
+    ("Pregnancies", "How many times have you been pregnant? (Valid range: 0-17)"),  # Will be skipped for males
+    ("Glucose", "What is your glucose level in mg/dL? (Normal range: 70-140 mg/dL, accepted range: 40-400 mg/dL)"),
+    ("BloodPressure", "What is your blood pressure in mmHg? (Normal range: 90-140 mmHg, accepted range: 60-250 mmHg)"),
+    ("SkinThickness", "What is your triceps skinfold thickness in mm? (Valid range: 0-99 mm)"),
+    ("Insulin", "What is your insulin level in μU/mL? (Normal range: 2.6-24.9 μU/mL, accepted range: 0-846 μU/mL)"),
+    ("BMI", "What is your BMI? (Normal range: 18.5-24.9, accepted range: 10-70)"),
+    ("DiabetesPedigreeFunction", "What is your diabetes pedigree function value? (Valid range: 0.078-2.42)"),
+    ("Age", "What is your age in years? (Valid range: 21-81 years)")
+]
+
+# Follow-up questions asked when an answer falls outside the normal range
+follow_up_questions = {
+    "Glucose": {
+        "high": [
+            ("GlucoseFasting", "Was this measurement taken while fasting? (yes/no)"),
+            ("GlucoseTime", "When was this measurement taken? (morning/afternoon/evening)"),
+            ("GlucoseSymptoms", "Are you experiencing any symptoms like increased thirst or frequent urination? (yes/no)"),
+            ("GlucoseHistory", "Have you had high glucose readings before? (yes/no)"),
+            ("GlucoseMedication", "Are you currently taking any diabetes medication? (yes/no)"),
+            ("GlucoseFamily", "Do you have any family members with diabetes? (yes/no)"),
+            ("GlucoseDiet", "How would you describe your typical diet? (healthy/moderate/poor)")
+        ],
+        "low": [
+            ("GlucoseSymptoms", "Are you experiencing any symptoms like dizziness or sweating? (yes/no)"),
+            ("GlucoseLastMeal", "When did you last eat? (hours ago)"),
+            ("GlucoseMedication", "Are you taking any medications that might affect blood sugar? (yes/no)"),
+            ("GlucoseHistory", "Have you had low glucose readings before? (yes/no)")
+        ]
+    },
+    "BloodPressure": {
+        "high": [
+            ("BPMedication", "Are you currently taking any blood pressure medication? (yes/no)"),
+            ("BPStress", "Are you currently experiencing stress? (yes/no)"),
+            ("BPActivity", "Were you physically active before this measurement? (yes/no)"),
+            ("BPHistory", "Have you had high blood pressure before? (yes/no)"),
+            ("BPSalt", "How would you describe your salt intake? (low/moderate/high)"),
+            ("BPFamily", "Do you have any family members with high blood pressure? (yes/no)"),
+            ("BPSleep", "How many hours of sleep do you typically get? (hours)"),
+            ("BPCaffeine", "How many caffeinated drinks do you have daily? (number)")
+        ],
+        "low": [
+            ("BPSymptoms", "Are you experiencing any symptoms like dizziness or fatigue? (yes/no)"),
+            ("BPMedication", "Are you currently taking any blood pressure medication? (yes/no)"),
+            ("BPHistory", "Have you had low blood pressure before? (yes/no)"),
+            ("BPHydration", "How much water do you drink daily? (glasses)"),
+            ("BPStanding", "Do you feel dizzy when standing up quickly? (yes/no)")
+        ]
+    },
+    "BMI": {
+        "high": [
+            ("BMIDiet", "How would you describe your diet? (healthy/moderate/poor)"),
+            ("BMIWeightHistory", "Has your weight changed significantly in the last year? (yes/no)"),
+            ("BMIFamily", "Do you have any family members with weight-related health issues? (yes/no)"),
+            ("BMISleep", "How many hours of sleep do you typically get? (hours)"),
+            ("BMISedentary", "How many hours do you spend sitting daily? (hours)")
+        ],
+        "low": [
+            ("BMIAppetite", "Have you experienced any loss of appetite? (yes/no)"),
+            ("BMIWeightHistory", "Has your weight changed significantly in the last year? (yes/no)"),
+            ("BMIMedical", "Are you currently being treated for any medical conditions? (yes/no)"),
+            ("BMIDiet", "How would you describe your diet? (healthy/moderate/poor)"),
+            ("BMISymptoms", "Are you experiencing any other symptoms? (yes/no)"),
+            ("BMIFamily", "Do you have any family members with similar weight patterns? (yes/no)")
+        ]
+    },
+    "Age": {
+        "elderly": [
+            ("AgeActivity", "How would you describe your physical activity level? (sedentary/moderate/active)"),
+            ("AgeMobility", "Do you have any mobility issues? (yes/no)"),
+            ("AgeMedication", "How many medications do you take daily? (number)"),
+            ("AgeSupport", "Do you have family or caregiver support? (yes/no)"),
+            ("AgeCheckups", "How often do you get medical checkups? (monthly/quarterly/yearly/rarely)")
+        ]
+    }
+}
+
+# Follow-up branch opened by a main answer: (branch, op, threshold), first match wins
+FOLLOW_UP_TRIGGERS = {
+    "Glucose": [("high", '>', 140), ("low", '<', 70)],
+    "BloodPressure": [("high", '>', 140), ("low", '<', 90)],
+    "BMI": [("high", '>', 24.9), ("low", '<', 18.5)],
+    "Age": [("elderly", '>', 65)]
+}
+
+# Questions answered implicitly by an earlier answer: field -> (depends_on, value, implied answer)
+SKIP_RULES = {
+    "Pregnancies": ("Gender", "male", 0)
+}
+
+_OPERATORS = {
+    '>': operator.gt,
+    '<': operator.lt
+}
+
+def extract_number_from_text(text):
+    """Extract numeric value from text input."""
+    try:
+        numbers = re.findall(r"[-+]?(?:\d*\.\d+|\d+)", text.lower())
+        if numbers:
+            return float(numbers[0])
+        # Offline recognizers spell numbers out ("one hundred forty")
+        return parse_number_words(text)
+    except:
+        return None
+
+class Choice:
+    """
+    Accepts one word from a fixed set, mapping synonyms to a canonical answer.
+
+    Parameters:
+    -----------
+    choices : dict or list
+        Canonical answers, optionally mapped to lists of synonyms
+    error : str, optional
+        Message for anything else; defaults to listing the choices
+    """
+
+    numeric = False
+
+    def __init__(self, choices, error=None):
+        if not isinstance(choices, dict):
+            choices = {choice: [] for choice in choices}
+        self.answers = {}
+        for canonical, synonyms in choices.items():
+            for word in [canonical] + synonyms:
+                self.answers[word] = canonical
+        self.error = error or f"Please choose one of: {', '.join(choices)}"
+
+    @property
+    def vocabulary(self):
+        # Single-letter shorthands are for typing, not speaking
+        return [word for word in self.answers if len(word) > 1]
+
+    def __call__(self, text):
+        value = str(text).strip().lower()
+        if value in self.answers:
+            return True, self.answers[value]
+        return False, self.error
+
+class Number:
+    """
+    Accepts a number (digits or spoken words) within an inclusive range.
+
+    Parameters:
+    -----------
+    low, high : float or None
+        Accepted bounds; None leaves that side open
+    error : str
+        Message for a number outside the range
+    name : str, optional
+        How to refer to the value when no number can be found at all
+    """
+
+    numeric = True
+    vocabulary = ()
+
+    def __init__(self, low, high, error, name=None):
+        self.low = low
+        self.high = high
+        self.error = error
+        self.unparsed = f"I couldn't understand the number for {name}. Please provide a numeric value." if name else error
+
+    def __call__(self, text):
+        value = extract_number_from_text(str(text))
+        if value is None:
+            return False, self.unparsed
+        if (self.low is not None and value < self.low) or (self.high is not None and value > self.high):
+            return False, self.error
+        return True, value
+
+YES_NO = Choice({
+    "yes": ['y', 'yeah', 'yep', 'sure', 'okay', 'yup', 'correct', 'right'],
+    "no": ['n', 'nope', 'nah', 'never', 'negative', 'incorrect', 'wrong']
+}, "Please answer with 'yes' or 'no'.")
+
+# Accepted answers for every question, keyed by field ID
+VALIDATORS = {
+    "Gender": Choice({"male": ['m', 'man', 'boy'], "female": ['f', 'woman', 'girl']},
+                     "Please provide a valid gender (male/female)."),
+    "Pregnancies": Number(0, 17, "Please provide a valid number of pregnancies (0-17).", "pregnancies"),
+    # Normal range: 70-140 mg/dL, but allowing wider range for fasting/after meals
+    "Glucose": Number(40, 400, "Please provide a valid glucose level (40-400 mg/dL). Normal range is 70-140 mg/dL.", "glucose"),
+    # Normal range: 90-140 mmHg systolic
+    "BloodPressure": Number(60, 250, "Please provide a valid blood pressure (60-250 mmHg). Normal range is 90-140 mmHg.", "blood pressure"),
+    "SkinThickness": Number(0, 99, "Please provide a valid skin thickness (0-99 mm). This is measured at the triceps.", "skin thickness"),
+    "Insulin": Number(0, 846, "Please provide a valid insulin level (0-846 μU/mL). Normal range is 2.6-24.9 μU/mL.", "insulin"),
+    "BMI": Number(10, 70, "Please provide a valid BMI (10-70). Normal range is 18.5-24.9.", "bmi"),
+    # Based on Pima Indians dataset range
+    "DiabetesPedigreeFunction": Number(0.078, 2.42, "Please provide a valid diabetes pedigree function value (0.078-2.42).", "diabetes pedigree function"),
+    "Age": Number(21, 81, "Please provide a valid age (21-81 years).", "age"),
+
+    "GlucoseFasting": YES_NO,
+    "GlucoseTime": Choice(["morning", "afternoon", "evening"]),
+    "GlucoseSymptoms": YES_NO,
+    "GlucoseHistory": YES_NO,
+    "GlucoseMedication": YES_NO,
+    "GlucoseFamily": YES_NO,
+    "GlucoseDiet": Choice(["healthy", "moderate", "poor"]),
+    "GlucoseLastMeal": Number(0, 24, "Please provide a valid number of hours (0-24)."),
+
+    "BPMedication": YES_NO,
+    "BPStress": YES_NO,
+    "BPActivity": YES_NO,
+    "BPHistory": YES_NO,
+    "BPSalt": Choice(["low", "moderate", "high"]),
+    "BPFamily": YES_NO,
+    "BPSleep": Number(0, None, "Please provide a valid number."),
+    "BPCaffeine": Number(0, None, "Please provide a valid number."),
+    "BPSymptoms": YES_NO,
+    "BPHydration": Number(0, 20, "Please provide a valid number of glasses (0-20)."),
+    "BPStanding": YES_NO,
+
+    "BMIDiet": Choice(["healthy", "moderate", "poor"]),
+    "BMIWeightHistory": YES_NO,
+    "BMIFamily": YES_NO,
+    "BMISleep": Number(0, 24, "Please provide a valid number of hours (0-24)."),
+    "BMISedentary": Number(0, 24, "Please provide a valid number of hours (0-24)."),
+    "BMIAppetite": YES_NO,
+    "BMIMedical": YES_NO,
+    "BMISymptoms": YES_NO,
+
+    "AgeActivity": Choice(["sedentary", "moderate", "active"]),
+    "AgeMobility": YES_NO,
+    "AgeMedication": Number(0, None, "Please provide a valid number of medications."),
+    "AgeSupport": YES_NO,
+    "AgeCheckups": Choice(["monthly", "quarterly", "yearly", "rarely"])
+}
+
+class Step:
+    """
+    One state of the dialog: the question asked, how its answer is validated
+    and which state follows.
+
+    ``next`` is the following field ID within the same sequence (main questions
+    or one follow-up branch). For follow-ups, ``branch`` names the branch and
+    ``resume`` is the main question asked once the branch is exhausted.
+    """
+
+    __slots__ = ('field', 'prompt', 'validate', 'grammar', 'next', 'branch', 'resume')
+
+    def __init__(self, field, prompt, next_field, branch=None, resume=None):
+        validator = VALIDATORS[field]
+        self.field = field
+        self.prompt = prompt
+        self.validate = validator
+        self.grammar = build_grammar(validator.vocabulary, numeric=validator.numeric)
+        self.next = next_field
+        self.branch = branch
+        self.resume = resume
+
+    @property
+    def is_follow_up(self):
+        return self.branch is not None
+
+def _compile():
+    """Index every question by field ID (and follow-ups by branch as well)."""
+    fields = [field for field, _ in questions]
+    main = {field: Step(field, prompt, (fields[i + 1:] or [None])[0])
+            for i, (field, prompt) in enumerate(questions)}
+
+    follow_ups, heads = {}, {}
+    for parent, branches in follow_up_questions.items():
+        for name, sequence in branches.items():
+            branch = f"{parent}.{name}"
+            for i, (field, prompt) in enumerate(sequence):
+                next_field = sequence[i + 1][0] if i + 1 < len(sequence) else None
+                follow_ups[(branch, field)] = Step(field, prompt, next_field, branch, main[parent].next)
+            heads[branch] = follow_ups[(branch, sequence[0][0])]
+
+    triggers = {field: [(f"{field}.{name}", _OPERATORS[op], threshold) for name, op, threshold in rules]
+                for field, rules in FOLLOW_UP_TRIGGERS.items()}
+    return main, follow_ups, heads, triggers
+
+# Compiled once at import
+MAIN_STEPS, FOLLOW_UP_STEPS, _branch_heads, _triggers = _compile()
+FIRST_FIELD = questions[0][0]
+
+def _open_branch(field, value):
+    """First follow-up step triggered by a main answer, or None."""
+    for branch, compare, threshold in _triggers.get(field, ()):
+        if compare(value, threshold):
+            return _branch_heads[branch]
+    return None
+
+def _enter_main(state, field):
+    """Move to a main question, filling in any it makes moot; returns the step or None when done."""
+    answers = state['answers']
+    while field in SKIP_RULES and answers.get(SKIP_RULES[field][0]) == SKIP_RULES[field][1]:
+        answers[field] = SKIP_RULES[field][2]
+        field = MAIN_STEPS[field].next
+    state['current_field'] = field
+    state['follow_up_branch'] = None
+    return MAIN_STEPS[field] if field else None
+
+def start(state):
+    """Reset a session mapping to the first question."""
+    state['answers'] = {}
+    state['follow_up_answers'] = {}
+    return _enter_main(state, FIRST_FIELD)
+
+def current_step(state):
+    """The step awaiting an answer, or None once every question has been answered."""
+    if 'answers' not in state:
+        return start(state)
+    field = state.get('current_field')
+    if field is None:
+        return None
+    branch = state.get('follow_up_branch')
+    return FOLLOW_UP_STEPS[(branch, field)] if branch else MAIN_STEPS[field]
+
+def _ask(step, message, **extra):
+    """Success payload that moves the user on to ``step``."""
+    payload = {
+        'status': 'success',
+        'message': message,
+        'is_follow_up': step.is_follow_up,
+        'current_question': step.field,
+        'question_text': step.prompt
+    }
+    if step.is_follow_up:
+        payload['next_follow_up'] = step.field
+    else:
+        payload['next_feature'] = step.field
+        payload['is_complete'] = False
+    payload.update(extra)
+    return payload
+
+def _complete(message, **extra):
+    payload = {
+        'status': 'success',
+        'message': message + "\nAll questions answered. Requesting prediction...",
+        'is_complete': True,
+        'is_follow_up': False
+    }
+    payload.update(extra)
+    return payload
+
+def advance(state, text):
+    """
+    Apply one answer to the conversation and return the response payload.
+
+    This is the single transition function behind both the text and voice
+    routes: the current step's validator checks the answer, the answer is
+    stored, and the session moves to the next follow-up, the next main
+    question or completion.
+
+    Parameters:
+    -----------
+    state : dict-like
+        The session; holds answers, follow_up_answers, current_field and follow_up_branch
+    text : str
+        The typed or recognized answer
+
+    Returns:
+    --------
+    dict
+        JSON payload for the client
+    """
+    step = current_step(state)
+    if step is None:
+        return {
+            'status': 'error',
+            'message': 'All questions have been answered. Please request prediction.',
+            'is_complete': True
+        }
+
+    field = step.field
+    with timed('validation'):
+        is_valid, result = step.validate(text)
+    logger.debug("Processing input - Field: %s, Value: %s", field, text)
+
+    if not is_valid:
+        record_error('validation', 'InvalidAnswer')
+        payload = {
+            'status': 'error',
+            'message': result,
+            'is_follow_up': step.is_follow_up,
+            'current_question': field,
+            'question_text': step.prompt
+        }
+        if step.is_follow_up:
+            payload['message'] = f"Please provide a valid response for: {step.prompt}"
+            payload['next_follow_up'] = field
+        return payload
+
+    if step.is_follow_up:
+        state['follow_up_answers'][field] = result
+        if step.next:
+            state['current_field'] = step.next
+            next_step = FOLLOW_UP_STEPS[(step.branch, step.next)]
+            return _ask(next_step, f"Received {field}: {result}. {next_step.prompt}")
+
+        # Branch exhausted: return to the main questions
+        next_step = _enter_main(state, step.resume)
+        if next_step is None:
+            return _complete("Thank you for providing that information.")
+        return _ask(next_step, f"Thank you for providing that information. {next_step.prompt}")
+
+    state['answers'][field] = result
+
+    # Get feedback for the value
+    feedback = get_range_feedback(field, result)
+    if feedback:
+        message = f"Received {field}: {result}.\n\nImportant Note:\n" + "\n".join(feedback) + "\n\n"
+    else:
+        message = f"Received {field}: {result}. "
+
+    # Follow-up questions come before the next main question
+    follow_up = _open_branch(field, result)
+    if follow_up is not None:
+        state['current_field'] = follow_up.field
+        state['follow_up_branch'] = follow_up.branch
+        return _ask(follow_up, message + f"\n{follow_up.prompt}", has_feedback=bool(feedback))
+
+    next_step = _enter_main(state, step.next)
+    if next_step is None:
+        return _complete(message, has_feedback=bool(feedback))
+    return _ask(next_step, message + next_step.prompt, has_feedback=bool(feedback))
+
+def get_range_feedback(field, value):
+    """Get immediate feedback and precautions for values outside normal range."""
+    feedback = []
+    
+    if field == "Pregnancies":
+        if value > 5:  # High number of pregnancies
+            feedback.append("• Note: Multiple pregnancies can increase diabetes risk.")
+            feedback.append("• Regular monitoring of glucose levels is recommended.")
+            feedback.append("• Consider discussing with your healthcare provider about gestational diabetes screening.")
+    
+    elif field == "Glucose":
+        if value > 140:  # High glucose
+            feedback.append("• Your glucose level is above normal range (70-140 mg/dL).")
+            feedback.append("• This could indicate prediabetes or diabetes.")
+            feedback.append("• Consider getting a fasting glucose test.")
+            feedback.append("• Monitor for symptoms like increased thirst or frequent urination.")
+        elif value < 70:  # Low glucose
+            feedback.append("• Your glucose level is below normal range (70-140 mg/dL).")
+            feedback.append("• This could indicate hypoglycemia.")
+            feedback.append("• Be aware of symptoms like dizziness, sweating, or confusion.")
+            feedback.append("• Consider eating a small snack if you feel symptoms.")
+        elif value > 120:  # Borderline high
+            feedback.append("• Your glucose level is slightly elevated.")
+            feedback.append("• Consider monitoring your levels regularly.")
+            feedback.append("• Maintain a healthy diet and regular exercise.")
+    
+    elif field == "BloodPressure":
+        if value > 140:  # High blood pressure
+            feedback.append("• Your blood pressure is above normal range (90-140 mmHg).")
+            feedback.append("• This could indicate hypertension.")
+            feedback.append("• Consider reducing salt intake and managing stress.")
+            feedback.append("• Regular monitoring is recommended.")
+        elif value < 90:  # Low blood pressure
+            feedback.append("• Your blood pressure is below normal range (90-140 mmHg).")
+            feedback.append("• This could indicate hypotension.")
+            feedback.append("• Stay hydrated and avoid sudden position changes.")
+            feedback.append("• Monitor for symptoms like dizziness or fatigue.")
+        elif value > 130:  # Borderline high
+            feedback.append("• Your blood pressure is slightly elevated.")
+            feedback.append("• Consider monitoring it regularly.")
+            feedback.append("• Maintain a healthy lifestyle with regular exercise.")
+    
+    elif field == "SkinThickness":
+        if value > 40:  # High skin thickness
+            feedback.append("• Your skin thickness measurement is elevated.")
+            feedback.append("• This could be related to insulin resistance.")
+            feedback.append("• Consider discussing with your healthcare provider.")
+        elif value < 10:  # Low skin thickness
+            feedback.append("• Your skin thickness measurement is low.")
+            feedback.append("• This might indicate nutritional status.")
+            feedback.append("• Consider discussing with your healthcare provider.")
+    
+    elif field == "Insulin":
+        if value > 24.9:  # High insulin
+            feedback.append("• Your insulin level is above normal range (2.6-24.9 μU/mL).")
+            feedback.append("• This could indicate insulin resistance.")
+            feedback.append("• Consider discussing with your healthcare provider.")
+            feedback.append("• Regular exercise and healthy diet are important.")
+        elif value < 2.6:  # Low insulin
+            feedback.append("• Your insulin level is below normal range (2.6-24.9 μU/mL).")
+            feedback.append("• This might indicate pancreatic function issues.")
+            feedback.append("• Consider discussing with your healthcare provider.")
+    
+    elif field == "BMI":
+        if value > 24.9:  # High BMI
+            feedback.append("• Your BMI is above normal range (18.5-24.9).")
+            if value > 30:
+                feedback.append("• This indicates obesity, which increases diabetes risk.")
+                feedback.append("• Consider consulting a healthcare provider for weight management.")
+            else:
+                feedback.append("• This indicates overweight, which can increase diabetes risk.")
+            feedback.append("• Regular exercise and healthy diet are recommended.")
+            feedback.append("• Consider consulting a nutritionist for dietary guidance.")
+        elif value < 18.5:  # Low BMI
+            feedback.append("• Your BMI is below normal range (18.5-24.9).")
+            feedback.append("• This indicates underweight, which can affect health.")
+            feedback.append("• Consider consulting a healthcare provider.")
+            feedback.append("• Focus on healthy weight gain through proper nutrition.")
+    
+    elif field == "DiabetesPedigreeFunction":
+        if value > 1.5:  # High pedigree function
+            feedback.append("• Your diabetes pedigree function value is elevated.")
+            feedback.append("• This indicates a stronger family history of diabetes.")
+            feedback.append("• Regular screening and monitoring are recommended.")
+            feedback.append("• Maintain a healthy lifestyle to reduce risk.")
+    
+    elif field == "Age":
+        if value > 65:  # Elderly
+            feedback.append("• As you're over 65, regular health screenings are important.")
+            feedback.append("• Consider more frequent check-ups.")
+            feedback.append("• Focus on maintaining a healthy lifestyle.")
+        elif value < 30:  # Young adult
+            feedback.append("• While you're young, early prevention is important.")
+            feedback.append("• Maintain healthy habits to reduce future risk.")
+    
+    return feedback
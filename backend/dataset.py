@@ -0,0 +1,233 @@
+import hashlib
+import json
+import logging
+import os
+import shutil
+import tempfile
+from contextlib import contextmanager
+
+import numpy as np
+import pandas as pd
+
+try:
+    import fcntl
+except ImportError:  # Windows: bundles are replaced without locking
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+# Bump when the bundle layout changes so stale bundles are rebuilt
+DATASET_FORMAT_VERSION = 1
+
+BUNDLE_SUFFIX = '.npyds'
+SCHEMA_NAME = 'schema.json'
+LOCK_SUFFIX = '.lock'
+
+def bundle_path(path):
+    """Bundle directory for a CSV (diabetes.csv -> diabetes.npyds); bundles map to themselves."""
+    if path.rstrip('/').endswith(BUNDLE_SUFFIX):
+        return path.rstrip('/')
+    return os.path.splitext(path)[0] + BUNDLE_SUFFIX
+
+def _column_file(index):
+    # Column names can contain anything, so files are numbered and named in the schema
+    return f'{index:03d}.npy'
+
+@contextmanager
+def _locked(path, shared=False):
+    # Readers hold the bundle's lock file shared while opening its files and a
+    # writer holds it exclusively while swapping directories, so no reader sees
+    # the gap between the two renames and concurrent rebuilds replace in turn
+    if fcntl is None:
+        yield
+        return
+    try:
+        lock = open(path + LOCK_SUFFIX, 'a')
+    except OSError:
+        # e.g. a read-only checkout, where nothing can be replacing the bundle either
+        yield
+        return
+    with lock:
+        fcntl.flock(lock, fcntl.LOCK_SH if shared else fcntl.LOCK_EX)
+        yield
+
+def _source_stamp(csv_path):
+    stat = os.stat(csv_path)
+    return {'path': os.path.basename(csv_path), 'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns}
+
+def content_hash(df):
+    """SHA-256 over column names, dtypes and values, independent of how the data was stored."""
+    digest = hashlib.sha256()
+    for name in df.columns:
+        values = np.ascontiguousarray(df[name].to_numpy())
+        digest.update(json.dumps([str(name), values.dtype.str, len(values)]).encode())
+        digest.update(values.data)
+    return digest.hexdigest()
+
+def _typed_columns(df):
+    columns = {}
+    for name in df.columns:
+        values = df[name].to_numpy()
+        if not (np.issubdtype(values.dtype, np.number) or values.dtype == bool):
+            raise ValueError(f"Column {name!r} is not numeric ({values.dtype}); bundles hold numeric columns only.")
+        columns[name] = values
+    return columns
+
+def save_dataset(df, path, source=None):
+    """
+    Write a DataFrame as a bundle: one .npy file per column plus schema.json.
+
+    The bundle is built in a temporary directory and renamed into place
+    under the bundle's lock file, so readers never see a half-written or
+    missing one and concurrent rebuilds of the same bundle replace it one
+    after the other.
+
+    Parameters:
+    -----------
+    df : pandas.DataFrame
+        Numeric columns only
+    path : str
+        Bundle directory (a .csv path is mapped with bundle_path)
+    source : dict, optional
+        Stamp of the CSV the data came from, used to detect a stale bundle
+
+    Returns:
+    --------
+    str
+        The bundle directory
+    """
+    path = bundle_path(path)
+    columns = _typed_columns(df)
+    parent = os.path.dirname(os.path.abspath(path))
+    os.makedirs(parent, exist_ok=True)
+    staging = tempfile.mkdtemp(dir=parent, prefix='.staging-')
+    try:
+        schema = {
+            'format_version': DATASET_FORMAT_VERSION,
+            'rows': len(df),
+            'columns': [{'name': str(name), 'dtype': values.dtype.str, 'file': _column_file(index)}
+                        for index, (name, values) in enumerate(columns.items())],
+            'sha256': content_hash(df),
+            'source': source,
+        }
+        for column in schema['columns']:
+            np.save(os.path.join(staging, column['file']), np.ascontiguousarray(columns[column['name']]))
+        with open(os.path.join(staging, SCHEMA_NAME), 'w') as f:
+            json.dump(schema, f, indent=2)
+
+        with _locked(path):
+            if os.path.exists(path):
+                # Directories cannot be replaced atomically; move the old one aside first
+                retired = tempfile.mkdtemp(dir=parent, prefix='.retired-')
+                os.rename(path, os.path.join(retired, 'bundle'))
+                os.rename(staging, path)
+            else:
+                retired = None
+                os.rename(staging, path)
+        # Readers that already mapped the old columns keep them until they close them
+        if retired:
+            shutil.rmtree(retired, ignore_errors=True)
+    except BaseException:
+        shutil.rmtree(staging, ignore_errors=True)
+        raise
+    return path
+
+def read_schema(path):
+    with open(os.path.join(bundle_path(path), SCHEMA_NAME)) as f:
+        return json.load(f)
+
+def load_bundle(path, mmap_mode='r', verify=False):
+    """
+    Open a bundle as a DataFrame backed by memory-mapped column files.
+
+    Opening costs a few file maps regardless of size; pages are read on first
+    access and shared between processes. With mmap_mode='r' the columns are
+    read-only, so callers that modify values should take a .copy().
+
+    Parameters:
+    -----------
+    path : str
+        Bundle directory
+    mmap_mode : str or None
+        Passed to numpy.load; None reads the columns into memory
+    verify : bool
+        Recompute the content hash and compare it with the schema
+
+    Returns:
+    --------
+    pandas.DataFrame
+    """
+    path = bundle_path(path)
+    with _locked(path, shared=True):
+        schema = read_schema(path)
+        if schema.get('format_version') != DATASET_FORMAT_VERSION:
+            raise ValueError(f"{path} has format version {schema.get('format_version')}, "
+                             f"expected {DATASET_FORMAT_VERSION}.")
+        columns = {}
+        for column in schema['columns']:
+            values = np.load(os.path.join(path, column['file']), mmap_mode=mmap_mode, allow_pickle=False)
+            if values.dtype.str != column['dtype'] or len(values) != schema['rows']:
+                raise ValueError(f"Column {column['name']!r} in {path} does not match its schema.")
+            # A plain ndarray view of the map, so pandas treats the column like any other
+            columns[column['name']] = values.view(np.ndarray)
+    df = pd.DataFrame(columns, copy=False)
+    if verify and content_hash(df) != schema['sha256']:
+        raise ValueError(f"Content hash mismatch for {path}; rebuild it from its source.")
+    return df
+
+def convert_csv(csv_path, path=None):
+    """Parse a CSV once and store it as a bundle next to it (or at path)."""
+    source = _source_stamp(csv_path)
+    df = pd.read_csv(csv_path)
+    written = save_dataset(df, path or csv_path, source=source)
+    logger.info("Converted %s to %s (%d rows)", csv_path, written, len(df))
+    return written
+
+def load_dataset(path, mmap_mode='r', verify=False):
+    """
+    Load a dataset from its bundle, converting the CSV on first use.
+
+    A CSV path is served from its sibling bundle as long as the CSV's size and
+    modification time match those recorded at conversion; otherwise the bundle
+    is rebuilt. A bundle path is opened directly.
+
+    Parameters:
+    -----------
+    path : str
+        A .csv file or a bundle directory
+    mmap_mode, verify
+        See load_bundle
+
+    Returns:
+    --------
+    pandas.DataFrame
+    """
+    bundle = bundle_path(path)
+    if bundle != path.rstrip('/'):
+        try:
+            with _locked(bundle, shared=True):
+                fresh = read_schema(bundle).get('source') == _source_stamp(path)
+        except (FileNotFoundError, ValueError):
+            fresh = False
+        if not fresh:
+            convert_csv(path, bundle)
+    return load_bundle(bundle, mmap_mode=mmap_mode, verify=verify)
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Convert CSV datasets to memory-mappable column bundles.')
+    parser.add_argument('paths', nargs='+', help='CSV files to convert or bundles to verify')
+    args = parser.parse_args()
+
+    for path in args.paths:
+        if path.rstrip('/').endswith(BUNDLE_SUFFIX):
+            load_bundle(path, verify=True)
+            print(f"{path}: OK")
+        else:
+            written = convert_csv(path)
+            schema = read_schema(written)
+            print(f"{path} -> {written} ({schema['rows']} rows, sha256 {schema['sha256'][:12]})")
+
+if __name__ == "__main__":
+    main()
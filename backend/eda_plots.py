@@ -2,17 +2,23 @@ import pandas as pd
 import matplotlib.pyplot as plt
 import seaborn as sns
 import os
-
-# Load datasets
-df_raw = pd.read_csv('diabetes.csv')  # raw/original dataset
-df_processed = pd.read_csv('processed_diabetes.csv')  # cleaned/processed dataset
+from dataset import load_dataset
 
 # Output directory for plots
-output_dir = 'eda_plots'
-os.makedirs(output_dir, exist_ok=True)
+OUTPUT_DIR = 'eda_plots'
+
+# File name suffixes of the plots written for each dataset
+PLOT_NAMES = ['01_histograms', '02_correlation_matrix', '03_outcome_distribution',
+              '04_glucose_boxplot', '05_bmi_vs_age_scatter', '06_insulin_violinplot']
+
+def plot_paths(label, output_dir=OUTPUT_DIR):
+    """Files written by save_eda_plots for a dataset label."""
+    return [f"{output_dir}/{label}_{name}.png" for name in PLOT_NAMES]
 
 # Define a function to generate EDA plots
-def save_eda_plots(df, label):
+def save_eda_plots(df, label, output_dir=OUTPUT_DIR):
+    os.makedirs(output_dir, exist_ok=True)
+
     # Histograms
     df.hist(figsize=(12, 10), bins=20, edgecolor='black')
     plt.suptitle(f'{label} - Feature Distributions')
@@ -61,8 +67,17 @@ def save_eda_plots(df, label):
     plt.savefig(f"{output_dir}/{label}_06_insulin_violinplot.png")
     plt.close()
 
-# Run EDA for both datasets
-save_eda_plots(df_raw, "raw")
-save_eda_plots(df_processed, "processed")
+def plot_dataset(path, label, output_dir=OUTPUT_DIR):
+    """Load a dataset (memory-mapped column bundle, converted from CSV on first use) and plot it."""
+    save_eda_plots(load_dataset(path), label, output_dir)
+    return plot_paths(label, output_dir)
+
+def main():
+    # Run EDA for both datasets
+    plot_dataset('diabetes.csv', "raw")  # raw/original dataset
+    plot_dataset('processed_diabetes.csv', "processed")  # cleaned/processed dataset
+
+    print(f"✅ EDA plots saved to the '{OUTPUT_DIR}' folder.")
 
-print(f"✅ EDA plots saved to the '{output_dir}' folder.")
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,167 @@
+import numpy as np
+import sklearn
+
+# scikit-learn >= 1.4 stores per-class fractions in tree_.value for classifiers;
+# older versions store weighted counts that predict_proba normalizes on the fly.
+_SKLEARN_VERSION = tuple(int(part) for part in sklearn.__version__.split('.')[:2])
+_VALUES_ARE_FRACTIONS = _SKLEARN_VERSION >= (1, 4)
+
+# Rows evaluated together in predict_proba; bounds the (rows x trees) work arrays
+BLOCK_SIZE = 2048
+
+def _leaf_probabilities(tree):
+    """Per-node class probabilities exactly as DecisionTreeClassifier.predict_proba returns them."""
+    value = tree.value[:, 0, :]
+    if _VALUES_ARE_FRACTIONS:
+        return np.array(value, dtype=np.float64)
+    normalizer = value.sum(axis=1)[:, np.newaxis]
+    normalizer[normalizer == 0.0] = 1.0
+    return value / normalizer
+
+class CompiledForest:
+    """
+    Array-backed random forest for fast inference.
+
+    All trees are flattened into one set of contiguous node arrays. Leaves point
+    back at themselves, so every tree can be advanced one level per step with a
+    handful of vectorized numpy operations, walking all trees at once.
+
+    Results are bit-identical to the source RandomForestClassifier: inputs are
+    rounded to float32 like sklearn does, and per-tree probabilities are summed
+    sequentially in estimator order before averaging.
+    """
+
+    def __init__(self, feature, threshold, children, values, roots, classes, max_depth, n_features):
+        self.feature = feature
+        self.threshold = threshold
+        self.children = children
+        self.values = values
+        self.roots = roots
+        self.classes_ = classes
+        self.max_depth = max_depth
+        self.n_features_in_ = n_features
+
+    @property
+    def n_estimators(self):
+        return len(self.roots)
+
+    @property
+    def nbytes(self):
+        """Total size of the node arrays in bytes."""
+        return sum(array.nbytes for array in (self.feature, self.threshold, self.children,
+                                              self.values, self.roots))
+
+    def _prepare(self, X):
+        # sklearn evaluates splits on float32 inputs; the round trip keeps that behaviour
+        X = np.asarray(X, dtype=np.float32).astype(np.float64)
+        if X.ndim == 1:
+            X = X.reshape(1, -1)
+        if X.shape[1] != self.n_features_in_:
+            raise ValueError(f"Expected {self.n_features_in_} features, got {X.shape[1]}")
+        return X
+
+    def apply(self, X):
+        """
+        Return the global leaf index reached in every tree.
+
+        Parameters:
+        -----------
+        X : array-like of shape (n_samples, n_features)
+
+        Returns:
+        --------
+        numpy.ndarray
+            Leaf indices of shape (n_samples, n_estimators)
+        """
+        X = self._prepare(X)
+        n_samples = X.shape[0]
+        node = np.tile(self.roots, (n_samples, 1))
+        rows = np.arange(n_samples)[:, np.newaxis]
+        for _ in range(self.max_depth):
+            go_right = X[rows, self.feature[node]] > self.threshold[node]
+            node = self.children[node, go_right.view(np.int8)]
+        return node
+
+    def predict_proba(self, X):
+        """
+        Predict class probabilities, matching RandomForestClassifier.predict_proba.
+
+        Parameters:
+        -----------
+        X : array-like of shape (n_samples, n_features)
+
+        Returns:
+        --------
+        numpy.ndarray
+            Probabilities of shape (n_samples, n_classes)
+        """
+        X = self._prepare(X)
+        proba = np.empty((X.shape[0], self.values.shape[1]), dtype=np.float64)
+        for start in range(0, X.shape[0], BLOCK_SIZE):
+            leaf_values = self.values[self.apply(X[start:start + BLOCK_SIZE])]
+            # Sequential accumulation in tree order reproduces sklearn's rounding
+            proba[start:start + BLOCK_SIZE] = np.cumsum(leaf_values, axis=1)[:, -1]
+        proba /= self.n_estimators
+        return proba
+
+    def predict(self, X):
+        """Predict class labels, matching RandomForestClassifier.predict."""
+        return self.classes_.take(np.argmax(self.predict_proba(X), axis=1))
+
+    def predict_one(self, x):
+        """
+        Score a single row, walking the forest once.
+
+        Returns:
+        --------
+        tuple
+            (prediction, probability) where probability is for the positive class
+        """
+        proba = self.predict_proba(x)[0]
+        return self.classes_[np.argmax(proba)], proba[-1]
+
+def compile_forest(model):
+    """
+    Flatten a fitted RandomForestClassifier into a CompiledForest.
+
+    Parameters:
+    -----------
+    model : sklearn.ensemble.RandomForestClassifier
+        Fitted single-output classifier
+
+    Returns:
+    --------
+    CompiledForest
+    """
+    if getattr(model, 'n_outputs_', 1) != 1:
+        raise ValueError("Only single-output forests can be compiled")
+
+    features, thresholds, children, values, roots = [], [], [], [], []
+    offset = 0
+    max_depth = 0
+    for estimator in model.estimators_:
+        tree = estimator.tree_
+        node_ids = np.arange(tree.node_count)
+        is_leaf = tree.children_left == -1
+
+        left = np.where(is_leaf, node_ids, tree.children_left) + offset
+        right = np.where(is_leaf, node_ids, tree.children_right) + offset
+        features.append(np.where(is_leaf, 0, tree.feature))
+        thresholds.append(np.where(is_leaf, 0.0, tree.threshold))
+        children.append(np.column_stack([left, right]))
+        values.append(_leaf_probabilities(tree))
+        roots.append(offset)
+
+        offset += tree.node_count
+        max_depth = max(max_depth, tree.max_depth)
+
+    return CompiledForest(
+        feature=np.ascontiguousarray(np.concatenate(features), dtype=np.intp),
+        threshold=np.ascontiguousarray(np.concatenate(thresholds), dtype=np.float64),
+        children=np.ascontiguousarray(np.concatenate(children), dtype=np.intp),
+        values=np.ascontiguousarray(np.concatenate(values), dtype=np.float64),
+        roots=np.asarray(roots, dtype=np.intp),
+        classes=np.asarray(model.classes_),
+        max_depth=int(max_depth),
+        n_features=int(model.n_features_in_),
+    )
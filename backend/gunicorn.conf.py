@@ -0,0 +1,13 @@
+import os
+
+# gunicorn -c gunicorn.conf.py   (run from the backend directory)
+wsgi_app = 'wsgi:app'
+bind = os.getenv('BIND', '0.0.0.0:5000')
+workers = int(os.getenv('WEB_CONCURRENCY', 2))
+threads = int(os.getenv('GUNICORN_THREADS', 4))
+timeout = int(os.getenv('GUNICORN_TIMEOUT', 60))
+
+# Import the app and run warm_up() once in the master, then fork: workers share
+# the loaded model pages copy-on-write instead of each loading their own copy.
+# Set SESSION_BACKEND=redis when running more than one worker.
+preload_app = True
@@ -0,0 +1,120 @@
+from itertools import combinations
+
+import numpy as np
+from scipy.spatial import cKDTree
+from sklearn.impute import KNNImputer
+
+class KDTreeImputer:
+    """
+    Distance-weighted k-nearest-neighbour imputation backed by prebuilt KD-trees.
+
+    Fitting imputes the training rows once with scikit-learn's KNNImputer, so
+    the fit_transform output is unchanged, and keeps the completed rows as the
+    reference set. A query row is filled from its nearest reference rows over
+    the columns it does have. One KD-tree is built per subset of present
+    columns, so a lookup is a tree query rather than a scan of every row.
+
+    Neighbours and weights follow KNNImputer's nan_euclidean distance with
+    weights='distance': the distance rescaling for missing coordinates is the
+    same for every candidate donor and so does not change the result. Rows
+    with nothing present are filled with the reference column means.
+
+    Parameters:
+    -----------
+    n_neighbors : int
+        Donor rows averaged per imputed value
+    leaf_size : int
+        KD-tree leaf size
+    """
+
+    def __init__(self, n_neighbors=5, leaf_size=8):
+        self.n_neighbors = n_neighbors
+        self.leaf_size = leaf_size
+
+    def fit_transform(self, X):
+        """
+        Fit on rows with NaN for missing values and return them imputed.
+
+        Parameters:
+        -----------
+        X : array-like of shape (n_samples, n_features)
+
+        Returns:
+        --------
+        numpy.ndarray
+            The imputed rows, which become the reference set
+        """
+        columns = getattr(X, 'columns', None)
+        reference = KNNImputer(n_neighbors=self.n_neighbors, weights='distance').fit_transform(
+            np.asarray(X, dtype=np.float64))
+        self.feature_names_in_ = None if columns is None else np.asarray(columns, dtype=object)
+        self.n_features_in_ = reference.shape[1]
+        self.reference_ = reference
+        self.means_ = reference.mean(axis=0)
+        # One tree per proper, non-empty subset of present columns, keyed by the
+        # bitmask of the columns that are missing
+        self._bits = 1 << np.arange(self.n_features_in_)
+        self._all_missing = int(self._bits.sum())
+        self.trees_ = {}
+        for size in range(1, self.n_features_in_):
+            for present in combinations(range(self.n_features_in_), size):
+                absent = np.setdiff1d(np.arange(self.n_features_in_), present)
+                self.trees_[int(self._bits[absent].sum())] = (
+                    np.array(present), absent,
+                    cKDTree(reference[:, present], leafsize=self.leaf_size, balanced_tree=False))
+        return reference.copy()
+
+    def fit(self, X):
+        self.fit_transform(X)
+        return self
+
+    def transform(self, X):
+        """
+        Fill NaN entries of one or many rows.
+
+        Rows are grouped by which columns are missing, and each group is
+        answered with one batched tree query.
+
+        Parameters:
+        -----------
+        X : array-like of shape (n_samples, n_features)
+
+        Returns:
+        --------
+        numpy.ndarray
+            A float64 copy of X with every NaN replaced
+        """
+        X = np.array(X, dtype=np.float64, ndmin=2)
+        if X.shape[1] != self.n_features_in_:
+            raise ValueError(f"Expected {self.n_features_in_} features, got {X.shape[1]}")
+        codes = np.isnan(X) @ self._bits
+        incomplete = np.flatnonzero(codes)
+        if len(incomplete) == 0:
+            return X
+
+        if len(incomplete) == 1:
+            self._fill(X, incomplete, int(codes[incomplete[0]]))
+        else:
+            for code in np.unique(codes[incomplete]):
+                self._fill(X, incomplete[codes[incomplete] == code], int(code))
+        return X
+
+    def _fill(self, X, rows, code):
+        if code == self._all_missing:
+            X[rows] = self.means_
+            return
+        present, absent, tree = self.trees_[code]
+        # A list of ranks keeps the results 2-D for k=1; like KNNImputer, never ask for more donors than exist
+        k = min(self.n_neighbors, len(self.reference_))
+        distances, neighbors = tree.query(X[rows][:, present], k=list(range(1, k + 1)))
+        X[rows[:, np.newaxis], absent] = self._weighted_mean(distances, neighbors, absent)
+
+    def _weighted_mean(self, distances, neighbors, absent):
+        # Inverse-distance weights; an exact match takes all the weight, as in KNNImputer
+        with np.errstate(divide='ignore'):
+            weights = 1.0 / distances
+        exact = np.isinf(weights)
+        has_exact = exact.any(axis=1)
+        weights[has_exact] = exact[has_exact]
+        donors = self.reference_[neighbors][:, :, absent]
+        return (donors * weights[:, :, np.newaxis]).sum(axis=1) / weights.sum(axis=1)[:, np.newaxis]
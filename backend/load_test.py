@@ -0,0 +1,434 @@
+import argparse
+import asyncio
+import http.cookiejar
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import threading
+import time
+import urllib.request
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+
+import numpy as np
+
+from conversation import VALIDATORS, Choice
+
+# Main answers for each simulated user type; values are drawn uniformly from each range.
+# Ranges are chosen so that every follow-up branch is exercised by some scenario.
+SCENARIOS = {
+    "female_normal": {"Gender": "female", "Pregnancies": (0, 4), "Glucose": (80, 120),
+                      "BloodPressure": (95, 125), "BMI": (19, 24), "Age": (25, 60)},
+    "male_normal": {"Gender": "male", "Glucose": (80, 120), "BloodPressure": (95, 125),
+                    "BMI": (19, 24), "Age": (25, 60)},
+    "high_glucose": {"Gender": "female", "Pregnancies": (3, 10), "Glucose": (150, 250),
+                     "BloodPressure": (95, 125), "BMI": (19, 24), "Age": (30, 60)},
+    "low_glucose_low_bp": {"Gender": "male", "Glucose": (45, 65), "BloodPressure": (65, 85),
+                           "BMI": (19, 24), "Age": (25, 60)},
+    "hypertensive_overweight": {"Gender": "male", "Glucose": (90, 130), "BloodPressure": (150, 200),
+                                "BMI": (28, 40), "Age": (40, 64)},
+    "underweight_elderly": {"Gender": "female", "Pregnancies": (0, 6), "Glucose": (80, 130),
+                            "BloodPressure": (95, 125), "BMI": (14, 18), "Age": (66, 80)},
+}
+DEFAULT_RANGES = {"Pregnancies": (0, 6), "SkinThickness": (10, 40), "Insulin": (5, 200),
+                  "DiabetesPedigreeFunction": (0.1, 1.5)}
+INVALID_ANSWERS = ["", "maybe", "abc", "999", "-3"]
+
+class FlaskClient:
+    """Drives the app in-process through Flask's test client (one cookie jar per client)."""
+
+    target = "flask-test-client"
+
+    def __init__(self, app):
+        self._client = app.test_client()
+
+    def request(self, method, path, payload=None):
+        response = self._client.open(path, method=method, json=payload)
+        return response.status_code, response.get_json()
+
+async def call_asgi(app, method, path, body=b'', headers=()):
+    """
+    Send one request straight to an ASGI app.
+
+    Returns:
+    --------
+    tuple
+        (status, headers as a list of (name, value) str pairs, body bytes)
+    """
+    path, _, query = path.partition('?')
+    scope = {'type': 'http', 'http_version': '1.1', 'method': method, 'scheme': 'http', 'path': path,
+             'raw_path': path.encode(), 'query_string': query.encode(), 'root_path': '',
+             'headers': [(name.lower().encode('latin1'), value.encode('latin1')) for name, value in headers],
+             'server': ('testserver', 80), 'client': ('127.0.0.1', 0)}
+    messages = [{'type': 'http.request', 'body': body, 'more_body': False}]
+    response = {'body': b''}
+
+    async def receive():
+        if messages:
+            return messages.pop()
+        # Nothing more to read; park like a client that stays connected
+        await asyncio.Event().wait()
+
+    async def send(message):
+        if message['type'] == 'http.response.start':
+            response['status'] = message['status']
+            response['headers'] = [(name.decode('latin1'), value.decode('latin1'))
+                                   for name, value in message['headers']]
+        else:
+            response['body'] += message.get('body', b'')
+
+    await app(scope, receive, send)
+    return response['status'], response['headers'], response['body']
+
+class AsgiClient:
+    """
+    Drives an ASGI app in-process (one cookie jar per client).
+
+    Requests from every client run on one shared event loop thread, the way
+    an ASGI server multiplexes connections.
+    """
+
+    target = "asgi-in-process"
+
+    def __init__(self, app, loop):
+        self._app = app
+        self._loop = loop
+        self._cookie = None
+
+    @staticmethod
+    def start_loop():
+        """Start an event loop on a daemon thread and return it."""
+        loop = asyncio.new_event_loop()
+        threading.Thread(target=loop.run_forever, daemon=True).start()
+        return loop
+
+    def request(self, method, path, payload=None):
+        headers = [] if payload is None else [('Content-Type', 'application/json')]
+        if self._cookie:
+            headers.append(('Cookie', self._cookie))
+        body = b'' if payload is None else json.dumps(payload).encode()
+        status, response_headers, content = asyncio.run_coroutine_threadsafe(
+            call_asgi(self._app, method, path, body, headers), self._loop).result(30)
+        for name, value in response_headers:
+            if name == 'set-cookie':
+                self._cookie = value.split(';', 1)[0]
+        return status, json.loads(content) if content else None
+
+class HttpClient:
+    """Drives a running server over HTTP with its own cookie jar."""
+
+    def __init__(self, base_url):
+        self.target = base_url
+        self._base_url = base_url.rstrip('/')
+        self._opener = urllib.request.build_opener(urllib.request.HTTPCookieProcessor(http.cookiejar.CookieJar()))
+
+    def request(self, method, path, payload=None):
+        data = None if payload is None else json.dumps(payload).encode()
+        req = urllib.request.Request(self._base_url + path, data=data, method=method,
+                                     headers={'Content-Type': 'application/json'})
+        with self._opener.open(req, timeout=30) as response:
+            return response.status, json.loads(response.read())
+
+def _answer_for(field, scenario, rng):
+    """A valid answer for a field under a scenario."""
+    value = scenario.get(field, DEFAULT_RANGES.get(field))
+    if isinstance(value, str):
+        return value
+    if value is not None:
+        low, high = value
+        return str(round(rng.uniform(low, high), 3 if high < 5 else 1))
+    validator = VALIDATORS[field]
+    if isinstance(validator, Choice):
+        return rng.choice(sorted(set(validator.answers.values())))
+    return str(rng.randint(int(validator.low or 0), int(min(validator.high or 8, 8))))
+
+class Recorder:
+    """Thread-safe collection of per-endpoint latencies."""
+
+    def __init__(self):
+        self.latencies = defaultdict(list)
+        self.errors = defaultdict(int)
+        self.scenarios = defaultdict(int)
+        self._lock = threading.Lock()
+
+    def call(self, client, method, path, payload=None):
+        start = time.perf_counter()
+        try:
+            status, body = client.request(method, path, payload)
+            failed = status >= 500 or body is None
+        except Exception as e:
+            print(f"Request failed: {method} {path}: {str(e)}")
+            status, body, failed = None, None, True
+        elapsed = time.perf_counter() - start
+        with self._lock:
+            self.latencies[f"{method} {path}"].append(elapsed)
+            if failed:
+                self.errors[f"{method} {path}"] += 1
+        return body or {}
+
+    def finish(self, scenario):
+        """Count a completed conversation of the given scenario."""
+        with self._lock:
+            self.scenarios[scenario] += 1
+
+def run_conversation(client, recorder, name, rng, invalid_rate=0.1, max_turns=80):
+    """
+    Play one full conversation: reset, answer every question and follow-up, predict.
+
+    Returns:
+    --------
+    bool
+        Whether the conversation reached a successful prediction
+    """
+    scenario = SCENARIOS[name]
+    recorder.call(client, 'POST', '/api/reset')
+    step = recorder.call(client, 'GET', '/api/current-question')
+    field = step.get('field')
+
+    for _ in range(max_turns):
+        if field is None:
+            break
+        if rng.random() < invalid_rate:
+            text = rng.choice(INVALID_ANSWERS)
+        else:
+            text = _answer_for(field, scenario, rng)
+        response = recorder.call(client, 'POST', '/api/process-text', {'text': text})
+        if response.get('is_complete'):
+            break
+        field = response.get('current_question')
+    else:
+        return False
+
+    prediction = recorder.call(client, 'GET', '/api/predict')
+    recorder.finish(name)
+    return prediction.get('status') == 'success'
+
+def summarize(recorder, elapsed, workers):
+    """Percentiles per endpoint and overall throughput, in milliseconds and requests/sec."""
+    endpoints = {}
+    total = 0
+    for endpoint, samples in sorted(recorder.latencies.items()):
+        ms = np.array(samples) * 1000
+        total += len(ms)
+        endpoints[endpoint] = {
+            'count': len(ms),
+            'errors': recorder.errors.get(endpoint, 0),
+            'mean_ms': float(ms.mean()),
+            'p50_ms': float(np.percentile(ms, 50)),
+            'p95_ms': float(np.percentile(ms, 95)),
+            'p99_ms': float(np.percentile(ms, 99)),
+            'rps': len(ms) / elapsed,
+        }
+    return {
+        'total': {
+            'requests': total,
+            'errors': sum(recorder.errors.values()),
+            'elapsed_s': elapsed,
+            'rps': total / elapsed,
+            'rps_per_worker': total / elapsed / workers,
+        },
+        'endpoints': endpoints,
+        'scenarios': dict(recorder.scenarios),
+    }
+
+def run_load_test(make_client, conversations=200, concurrency=4, workers=1, seed=0,
+                  invalid_rate=0.1, scenarios=None):
+    """
+    Drive simulated conversations against the API and collect latency statistics.
+
+    Parameters:
+    -----------
+    make_client : callable
+        Returns a new client (FlaskClient, AsgiClient or HttpClient); each thread gets its own session
+    conversations : int
+        Total conversations to run, spread round-robin over the scenarios
+    concurrency : int
+        Conversations in flight at once
+    workers : int
+        Server worker processes, used to report requests/sec per worker
+    seed : int
+        Seed for answer values, so runs are reproducible
+    invalid_rate : float
+        Probability of sending an invalid answer before a valid one
+    scenarios : list of str, optional
+        Scenario names to run (default: all)
+
+    Returns:
+    --------
+    dict
+        Run metadata, overall throughput, per-endpoint percentiles and failures
+    """
+    names = scenarios or list(SCENARIOS)
+    recorder = Recorder()
+    local = threading.local()
+    failures = []
+
+    def task(i):
+        if not hasattr(local, 'client'):
+            local.client = make_client()
+        ok = run_conversation(local.client, recorder, names[i % len(names)], random.Random(seed * 100003 + i),
+                              invalid_rate=invalid_rate)
+        if not ok:
+            failures.append(i)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        list(executor.map(task, range(conversations)))
+    elapsed = time.perf_counter() - start
+
+    result = summarize(recorder, elapsed, workers)
+    result['failed_conversations'] = len(failures)
+    result['meta'] = {
+        'created_at': datetime.now(timezone.utc).isoformat(),
+        'conversations': conversations,
+        'concurrency': concurrency,
+        'workers': workers,
+        'seed': seed,
+        'invalid_rate': invalid_rate,
+        'python': platform.python_version(),
+        'machine': platform.machine(),
+    }
+    return result
+
+def compare(baseline, current, tolerance=0.2, min_delta_ms=0.5):
+    """
+    Compare a run against a saved baseline.
+
+    A latency percentile regresses when it grows by more than ``tolerance``
+    (as a fraction) and by at least ``min_delta_ms``; throughput regresses when
+    requests/sec per worker drops by more than ``tolerance``.
+
+    Returns:
+    --------
+    list of str
+        One line per regression; empty when the run is within tolerance
+    """
+    regressions = []
+    for endpoint, stats in current['endpoints'].items():
+        before = baseline['endpoints'].get(endpoint)
+        if before is None:
+            continue
+        for key in ('p50_ms', 'p95_ms', 'p99_ms'):
+            if stats[key] > before[key] * (1 + tolerance) and stats[key] - before[key] >= min_delta_ms:
+                regressions.append(f"{endpoint} {key}: {before[key]:.2f} -> {stats[key]:.2f}")
+    rps_before = baseline['total']['rps_per_worker']
+    rps_now = current['total']['rps_per_worker']
+    if rps_now < rps_before * (1 - tolerance):
+        regressions.append(f"rps_per_worker: {rps_before:.1f} -> {rps_now:.1f}")
+    return regressions
+
+def print_report(result):
+    print(f"{'endpoint':<28}{'count':>8}{'errors':>8}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'rps':>10}")
+    for endpoint, stats in result['endpoints'].items():
+        print(f"{endpoint:<28}{stats['count']:>8}{stats['errors']:>8}{stats['p50_ms']:>10.2f}"
+              f"{stats['p95_ms']:>10.2f}{stats['p99_ms']:>10.2f}{stats['rps']:>10.1f}")
+    total = result['total']
+    print(f"\n{total['requests']} requests in {total['elapsed_s']:.2f}s: {total['rps']:.1f} req/s, "
+          f"{total['rps_per_worker']:.1f} req/s per worker, {total['errors']} errors, "
+          f"{result['failed_conversations']} failed conversations")
+
+def start_server(command, port, name):
+    """Start a server process and wait until it answers."""
+    process = subprocess.Popen(command, cwd=os.path.dirname(os.path.abspath(__file__)))
+    url = f'http://127.0.0.1:{port}'
+    deadline = time.monotonic() + 60
+    while time.monotonic() < deadline:
+        try:
+            HttpClient(url).request('GET', '/api/current-question')
+            return process, url
+        except OSError:
+            if process.poll() is not None:
+                raise RuntimeError(f"{name} exited during startup")
+            time.sleep(0.25)
+    process.terminate()
+    raise RuntimeError(f"{name} did not start within 60s")
+
+def start_gunicorn(workers, port):
+    """Start the app under gunicorn and wait until it answers."""
+    if workers > 1 and os.getenv('SESSION_BACKEND', 'memory') != 'redis':
+        print("Warning: in-memory sessions are per worker; set SESSION_BACKEND=redis for multi-worker runs.")
+    return start_server([sys.executable, '-m', 'gunicorn', '-w', str(workers), '-b', f'127.0.0.1:{port}',
+                         '--preload', 'wsgi:app'], port, 'gunicorn')
+
+def start_uvicorn(workers, port):
+    """Start the ASGI app under uvicorn and wait until it answers."""
+    if workers > 1 and os.getenv('SESSION_BACKEND', 'memory') != 'redis':
+        print("Warning: in-memory sessions are per worker; set SESSION_BACKEND=redis for multi-worker runs.")
+    return start_server([sys.executable, '-m', 'uvicorn', 'asgi:app', '--workers', str(workers),
+                         '--host', '127.0.0.1', '--port', str(port), '--no-access-log'], port, 'uvicorn')
+
+def main():
+    parser = argparse.ArgumentParser(description='Load-test the chatbot API with simulated conversations.')
+    parser.add_argument('--conversations', type=int, default=200, help='conversations to run (default: 200)')
+    parser.add_argument('--concurrency', type=int, default=4, help='conversations in flight (default: 4)')
+    parser.add_argument('--seed', type=int, default=0, help='seed for answer values (default: 0)')
+    parser.add_argument('--invalid-rate', type=float, default=0.1,
+                        help='chance of an invalid answer on each turn (default: 0.1)')
+    parser.add_argument('--scenario', action='append', choices=sorted(SCENARIOS),
+                        help='scenario to run (repeatable; default: all)')
+    target = parser.add_mutually_exclusive_group()
+    target.add_argument('--url', help='base URL of a running server (default: in-process test client)')
+    target.add_argument('--gunicorn', type=int, metavar='WORKERS', help='start gunicorn with this many workers')
+    target.add_argument('--uvicorn', type=int, metavar='WORKERS',
+                        help='start the ASGI app under uvicorn with this many workers')
+    target.add_argument('--asgi', action='store_true', help='drive the ASGI app in-process instead of Flask')
+    parser.add_argument('--port', type=int, default=5055, help='port for --gunicorn/--uvicorn (default: 5055)')
+    parser.add_argument('--workers', type=int, default=None,
+                        help='server workers behind --url, for per-worker throughput (default: 1)')
+    parser.add_argument('--save', help='write the results as a JSON baseline')
+    parser.add_argument('--compare', help='baseline JSON to compare against; exits 1 on regression')
+    parser.add_argument('--tolerance', type=float, default=0.2,
+                        help='allowed fractional slowdown before flagging a regression (default: 0.2)')
+    args = parser.parse_args()
+
+    process = None
+    if args.gunicorn:
+        process, url = start_gunicorn(args.gunicorn, args.port)
+        make_client, workers = (lambda: HttpClient(url)), args.gunicorn
+    elif args.uvicorn:
+        process, url = start_uvicorn(args.uvicorn, args.port)
+        make_client, workers = (lambda: HttpClient(url)), args.uvicorn
+    elif args.asgi:
+        from asgi import app
+        loop = AsgiClient.start_loop()
+        make_client, workers = (lambda: AsgiClient(app, loop)), 1
+    elif args.url:
+        make_client, workers = (lambda: HttpClient(args.url)), args.workers or 1
+    else:
+        from app import create_app
+        app = create_app()
+        make_client, workers = (lambda: FlaskClient(app)), 1
+
+    try:
+        result = run_load_test(make_client, conversations=args.conversations, concurrency=args.concurrency,
+                               workers=workers, seed=args.seed, invalid_rate=args.invalid_rate,
+                               scenarios=args.scenario)
+    finally:
+        if process is not None:
+            process.terminate()
+            process.wait()
+    result['meta']['target'] = make_client().target
+    print_report(result)
+
+    if args.save:
+        with open(args.save, 'w') as f:
+            json.dump(result, f, indent=2)
+        print(f"Baseline saved to {args.save}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        regressions = compare(baseline, result, tolerance=args.tolerance)
+        if regressions:
+            print("\nRegressions against baseline:")
+            for line in regressions:
+                print(f"  {line}")
+            sys.exit(1)
+        print("\nNo regressions against baseline.")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,186 @@
+import bisect
+import logging
+import os
+import random
+import threading
+import time
+from contextlib import contextmanager
+
+# Latency buckets in seconds, from sub-millisecond validation up to slow speech recognition
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+def _format_labels(names, values, extra=()):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in list(zip(names, values)) + list(extra)]
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+def _format_value(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+class Registry:
+    """A set of metrics rendered together in the Prometheus text exposition format."""
+
+    def __init__(self):
+        self._metrics = []
+        self._lock = threading.Lock()
+
+    def register(self, metric):
+        with self._lock:
+            self._metrics.append(metric)
+        return metric
+
+    def render(self):
+        with self._lock:
+            metrics = list(self._metrics)
+        return ''.join(metric.render() for metric in metrics)
+
+# Metrics are per process; under gunicorn each worker reports its own series
+REGISTRY = Registry()
+
+class _Metric:
+    kind = None
+
+    def __init__(self, name, documentation, labelnames=(), registry=REGISTRY):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._series = {}
+        self._lock = threading.Lock()
+        if registry is not None:
+            registry.register(self)
+
+    def _key(self, labels):
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}\n", f"# TYPE {self.name} {self.kind}\n"]
+        with self._lock:
+            series = sorted(self._series.items())
+            lines += [line for key, state in series for line in self._render_series(key, state)]
+        return ''.join(lines)
+
+class Counter(_Metric):
+    """Monotonically increasing count, e.g. requests or errors."""
+
+    kind = 'counter'
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._series[key] = self._series.get(key, 0) + amount
+
+    def value(self, **labels):
+        with self._lock:
+            return self._series.get(self._key(labels), 0)
+
+    def _render_series(self, key, value):
+        yield f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}\n"
+
+class Histogram(_Metric):
+    """
+    Distribution of observed values (seconds for timers) over fixed buckets.
+
+    Parameters:
+    -----------
+    buckets : tuple of float
+        Upper bounds of the buckets in increasing order; +Inf is implied
+    """
+
+    kind = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS, registry=REGISTRY):
+        self.buckets = tuple(buckets)
+        super().__init__(name, documentation, labelnames, registry)
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            state = self._series.get(key)
+            if state is None:
+                state = self._series[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            state[0][index] += 1
+            state[1] += value
+            state[2] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        """Observe the wall-clock duration of the with-block, even if it raises."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def count(self, **labels):
+        with self._lock:
+            state = self._series.get(self._key(labels))
+            return 0 if state is None else state[2]
+
+    def _render_series(self, key, state):
+        counts, total, count = state
+        cumulative = 0
+        for bound, bucket_count in zip(self.buckets + (float('inf'),), counts):
+            cumulative += bucket_count
+            le = (('le', _format_value(bound)),)
+            yield f"{self.name}_bucket{_format_labels(self.labelnames, key, le)} {cumulative}\n"
+        yield f"{self.name}_sum{_format_labels(self.labelnames, key)} {_format_value(total)}\n"
+        yield f"{self.name}_count{_format_labels(self.labelnames, key)} {count}\n"
+
+REQUESTS = Counter('http_requests_total', 'HTTP requests by route, method and status code.',
+                   ('route', 'method', 'status'))
+REQUEST_SECONDS = Histogram('http_request_duration_seconds', 'HTTP request latency by route.', ('route',))
+STAGE_SECONDS = Histogram('stage_duration_seconds',
+                          'Time spent in hot-path stages (audio_decode, speech_recognition, validation, '
+                          'inference, render).', ('stage',))
+ERRORS = Counter('app_errors_total', 'Errors by stage and error class.', ('stage', 'error'))
+
+def timed(stage):
+    """Context manager recording the duration of a hot-path stage."""
+    return STAGE_SECONDS.time(stage=stage)
+
+def record_error(stage, error):
+    """Count an error for a stage; error is an exception or a short class name."""
+    ERRORS.inc(stage=stage, error=error if isinstance(error, str) else type(error).__name__)
+
+class SampledFilter(logging.Filter):
+    """
+    Pass only a fraction of records below WARNING, so per-request debug and
+    info logging stays cheap under load; warnings and errors always pass.
+    """
+
+    def __init__(self, sample_rate=1.0):
+        super().__init__()
+        self.sample_rate = sample_rate
+
+    def filter(self, record):
+        return record.levelno >= logging.WARNING or self.sample_rate >= 1.0 or random.random() < self.sample_rate
+
+def configure_logging(level=None, sample_rate=None):
+    """
+    Set up leveled, sampled logging for the service.
+
+    LOG_LEVEL         minimum level (default 'INFO')
+    LOG_SAMPLE_RATE   fraction of DEBUG/INFO records kept (default 1.0)
+
+    A handler is only added when the root logger has none, so a server's own
+    logging configuration (e.g. gunicorn's) is left in place.
+    """
+    level = level or os.getenv('LOG_LEVEL', 'INFO')
+    sample_rate = float(os.getenv('LOG_SAMPLE_RATE', 1.0)) if sample_rate is None else sample_rate
+
+    root = logging.getLogger()
+    root.setLevel(level.upper())
+    if not root.handlers:
+        handler = logging.StreamHandler()
+        handler.setFormatter(logging.Formatter('%(asctime)s %(levelname)s %(name)s: %(message)s'))
+        root.addHandler(handler)
+    for handler in root.handlers:
+        if not any(isinstance(f, SampledFilter) for f in handler.filters):
+            handler.addFilter(SampledFilter(sample_rate))
@@ -0,0 +1,437 @@
+import hashlib
+import json
+import logging
+import os
+import re
+import shutil
+import tempfile
+import threading
+from contextlib import contextmanager
+from datetime import datetime, timezone
+
+from pipeline import PIPELINE_PATH, load_pipeline, save_pipeline
+from prediction_cache import PredictionCache
+
+logger = logging.getLogger(__name__)
+
+REGISTRY_DIR = 'model_registry'
+ARTIFACT_NAME = 'pipeline.joblib'
+METADATA_NAME = 'metadata.json'
+CURRENT_NAME = 'CURRENT'
+CANDIDATE_NAME = 'CANDIDATE'
+
+_VERSION_PATTERN = re.compile(r'^v(\d+)$')
+
+def _sha256(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+def _write_atomic(path, text):
+    """Replace a small file so readers see either the old or the new contents, never a mix."""
+    directory = os.path.dirname(path) or '.'
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.tmp-')
+    try:
+        with os.fdopen(fd, 'w') as f:
+            f.write(text)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+def list_versions(registry_dir=REGISTRY_DIR):
+    """Published versions, oldest first."""
+    if not os.path.isdir(registry_dir):
+        return []
+    numbered = []
+    for name in os.listdir(registry_dir):
+        match = _VERSION_PATTERN.match(name)
+        if match and os.path.exists(os.path.join(registry_dir, name, METADATA_NAME)):
+            numbered.append((int(match.group(1)), name))
+    return [name for _, name in sorted(numbered)]
+
+def _read_pointer(registry_dir, name):
+    try:
+        with open(os.path.join(registry_dir, name)) as f:
+            return f.read().strip() or None
+    except FileNotFoundError:
+        return None
+
+def current_version(registry_dir=REGISTRY_DIR):
+    """The version named by the CURRENT pointer, or None if nothing has been activated."""
+    return _read_pointer(registry_dir, CURRENT_NAME)
+
+def candidate_version(registry_dir=REGISTRY_DIR):
+    """The version named by the CANDIDATE pointer, or None if no candidate is under evaluation."""
+    return _read_pointer(registry_dir, CANDIDATE_NAME)
+
+def read_metadata(version, registry_dir=REGISTRY_DIR):
+    with open(os.path.join(registry_dir, version, METADATA_NAME)) as f:
+        return json.load(f)
+
+def activate(version, registry_dir=REGISTRY_DIR):
+    """Point CURRENT at a published version; serving processes pick it up on their next poll."""
+    if not os.path.exists(os.path.join(registry_dir, version, METADATA_NAME)):
+        raise ValueError(f"Unknown model version: {version}")
+    _write_atomic(os.path.join(registry_dir, CURRENT_NAME), version + '\n')
+    return version
+
+def set_candidate(version, registry_dir=REGISTRY_DIR):
+    """
+    Point CANDIDATE at a published version to evaluate it against live traffic
+    (shadow scoring and A/B routing); None ends the evaluation.
+    """
+    path = os.path.join(registry_dir, CANDIDATE_NAME)
+    if version is None:
+        if os.path.exists(path):
+            os.remove(path)
+        return None
+    if not os.path.exists(os.path.join(registry_dir, version, METADATA_NAME)):
+        raise ValueError(f"Unknown model version: {version}")
+    _write_atomic(path, version + '\n')
+    return version
+
+def publish(pipeline, registry_dir=REGISTRY_DIR, metrics=None, make_current=True):
+    """
+    Store a pipeline as the next numbered version.
+
+    The artifact and its metadata are written to a temporary directory that is
+    renamed into place, so a version directory is either complete or absent.
+
+    Parameters:
+    -----------
+    pipeline : DiabetesPipeline
+        Pipeline built by pipeline.build_pipeline
+    registry_dir : str
+        Registry root; created if missing
+    metrics : dict, optional
+        Training/evaluation metrics to record (e.g. accuracy)
+    make_current : bool
+        Whether to activate the new version immediately
+
+    Returns:
+    --------
+    str
+        The new version name (e.g. 'v0003')
+    """
+    os.makedirs(registry_dir, exist_ok=True)
+    staging = tempfile.mkdtemp(dir=registry_dir, prefix='.staging-')
+    try:
+        artifact = save_pipeline(pipeline, os.path.join(staging, ARTIFACT_NAME))
+        metadata = {
+            'published_at': datetime.now(timezone.utc).isoformat(),
+            'feature_columns': list(pipeline.feature_columns),
+            'pipeline_version': pipeline.version,
+            'sha256': _sha256(artifact),
+            'size_bytes': os.path.getsize(artifact),
+            'metrics': dict(metrics or {}),
+            'training': dict(pipeline.metadata),
+        }
+        # Claim the next number; os.rename fails if another publisher took it first
+        while True:
+            versions = list_versions(registry_dir)
+            number = int(versions[-1][1:]) + 1 if versions else 1
+            version = f"v{number:04d}"
+            metadata['version'] = version
+            with open(os.path.join(staging, METADATA_NAME), 'w') as f:
+                json.dump(metadata, f, indent=2)
+            try:
+                os.rename(staging, os.path.join(registry_dir, version))
+                break
+            except OSError:
+                if not os.path.exists(os.path.join(registry_dir, version)):
+                    raise
+    except BaseException:
+        shutil.rmtree(staging, ignore_errors=True)
+        raise
+
+    if make_current:
+        activate(version, registry_dir)
+    return version
+
+def load_version(version, registry_dir=REGISTRY_DIR, verify=True):
+    """
+    Load a published pipeline, checking its checksum and feature order.
+
+    Returns:
+    --------
+    tuple
+        (pipeline, metadata)
+    """
+    metadata = read_metadata(version, registry_dir)
+    artifact = os.path.join(registry_dir, version, ARTIFACT_NAME)
+    if verify and _sha256(artifact) != metadata['sha256']:
+        raise ValueError(f"Checksum mismatch for model {version}; refusing to load it.")
+    pipeline = load_pipeline(artifact)
+    if list(pipeline.feature_columns) != metadata['feature_columns']:
+        raise ValueError(f"Model {version} feature order does not match its metadata.")
+    return pipeline, metadata
+
+class ModelHandle:
+    """
+    One loaded model version with its own prediction cache.
+
+    Requests hold a reference while they use it. After a newer version has been
+    swapped in, the handle is retired and its resources are dropped once the
+    last in-flight request releases it.
+    """
+
+    def __init__(self, version, pipeline, metadata, cache_size=4096, cache_ttl=3600):
+        self.version = version
+        self.pipeline = pipeline
+        self.metadata = metadata
+        self.prediction_cache = PredictionCache(pipeline, max_entries=cache_size, ttl=cache_ttl)
+        self._refs = 0
+        self._retired = False
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        with self._lock:
+            self._refs += 1
+        return self
+
+    def release(self):
+        with self._lock:
+            self._refs -= 1
+            drop = self._retired and self._refs == 0
+        if drop:
+            self._close()
+
+    def retire(self):
+        with self._lock:
+            self._retired = True
+            drop = self._refs == 0
+        if drop:
+            self._close()
+
+    @property
+    def refs(self):
+        return self._refs
+
+    def _close(self):
+        logger.info("Released model %s", self.version)
+        self.prediction_cache.clear()
+        self.pipeline = None
+
+class ModelManager:
+    """
+    Serves the registry's CURRENT model and swaps in new versions without a restart.
+
+    A background thread polls the CURRENT and CANDIDATE pointers. A new version
+    is loaded and verified off the request path, then swapped in with a single
+    assignment; requests already holding the previous handle finish on it.
+
+    Without a registry (no CURRENT pointer) the standalone pipeline artifact
+    written by train_model.py is served as version 'unversioned'.
+
+    While a CANDIDATE is set, it is loaded alongside the current model and
+    candidate_percent of sessions are routed to it (see routes_to_candidate).
+
+    Parameters:
+    -----------
+    registry_dir : str
+        Registry root
+    poll_interval : float
+        Seconds between checks of CURRENT; 0 disables the watcher
+    cache_size, cache_ttl : int, float
+        Prediction cache settings for each loaded version
+    fallback_path : str
+        Pipeline artifact used when the registry is empty
+    candidate_percent : float
+        Share of sessions (0-100) served by the candidate
+    """
+
+    def __init__(self, registry_dir=REGISTRY_DIR, poll_interval=10, cache_size=4096, cache_ttl=3600,
+                 fallback_path=PIPELINE_PATH, candidate_percent=0.0):
+        self.registry_dir = registry_dir
+        self.poll_interval = poll_interval
+        self.cache_size = cache_size
+        self.cache_ttl = cache_ttl
+        self.fallback_path = fallback_path
+        self.candidate_percent = candidate_percent
+        self._current = None
+        self._candidate = None
+        self._swap_lock = threading.Lock()
+        self._reload_lock = threading.Lock()
+        self._watcher_pid = None
+        self._watcher_lock = threading.Lock()
+        self._stop = threading.Event()
+        self.reload()
+
+    def _load(self, version):
+        if version is None:
+            pipeline = load_pipeline(self.fallback_path)
+            metadata = {'version': 'unversioned', 'training': dict(pipeline.metadata)}
+            return ModelHandle('unversioned', pipeline, metadata, self.cache_size, self.cache_ttl)
+        pipeline, metadata = load_version(version, self.registry_dir)
+        return ModelHandle(version, pipeline, metadata, self.cache_size, self.cache_ttl)
+
+    @property
+    def version(self):
+        return self._current.version
+
+    @property
+    def current(self):
+        return self._current
+
+    @property
+    def candidate(self):
+        """Handle of the candidate under evaluation, or None."""
+        return self._candidate
+
+    def reload(self):
+        """
+        Swap in the versions named by CURRENT and CANDIDATE if they differ from those loaded.
+
+        Returns:
+        --------
+        bool
+            Whether a new current version was swapped in
+        """
+        with self._reload_lock:
+            swapped = self._reload_current()
+            self._reload_candidate()
+            return swapped
+
+    def _reload_current(self):
+        version = current_version(self.registry_dir)
+        if self._current is not None and (version or 'unversioned') == self._current.version:
+            return False
+        try:
+            handle = self._load(version)
+        except Exception:
+            if self._current is None:
+                raise
+            logger.exception("Could not load model %s; still serving %s", version, self._current.version)
+            return False
+        with self._swap_lock:
+            previous, self._current = self._current, handle
+        if previous is not None:
+            logger.info("Swapped model %s -> %s", previous.version, handle.version)
+            previous.retire()
+        return True
+
+    def _reload_candidate(self):
+        version = candidate_version(self.registry_dir)
+        if version == self._current.version:
+            # Promoted (or never different): there is nothing left to compare against
+            version = None
+        loaded = self._candidate.version if self._candidate is not None else None
+        if version == loaded:
+            return
+        handle = None
+        if version is not None:
+            try:
+                handle = self._load(version)
+            except Exception:
+                logger.exception("Could not load candidate model %s", version)
+        with self._swap_lock:
+            previous, self._candidate = self._candidate, handle
+        if previous is not None:
+            previous.retire()
+        logger.info("Candidate model %s -> %s", loaded, handle.version if handle is not None else None)
+
+    def routes_to_candidate(self, key):
+        """
+        Whether the session identified by key is served by the candidate.
+
+        The decision is a hash of the key, so a session stays on one arm for
+        its whole lifetime and the split holds across gunicorn workers.
+        """
+        if self._candidate is None or self.candidate_percent <= 0 or not key:
+            return False
+        bucket = int.from_bytes(hashlib.blake2b(key.encode(), digest_size=8).digest(), 'big') % 10000
+        return bucket < self.candidate_percent * 100
+
+    @contextmanager
+    def acquire(self, candidate=False):
+        """
+        Hold a model for the duration of a request.
+
+        Parameters:
+        -----------
+        candidate : bool
+            Take the candidate instead of the current model; falls back to the
+            current model when no candidate is loaded
+        """
+        self._ensure_watcher()
+        with self._swap_lock:
+            handle = self._candidate if candidate and self._candidate is not None else self._current
+            handle.acquire()
+        try:
+            yield handle
+        finally:
+            handle.release()
+
+    def acquire_version(self, version):
+        """
+        Hold the current or candidate model only if it is still the given version.
+
+        Returns:
+        --------
+        ModelHandle or None
+            An acquired handle the caller must release, or None if that version
+            is no longer loaded
+        """
+        with self._swap_lock:
+            for handle in (self._current, self._candidate):
+                if handle is not None and handle.version == version:
+                    return handle.acquire()
+        return None
+
+    def _ensure_watcher(self):
+        # Threads do not survive fork, so each gunicorn worker starts its own watcher
+        if self.poll_interval <= 0 or self._watcher_pid == os.getpid():
+            return
+        with self._watcher_lock:
+            if self._watcher_pid == os.getpid():
+                return
+            self._watcher_pid = os.getpid()
+            threading.Thread(target=self._watch, name='model-watcher', daemon=True).start()
+
+    def _watch(self):
+        while not self._stop.wait(self.poll_interval):
+            try:
+                self.reload()
+            except Exception:
+                logger.exception("Model watcher failed")
+
+    def stop(self):
+        self._stop.set()
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Inspect the model registry or change the active version.')
+    parser.add_argument('--registry', default=REGISTRY_DIR, help=f'registry directory (default: {REGISTRY_DIR})')
+    commands = parser.add_subparsers(dest='command', required=True)
+    commands.add_parser('list', help='list published versions')
+    activate_parser = commands.add_parser('activate', help='make a version current (deploy or roll back)')
+    activate_parser.add_argument('version')
+    candidate_parser = commands.add_parser('candidate', help='evaluate a version against live traffic')
+    candidate_parser.add_argument('version', nargs='?', help='version to evaluate; omit to end the evaluation')
+    args = parser.parse_args()
+
+    if args.command == 'activate':
+        activate(args.version, args.registry)
+        print(f"Activated {args.version}")
+        return
+    if args.command == 'candidate':
+        set_candidate(args.version, args.registry)
+        print(f"Candidate set to {args.version}" if args.version else "Candidate cleared")
+        return
+
+    current = current_version(args.registry)
+    candidate = candidate_version(args.registry)
+    for version in list_versions(args.registry):
+        metadata = read_metadata(version, args.registry)
+        marker = '*' if version == current else '?' if version == candidate else ' '
+        print(f"{marker} {version}  {metadata['published_at']}  {json.dumps(metadata['metrics'])}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,134 @@
+from datetime import datetime, timezone
+
+import joblib
+import numpy as np
+import sklearn
+
+from forest_engine import compile_forest
+
+# Bump when the artifact layout changes so stale files are rejected at load time
+PIPELINE_VERSION = 2
+
+PIPELINE_PATH = 'diabetes_pipeline.joblib'
+
+FEATURE_COLUMNS = ['Pregnancies', 'Glucose', 'BloodPressure', 'SkinThickness',
+                   'Insulin', 'BMI', 'DiabetesPedigreeFunction', 'Age']
+
+# Columns where a zero means "not measured" rather than a real value
+ZERO_NOT_ALLOWED = ['Glucose', 'BloodPressure', 'SkinThickness', 'Insulin', 'BMI']
+
+class DiabetesPipeline:
+    """
+    Zero handling, imputation, scaling and the compiled forest in one artifact.
+
+    This is the single inference path shared by the Flask app and the offline
+    scripts, so raw patient values are always transformed the same way the
+    training data was.
+    """
+
+    def __init__(self, imputer, scaler, forest, metadata=None):
+        self.imputer = imputer
+        self.forest = forest
+        # Plain arrays avoid StandardScaler's per-call validation; the arithmetic is identical
+        self.mean_ = np.asarray(scaler.mean_, dtype=np.float64)
+        self.scale_ = np.asarray(scaler.scale_, dtype=np.float64)
+        self.feature_columns = list(FEATURE_COLUMNS)
+        self.zero_not_allowed = list(ZERO_NOT_ALLOWED)
+        self._zero_idx = np.array([self.feature_columns.index(col) for col in self.zero_not_allowed])
+        self.version = PIPELINE_VERSION
+        self.metadata = metadata or {}
+
+    @property
+    def classes_(self):
+        return self.forest.classes_
+
+    def transform(self, X):
+        """
+        Apply zero handling, imputation and scaling to raw feature rows.
+
+        Parameters:
+        -----------
+        X : array-like of shape (n_samples, 8)
+            Raw values in FEATURE_COLUMNS order
+
+        Returns:
+        --------
+        numpy.ndarray
+            Scaled features ready for the forest
+        """
+        X = np.array(X, dtype=np.float64, ndmin=2)
+        subset = X[:, self._zero_idx]
+        subset[subset == 0] = np.nan
+        if np.isnan(subset).any():
+            X[:, self._zero_idx] = self.imputer.transform(subset)
+        X -= self.mean_
+        X /= self.scale_
+        return X
+
+    def predict_proba(self, X):
+        """Class probabilities for raw feature rows."""
+        return self.forest.predict_proba(self.transform(X))
+
+    def predict(self, X):
+        """Class labels for raw feature rows."""
+        return self.forest.predict(self.transform(X))
+
+    def predict_one(self, x):
+        """
+        Score a single raw feature row.
+
+        Returns:
+        --------
+        tuple
+            (prediction, probability) where probability is for the positive class
+        """
+        return self.forest.predict_one(self.transform(x)[0])
+
+def build_pipeline(imputer, scaler, model, metadata=None):
+    """
+    Bundle fitted preprocessing and a trained forest into a DiabetesPipeline.
+
+    Parameters:
+    -----------
+    imputer : imputer.KDTreeImputer
+        Imputer fitted on the ZERO_NOT_ALLOWED columns
+    scaler : sklearn.preprocessing.StandardScaler
+        Scaler fitted on all eight feature columns
+    model : sklearn.ensemble.RandomForestClassifier
+        Forest trained on the scaled features
+    metadata : dict, optional
+        Extra information to store with the artifact (e.g. training metrics)
+    """
+    info = {
+        'created_at': datetime.now(timezone.utc).isoformat(),
+        'sklearn_version': sklearn.__version__,
+        'feature_columns': list(FEATURE_COLUMNS),
+        'feature_importances': [float(v) for v in model.feature_importances_],
+    }
+    info.update(metadata or {})
+    return DiabetesPipeline(imputer, scaler, compile_forest(model), metadata=info)
+
+def save_pipeline(pipeline, path=PIPELINE_PATH):
+    """Write the pipeline uncompressed so its arrays can be memory-mapped on load."""
+    joblib.dump(pipeline, path)
+    return path
+
+def load_pipeline(path=PIPELINE_PATH, mmap_mode='r'):
+    """
+    Load a pipeline artifact.
+
+    With mmap_mode='r' the tree and imputer arrays are memory-mapped read-only,
+    so gunicorn workers (and score_csv processes) share one copy of the pages.
+
+    Parameters:
+    -----------
+    path : str
+        Path to the artifact written by save_pipeline
+    mmap_mode : str or None
+        Passed to joblib.load; None loads everything into private memory
+    """
+    pipeline = joblib.load(path, mmap_mode=mmap_mode)
+    if getattr(pipeline, 'version', None) != PIPELINE_VERSION:
+        raise ValueError(f"{path} has pipeline version {getattr(pipeline, 'version', None)}, "
+                         f"expected {PIPELINE_VERSION}. Re-run train_model.py.")
+    return pipeline
@@ -0,0 +1,69 @@
+from ttl_cache import TTLCache
+
+# Decimal places kept per feature before lookup. These follow the precision of
+# the ranges validated in process_input: whole numbers for counts, mg/dL, mmHg,
+# mm and years, one decimal for BMI and insulin, three for the pedigree function.
+FIELD_PRECISION = {
+    'Pregnancies': 0,
+    'Glucose': 0,
+    'BloodPressure': 0,
+    'SkinThickness': 0,
+    'Insulin': 1,
+    'BMI': 1,
+    'DiabetesPedigreeFunction': 3,
+    'Age': 0,
+}
+
+class PredictionCache:
+    """
+    Bounded LRU/TTL cache in front of pipeline inference.
+
+    Features are rounded to FIELD_PRECISION (or the given overrides) to form the
+    key, and the model is evaluated on the rounded values, so a cached result
+    is always exactly what a fresh prediction for that key would return.
+
+    Parameters:
+    -----------
+    pipeline : DiabetesPipeline
+        Pipeline used on cache misses
+    max_entries : int
+        Cache capacity; 0 disables caching
+    ttl : float
+        Seconds a cached prediction stays valid
+    precision : dict, optional
+        Per-feature overrides of FIELD_PRECISION
+    """
+
+    def __init__(self, pipeline, max_entries=4096, ttl=3600, precision=None):
+        self.pipeline = pipeline
+        digits = dict(FIELD_PRECISION)
+        digits.update(precision or {})
+        self._digits = [digits[col] for col in pipeline.feature_columns]
+        self._cache = TTLCache(max_entries=max_entries, ttl=ttl) if max_entries > 0 else None
+
+    def key(self, features):
+        """Canonical tuple for a raw feature row in pipeline column order."""
+        return tuple(round(float(value), digits) for value, digits in zip(features, self._digits))
+
+    def predict_one(self, features):
+        """
+        Return (prediction, probability) for a raw feature row, using the cache when possible.
+        """
+        key = self.key(features)
+        result = self._cache.get(key) if self._cache is not None else None
+        if result is None:
+            prediction, probability = self.pipeline.predict_one(key)
+            result = (int(prediction), float(probability))
+            if self._cache is not None:
+                self._cache.set(key, result)
+        return result
+
+    def clear(self):
+        if self._cache is not None:
+            self._cache.clear()
+
+    def stats(self):
+        """Hit/miss counters and occupancy, or {'enabled': False} when disabled."""
+        if self._cache is None:
+            return {'enabled': False}
+        return dict(self._cache.stats(), enabled=True)
@@ -1,8 +1,23 @@
+import argparse
+
 import pandas as pd
 import numpy as np
-from sklearn.impute import KNNImputer
+from dataset import convert_csv, load_dataset
+from imputer import KDTreeImputer
+from pipeline import FEATURE_COLUMNS, ZERO_NOT_ALLOWED
+from sklearn import config_context
 from sklearn.preprocessing import StandardScaler
 
+try:
+    import pyarrow
+    import pyarrow.parquet
+except ImportError:  # optional: only the streaming mode writes Parquet
+    pyarrow = None
+
+# Rows per chunk and imputation reference sample size for the streaming mode
+CHUNK_SIZE = 100000
+SAMPLE_SIZE = 10000
+
 def preprocess_diabetes_data(file_path='diabetes.csv'):
     """
     Preprocess the diabetes dataset by handling missing values and scaling features.
@@ -17,8 +32,8 @@ def preprocess_diabetes_data(file_path='diabetes.csv'):
     tuple
         (X, y) where X is the preprocessed features and y is the target variable
     """
-    # Load the dataset
-    df = pd.read_csv(file_path)
+    # Load the dataset (memory-mapped from its column bundle; see dataset.py)
+    df = load_dataset(file_path)
     
     # Create a copy of the original dataframe for saving processed data
     processed_df = df.copy()
@@ -35,8 +50,9 @@ def preprocess_diabetes_data(file_path='diabetes.csv'):
     print(processed_df[zero_not_allowed].isna().sum())
     
     # Use KNN imputation for better accuracy
-    # KNN imputation uses similar patients to estimate missing values
-    imputer = KNNImputer(n_neighbors=5, weights='distance')
+    # KNN imputation uses similar patients to estimate missing values; the
+    # KD-tree index keeps single-row imputation fast at serving time
+    imputer = KDTreeImputer(n_neighbors=5)
     
     # Fit and transform the data
     imputed_data = imputer.fit_transform(processed_df[zero_not_allowed])
@@ -44,6 +60,10 @@ def preprocess_diabetes_data(file_path='diabetes.csv'):
     # Update the dataframe with imputed values
     processed_df[zero_not_allowed] = imputed_data
     
+    # Save the fitted imputer so serving can fill in missing values the same way
+    import joblib
+    joblib.dump(imputer, 'feature_imputer.pkl')
+    
     # Print statistics after imputation
     print("\nMissing value statistics after imputation:")
     print(processed_df[zero_not_allowed].isna().sum())
@@ -52,9 +72,11 @@ def preprocess_diabetes_data(file_path='diabetes.csv'):
     print("\nSummary statistics after imputation:")
     print(processed_df[zero_not_allowed].describe())
     
-    # Save the processed data to a new CSV file
+    # Save the processed data to a new CSV file, and as a bundle so the
+    # analysis scripts can memory-map it without parsing the CSV
     processed_file_path = 'processed_diabetes.csv'
     processed_df.to_csv(processed_file_path, index=False)
+    convert_csv(processed_file_path)
     print(f"\nProcessed data saved to {processed_file_path}")
     
     # Separate features and target
@@ -66,14 +88,144 @@ def preprocess_diabetes_data(file_path='diabetes.csv'):
     X_scaled = scaler.fit_transform(X)
     
     # Save the scaler for later use
-    import joblib
     joblib.dump(scaler, 'feature_scaler.pkl')
     
     return X_scaled, y
 
-if __name__ == "__main__":
+class ParquetChunkWriter:
+    """Append DataFrame chunks to one Parquet file, one row group per chunk."""
+
+    def __init__(self, path):
+        if pyarrow is None:
+            raise ImportError("Writing Parquet requires the pyarrow package (pip install pyarrow).")
+        self.path = path
+        self._writer = None
+
+    def write(self, chunk):
+        table = pyarrow.Table.from_pandas(chunk, preserve_index=False)
+        if self._writer is None:
+            self._writer = pyarrow.parquet.ParquetWriter(self.path, table.schema)
+        self._writer.write_table(table)
+
+    def close(self):
+        if self._writer is not None:
+            self._writer.close()
+
+def _read_chunks(file_path, chunk_size):
+    """Raw chunks with zeros in ZERO_NOT_ALLOWED replaced by NaN."""
+    for chunk in pd.read_csv(file_path, chunksize=chunk_size):
+        chunk[ZERO_NOT_ALLOWED] = chunk[ZERO_NOT_ALLOWED].replace(0, np.nan)
+        yield chunk
+
+def sample_rows(file_path, sample_size=SAMPLE_SIZE, chunk_size=CHUNK_SIZE, seed=42):
+    """
+    Uniform random sample of the ZERO_NOT_ALLOWED columns in one streaming pass.
+
+    Every row gets a random key and the sample_size rows with the smallest keys
+    are kept (bottom-k sampling), so memory is bounded by chunk_size + sample_size.
+
+    Returns:
+    --------
+    pandas.DataFrame
+        Up to sample_size rows, with NaN where a value is missing
+    """
+    rng = np.random.default_rng(seed)
+    sample, keys = np.empty((0, len(ZERO_NOT_ALLOWED))), np.empty(0)
+    for chunk in _read_chunks(file_path, chunk_size):
+        sample = np.concatenate([sample, chunk[ZERO_NOT_ALLOWED].to_numpy(dtype=np.float64)])
+        keys = np.concatenate([keys, rng.random(len(chunk))])
+        if len(sample) > sample_size:
+            keep = np.argpartition(keys, sample_size)[:sample_size]
+            sample, keys = sample[keep], keys[keep]
+    return pd.DataFrame(sample, columns=ZERO_NOT_ALLOWED)
+
+def preprocess_streaming(file_path='diabetes.csv', output_path='processed_diabetes.parquet',
+                         chunk_size=CHUNK_SIZE, sample_size=SAMPLE_SIZE, seed=42, writer=None):
+    """
+    Preprocess a dataset too large for memory, chunk by chunk.
+
+    Two passes over the CSV:
+
+    1. Draw a random sample of rows and fit the KD-tree imputer on it, so
+       neighbours come from the sample rather than from every row.
+    2. Impute each chunk in one batched query, update the scaler with
+       partial_fit, and append the imputed chunk to a Parquet file.
+
+    Peak memory is bounded by chunk_size and sample_size, not the file size.
+    The imputer and scaler are saved like preprocess_diabetes_data saves them.
+
+    Parameters:
+    -----------
+    file_path : str
+        Raw CSV with the eight feature columns and Outcome
+    output_path : str
+        Parquet file for the imputed (unscaled) rows; requires pyarrow
+    chunk_size : int
+        Rows read, imputed and written at a time
+    sample_size : int
+        Rows used as the imputation reference
+    seed : int
+        Seed for the sample
+    writer : object, optional
+        Chunk sink with write(DataFrame) and close(); defaults to a
+        ParquetChunkWriter for output_path
+
+    Returns:
+    --------
+    dict
+        Row count, sample size and the paths written
+    """
+    import joblib
+
+    writer = writer or ParquetChunkWriter(output_path)
+
+    sample = sample_rows(file_path, sample_size, chunk_size, seed)
+    imputer = KDTreeImputer(n_neighbors=5)
+    # Completing the sample computes pairwise distances in blocks; keep them small
+    with config_context(working_memory=16):
+        imputer.fit(sample)
+    joblib.dump(imputer, 'feature_imputer.pkl')
+    print(f"Fitted imputer on a sample of {len(sample)} rows")
+
+    scaler = StandardScaler()
+    rows = 0
+    try:
+        for chunk in _read_chunks(file_path, chunk_size):
+            chunk[ZERO_NOT_ALLOWED] = imputer.transform(chunk[ZERO_NOT_ALLOWED])
+            scaler.partial_fit(chunk[FEATURE_COLUMNS])
+            writer.write(chunk)
+            rows += len(chunk)
+            print(f"Processed {rows} rows")
+    finally:
+        writer.close()
+
+    joblib.dump(scaler, 'feature_scaler.pkl')
+    print(f"\nProcessed data saved to {output_path}")
+    return {'rows': rows, 'sample_size': len(sample), 'output_path': output_path,
+            'imputer_path': 'feature_imputer.pkl', 'scaler_path': 'feature_scaler.pkl'}
+
+def main():
+    parser = argparse.ArgumentParser(description='Impute and scale the diabetes dataset.')
+    parser.add_argument('input', nargs='?', default='diabetes.csv', help='raw CSV (default: diabetes.csv)')
+    parser.add_argument('--stream', action='store_true',
+                        help='process in chunks with bounded memory and write Parquet (requires pyarrow)')
+    parser.add_argument('--output', default='processed_diabetes.parquet',
+                        help='Parquet output for --stream (default: processed_diabetes.parquet)')
+    parser.add_argument('--chunk-size', type=int, default=CHUNK_SIZE,
+                        help=f'rows per chunk with --stream (default: {CHUNK_SIZE})')
+    parser.add_argument('--sample-size', type=int, default=SAMPLE_SIZE,
+                        help=f'imputation reference rows with --stream (default: {SAMPLE_SIZE})')
+    args = parser.parse_args()
+
+    if args.stream:
+        preprocess_streaming(args.input, args.output, args.chunk_size, args.sample_size)
+        return
+
     # Test the preprocessing
-    X, y = preprocess_diabetes_data()
+    X, y = preprocess_diabetes_data(args.input)
     print("\nShape of preprocessed data:")
     print(f"Features (X): {X.shape}")
-    print(f"Target (y): {y.shape}") 
\ No newline at end of file
+    print(f"Target (y): {y.shape}")
+
+if __name__ == "__main__":
+    main()
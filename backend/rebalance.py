@@ -0,0 +1,209 @@
+import numpy as np
+from scipy.spatial import cKDTree
+
+from dataset import content_hash
+
+TARGET = 'Outcome'
+
+def _index_dtype(n_rows):
+    return np.int32 if n_rows < np.iinfo(np.int32).max else np.int64
+
+def _draw_order(rng, rows, n):
+    # Every row once in random order, then extra rows drawn with replacement,
+    # so a prefix of any length is a valid sample and larger samples keep the smaller ones
+    if len(rows) == 0:
+        if n > 0:
+            raise ValueError('Cannot sample from a class with no rows')
+        # Never selected, but keeps the gathers in ratio_indices well-defined
+        return np.zeros(1, dtype=np.int64)
+    order = rng.permutation(rows)
+    if n > len(order):
+        order = np.concatenate([order, rng.choice(rows, n - len(order))])
+    return order
+
+def ratio_indices(y, ratios, size=None, positive=1, seed=42, shuffle=True):
+    """
+    Row indices realising several positive-class fractions at once.
+
+    All ratios share one shuffled order of the positive rows and one of the
+    negative rows: row i takes its first round(ratio * size) entries from the
+    positive order and the rest from the negative order. A class is drawn
+    without replacement while it has rows left and with replacement beyond
+    that, so any ratio is reachable at any size.
+
+    Parameters:
+    -----------
+    y : array-like of shape (n_samples,)
+        Class labels
+    ratios : array-like of float
+        Target fractions of positive rows, each in [0, 1]
+    size : int, optional
+        Rows per resampled dataset (default: len(y))
+    positive : scalar
+        Label counted as positive
+    seed : int
+        Random seed
+    shuffle : bool
+        Shuffle each row so classes are interleaved
+
+    Returns:
+    --------
+    numpy.ndarray of shape (len(ratios), size)
+        Row indices into y, one row per ratio
+    """
+    y = np.asarray(y)
+    ratios = np.atleast_1d(np.asarray(ratios, dtype=np.float64))
+    if ((ratios < 0) | (ratios > 1)).any():
+        raise ValueError('Ratios must be between 0 and 1')
+    size = len(y) if size is None else int(size)
+    rng = np.random.default_rng(seed)
+
+    n_positive = np.rint(ratios * size).astype(np.int64)
+    positive_order = _draw_order(rng, np.flatnonzero(y == positive), int(n_positive.max()))
+    negative_order = _draw_order(rng, np.flatnonzero(y != positive), int((size - n_positive).max()))
+
+    position = np.arange(size)
+    from_positive = position < n_positive[:, np.newaxis]
+    indices = np.where(
+        from_positive,
+        positive_order[np.minimum(position, len(positive_order) - 1)],
+        negative_order[np.clip(position - n_positive[:, np.newaxis], 0, len(negative_order) - 1)])
+    indices = indices.astype(_index_dtype(len(y)), copy=False)
+    return rng.permuted(indices, axis=1) if shuffle else indices
+
+def oversample(y, seed=42):
+    """Indices of every row plus minority rows repeated until each class matches the largest."""
+    y = np.asarray(y)
+    rng = np.random.default_rng(seed)
+    classes, inverse, counts = np.unique(y, return_inverse=True, return_counts=True)
+    extra = [rng.choice(np.flatnonzero(inverse == label), counts.max() - count)
+             for label, count in enumerate(counts) if count < counts.max()]
+    return rng.permutation(np.concatenate([np.arange(len(y))] + extra)).astype(_index_dtype(len(y)))
+
+def undersample(y, seed=42):
+    """Indices of a random subset of each class, as many rows as the smallest class has."""
+    y = np.asarray(y)
+    rng = np.random.default_rng(seed)
+    classes, inverse, counts = np.unique(y, return_inverse=True, return_counts=True)
+    kept = [rng.choice(np.flatnonzero(inverse == label), counts.min(), replace=False)
+            for label in range(len(classes))]
+    return rng.permutation(np.concatenate(kept)).astype(_index_dtype(len(y)))
+
+def smote(X, y, n_samples=None, minority=None, k_neighbors=5, seed=42):
+    """
+    Synthesise minority rows by interpolating towards minority-class neighbours (SMOTE).
+
+    Each synthetic row lies at a uniform random point on the segment between
+    a random minority row and one of its k nearest minority neighbours. The
+    neighbour search is one KD-tree query over the minority rows, and the
+    rows are generated together as array operations.
+
+    Parameters:
+    -----------
+    X : array-like of shape (n_samples, n_features)
+        Numeric features without missing values
+    y : array-like of shape (n_samples,)
+        Class labels
+    n_samples : int, optional
+        Rows to synthesise (default: enough to match the largest class)
+    minority : scalar, optional
+        Class to synthesise (default: the least frequent)
+    k_neighbors : int
+        Neighbours to interpolate towards
+    seed : int
+        Random seed
+
+    Returns:
+    --------
+    tuple of (numpy.ndarray, numpy.ndarray)
+        The synthetic rows and their labels; the original rows are not copied
+    """
+    X = np.asarray(X, dtype=np.float64)
+    y = np.asarray(y)
+    classes, counts = np.unique(y, return_counts=True)
+    if minority is None:
+        minority = classes[np.argmin(counts)]
+    members = X[y == minority]
+    if n_samples is None:
+        n_samples = counts.max() - len(members)
+    if len(members) < 2:
+        raise ValueError('SMOTE needs at least two rows of the minority class')
+    k = min(k_neighbors, len(members) - 1)
+    rng = np.random.default_rng(seed)
+
+    # k + 1 because each row is its own nearest neighbour
+    _, neighbors = cKDTree(members).query(members, k=k + 1)
+    neighbors = neighbors.reshape(len(members), k + 1)[:, 1:]
+    base = rng.integers(len(members), size=n_samples)
+    partner = neighbors[base, rng.integers(k, size=n_samples)]
+    gap = rng.random((n_samples, 1))
+    synthetic = members[base] + gap * (members[partner] - members[base])
+    return synthetic, np.full(n_samples, minority, dtype=y.dtype)
+
+class IndexView:
+    """
+    Rows of a DataFrame or array selected by an index array.
+
+    Only the index array is held; rows are gathered when asked for, in
+    batches or all at once. Estimators that accept sample_weight can train
+    on the view without gathering anything, since repeating a row is the same
+    as weighting it by its count.
+
+    Parameters:
+    -----------
+    base : pandas.DataFrame or numpy.ndarray
+        The rows indices refer to (for example a memory-mapped bundle)
+    indices : numpy.ndarray
+        Row positions, possibly repeated
+    """
+
+    def __init__(self, base, indices):
+        self.base = base
+        self.indices = indices
+
+    def __len__(self):
+        return len(self.indices)
+
+    def _take(self, indices):
+        return self.base.iloc[indices] if hasattr(self.base, 'iloc') else self.base[indices]
+
+    def materialize(self):
+        """Gather the rows into a new DataFrame or array."""
+        return self._take(self.indices)
+
+    def batches(self, batch_size=10000):
+        """Gather the rows batch_size at a time."""
+        for start in range(0, len(self.indices), batch_size):
+            yield self._take(self.indices[start:start + batch_size])
+
+    def sample_weight(self):
+        """How many times each base row is selected, for fit(X, y, sample_weight=...)."""
+        return np.bincount(self.indices, minlength=len(self.base)).astype(np.float64)
+
+    def fraction(self, target=TARGET, positive=1):
+        """Share of selected rows in the positive class (DataFrame bases)."""
+        return float(np.mean(self.base[target].to_numpy()[self.indices] == positive))
+
+def ratio_views(df, ratios, target=TARGET, **kwargs):
+    """
+    One IndexView of df per positive-class fraction; keyword arguments go to ratio_indices.
+
+    Returns:
+    --------
+    dict
+        Ratio -> IndexView
+    """
+    indices = ratio_indices(df[target].to_numpy(), ratios, **kwargs)
+    return {float(ratio): IndexView(df, row) for ratio, row in zip(np.atleast_1d(ratios), indices)}
+
+def save_indices(path, df, ratios, indices):
+    """Store ratio index arrays with a hash of the dataset they index."""
+    np.savez(path, ratios=np.asarray(ratios, dtype=np.float64), indices=indices,
+             sha256=np.array(content_hash(df)))
+
+def load_views(path, df):
+    """Reopen saved ratio indices as IndexViews of df, refusing a different dataset."""
+    with np.load(path) as saved:
+        if str(saved['sha256']) != content_hash(df):
+            raise ValueError(f"{path} was built from a different dataset; rebuild it.")
+        return {float(ratio): IndexView(df, row) for ratio, row in zip(saved['ratios'], saved['indices'])}
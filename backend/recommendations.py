@@ -0,0 +1,362 @@
+from functools import lru_cache
+import operator
+
+# Define preventive measures information
+preventive_measures = {
+    "general": {
+        "title": "General Preventive Measures",
+        "measures": [
+            "1. Regular Health Check-ups:",
+            "   • Annual physical examination",
+            "   • Regular blood sugar monitoring",
+            "   • Blood pressure checks",
+            "   • Cholesterol screening",
+            "   • Eye examination (for diabetic retinopathy)",
+            "   • Foot examination (for diabetic neuropathy)",
+            "",
+            "2. Healthy Diet:",
+            "   • Follow a balanced diet rich in fruits, vegetables, and whole grains",
+            "   • Limit processed foods and sugary drinks",
+            "   • Control portion sizes",
+            "   • Choose lean proteins",
+            "   • Stay hydrated with water",
+            "   • Limit alcohol consumption",
+            "",
+            "3. Physical Activity:",
+            "   • Aim for 150 minutes of moderate exercise weekly",
+            "   • Include both cardio and strength training",
+            "   • Take regular breaks from sitting",
+            "   • Find activities you enjoy",
+            "   • Start slowly and gradually increase intensity",
+            "",
+            "4. Weight Management:",
+            "   • Maintain a healthy BMI (18.5-24.9)",
+            "   • Set realistic weight loss goals",
+            "   • Track your progress",
+            "   • Get support from healthcare providers",
+            "   • Focus on sustainable lifestyle changes",
+            "",
+            "5. Stress Management:",
+            "   • Practice relaxation techniques",
+            "   • Get adequate sleep (7-8 hours)",
+            "   • Maintain work-life balance",
+            "   • Consider meditation or yoga",
+            "   • Seek support when needed",
+            "",
+            "6. Lifestyle Modifications:",
+            "   • Quit smoking",
+            "   • Limit alcohol intake",
+            "   • Maintain regular sleep schedule",
+            "   • Stay socially active",
+            "   • Regular dental check-ups"
+        ]
+    },
+    "high_risk": {
+        "title": "Additional Measures for High-Risk Individuals",
+        "measures": [
+            "1. Enhanced Monitoring:",
+            "   • More frequent blood sugar checks",
+            "   • Regular A1C testing",
+            "   • Blood pressure monitoring at home",
+            "   • Weight tracking",
+            "   • Symptom diary maintenance",
+            "",
+            "2. Medical Management:",
+            "   • Regular consultations with healthcare provider",
+            "   • Medication adherence",
+            "   • Regular lab work",
+            "   • Specialist referrals as needed",
+            "   • Vaccination updates",
+            "",
+            "3. Dietary Modifications:",
+            "   • Consult a registered dietitian",
+            "   • Meal planning",
+            "   • Carbohydrate counting",
+            "   • Regular meal timing",
+            "   • Healthy snack options",
+            "",
+            "4. Exercise Guidelines:",
+            "   • Medical clearance before starting",
+            "   • Gradual progression",
+            "   • Regular activity schedule",
+            "   • Exercise with a partner",
+            "   • Emergency contact information",
+            "",
+            "5. Emergency Preparedness:",
+            "   • Keep emergency contacts handy",
+            "   • Wear medical identification",
+            "   • Know symptoms of complications",
+            "   • Have glucose tablets/snacks available",
+            "   • Regular emergency plan review"
+        ]
+    },
+    "age_specific": {
+        "elderly": {
+            "title": "Special Considerations for Elderly (65+)",
+            "measures": [
+                "1. Modified Exercise:",
+                "   • Low-impact activities",
+                "   • Balance exercises",
+                "   • Regular walking",
+                "   • Chair exercises",
+                "   • Water aerobics",
+                "",
+                "2. Medication Management:",
+                "   • Regular medication review",
+                "   • Pill organizer use",
+                "   • Medication reminder system",
+                "   • Regular doctor consultations",
+                "   • Side effect monitoring",
+                "",
+                "3. Fall Prevention:",
+                "   • Home safety assessment",
+                "   • Regular vision checks",
+                "   • Proper footwear",
+                "   • Assistive devices if needed",
+                "   • Regular balance exercises",
+                "",
+                "4. Social Support:",
+                "   • Regular check-ins",
+                "   • Support group participation",
+                "   • Caregiver communication",
+                "   • Transportation assistance",
+                "   • Meal delivery services if needed"
+            ]
+        },
+        "young_adult": {
+            "title": "Special Considerations for Young Adults",
+            "measures": [
+                "1. Lifestyle Balance:",
+                "   • Work-life balance",
+                "   • Stress management",
+                "   • Regular sleep schedule",
+                "   • Healthy social activities",
+                "   • Time management",
+                "",
+                "2. Preventive Screening:",
+                "   • Regular health check-ups",
+                "   • Family planning considerations",
+                "   • Mental health monitoring",
+                "   • Dental care",
+                "   • Vision checks",
+                "",
+                "3. Healthy Habits:",
+                "   • Regular exercise routine",
+                "   • Meal preparation",
+                "   • Stress reduction techniques",
+                "   • Social support network",
+                "   • Health education"
+            ]
+        }
+    }
+}
+
+# Rule conditions are tuples:
+#   ('answer', field, op, value)     compares a main answer (missing answers count as 0)
+#   ('follow_up', field, op, value)  compares a follow-up answer; numeric comparisons
+#                                    only fire for answered, non-zero values
+#   ('any', cond, ...) / ('all', cond, ...)
+# A condition of None always applies.
+_OPERATORS = {
+    '>': operator.gt,
+    '<': operator.lt,
+    '==': operator.eq,
+    'in': lambda value, choices: value in choices,
+}
+
+def _section(when, title, items, closing):
+    """Rows for a bulleted section whose items each have their own follow-up condition."""
+    rows = [(when, f"• {title}:\n")]
+    rows += [(('all', when, condition), f"  - {text}\n") for condition, text in items]
+    rows.append((when, f"  - {closing}\n\n"))
+    return rows
+
+def _numbered(lines):
+    return "".join(f"{i}. {line}\n" for i, line in enumerate(lines, 1))
+
+def _measure_set(measure_set):
+    return f"{measure_set['title']}:\n" + "\n".join(measure_set['measures']) + "\n\n"
+
+def _tips(title, tips):
+    return f"{title}:\n" + "".join(f"• {tip}\n" for tip in tips) + "\n"
+
+# Recommendations appended to the risk summary in /api/predict, keyed by predicted class
+PREDICTION_RULES = {
+    1: [
+        (None, "Here are your personalized recommendations based on your responses:\n\n"),
+        *_section(('answer', 'Glucose', '>', 140), "Regarding your glucose levels", [
+            (('follow_up', 'GlucoseFasting', '==', 'no'), "Consider getting a fasting glucose test"),
+            (('follow_up', 'GlucoseSymptoms', '==', 'yes'), "Please consult a doctor about your symptoms"),
+            (('follow_up', 'GlucoseHistory', '==', 'yes'), "Regular monitoring of your glucose levels is important"),
+            (('follow_up', 'GlucoseFamily', '==', 'yes'), "Given your family history, regular screening is recommended"),
+            (('follow_up', 'GlucoseDiet', 'in', ('moderate', 'poor')), "Consider consulting a nutritionist for dietary guidance"),
+        ], "Monitor your blood sugar regularly"),
+        *_section(('answer', 'BloodPressure', '>', 140), "Regarding your blood pressure", [
+            (('follow_up', 'BPMedication', '==', 'no'), "Consider consulting a doctor about blood pressure management"),
+            (('follow_up', 'BPStress', '==', 'yes'), "Practice stress management techniques"),
+            (('follow_up', 'BPSalt', '==', 'high'), "Reduce your salt intake"),
+            (('follow_up', 'BPSleep', '<', 7), "Aim for 7-8 hours of sleep per night"),
+            (('follow_up', 'BPCaffeine', '>', 2), "Consider reducing caffeine intake"),
+        ], "Monitor your blood pressure regularly"),
+        *_section(('answer', 'BMI', '>', 24.9), "Regarding your BMI", [
+            (('follow_up', 'BMIDiet', 'in', ('moderate', 'poor')), "Consider consulting a nutritionist"),
+            (('follow_up', 'BMISedentary', '>', 8), "Try to reduce sitting time and take regular breaks"),
+        ], "Work with a healthcare provider on a weight management plan"),
+        *_section(('answer', 'Age', '>', 65), "Additional recommendations for your age group", [
+            (('follow_up', 'AgeActivity', '==', 'sedentary'), "Consider gentle exercises like walking or swimming"),
+            (('follow_up', 'AgeMobility', '==', 'yes'), "Consult a physical therapist for safe exercise options"),
+            (('follow_up', 'AgeMedication', '>', 3), "Regular medication review with your doctor is important"),
+        ], "Regular health check-ups are essential"),
+        (None, "General recommendations:\n" + _numbered([
+            "Maintain a healthy diet with low sugar and processed foods",
+            "Exercise regularly (at least 30 minutes daily)",
+            "Monitor blood sugar levels regularly",
+            "Maintain a healthy weight",
+            "Get regular check-ups with your doctor",
+            "Avoid smoking and limit alcohol consumption",
+            "Stay hydrated and get adequate sleep",
+            "Manage stress through relaxation techniques",
+        ]) + "\n"),
+        (None, "Would you like me to provide more specific information about any of these recommendations?"),
+    ],
+    0: [
+        (None, "While your risk is lower, here are some personalized recommendations:\n\n"),
+        (('answer', 'Glucose', '>', 120), "• Consider monitoring your glucose levels periodically\n"),
+        (('answer', 'BloodPressure', '>', 130), "• Keep an eye on your blood pressure\n"),
+        (('answer', 'BMI', '>', 23), "• Consider maintaining a healthy weight through diet and exercise\n"),
+        (('answer', 'Age', '>', 65), "• As you're over 65, regular health screenings are important\n"),
+        (None, "\nGeneral recommendations:\n" + _numbered([
+            "Maintain a healthy lifestyle",
+            "Get regular check-ups",
+            "Stay physically active",
+            "Eat a balanced diet",
+            "Monitor your health indicators regularly",
+            "Stay informed about diabetes prevention",
+        ]) + "\n"),
+        (None, "Would you like more information about preventive measures?"),
+    ],
+}
+
+# Sections of the /api/preventive-measures response
+PREVENTIVE_RULES = [
+    (None, "Here are detailed preventive measures based on your profile:\n\n"),
+    (None, _measure_set(preventive_measures["general"])),
+    (('any',
+      ('answer', 'Glucose', '>', 140),
+      ('answer', 'BloodPressure', '>', 140),
+      ('answer', 'BMI', '>', 30),
+      ('follow_up', 'GlucoseFamily', '==', 'yes')),
+     _measure_set(preventive_measures["high_risk"])),
+    (('answer', 'Age', '>', 65), _measure_set(preventive_measures["age_specific"]["elderly"])),
+    (('answer', 'Age', '<', 30), _measure_set(preventive_measures["age_specific"]["young_adult"])),
+    (('answer', 'BMI', '>', 24.9), _tips("Additional Weight Management Tips", [
+        "Consider consulting a nutritionist for personalized meal planning",
+        "Start with small, achievable exercise goals",
+        "Keep a food and activity diary",
+        "Join a support group or find an exercise buddy",
+    ])),
+    (('answer', 'BloodPressure', '>', 130), _tips("Additional Blood Pressure Management Tips", [
+        "Reduce sodium intake",
+        "Practice stress-reduction techniques",
+        "Monitor blood pressure at home",
+        "Limit caffeine and alcohol",
+    ])),
+    (('any',
+      ('follow_up', 'BMISedentary', '==', 'yes'),
+      ('follow_up', 'BMIActivity', 'in', ('never', 'occasionally'))),
+     _tips("Additional Activity Tips", [
+        "Start with 10-minute walks",
+        "Take the stairs instead of the elevator",
+        "Park further from your destination",
+        "Stand up and stretch every hour",
+        "Consider a standing desk",
+    ])),
+    (None, "Would you like more specific information about any of these areas?"),
+]
+
+def _compile_condition(condition):
+    """Turn a condition tuple into a predicate over (answers, follow_up_answers)."""
+    kind = condition[0]
+    if kind in ('any', 'all'):
+        predicates = [_compile_condition(part) for part in condition[1:]]
+        combine = any if kind == 'any' else all
+        return lambda answers, follow_ups: combine(p(answers, follow_ups) for p in predicates)
+
+    _, field, op, expected = condition
+    compare = _OPERATORS[op]
+    if kind == 'answer':
+        return lambda answers, follow_ups: compare(answers.get(field, 0), expected)
+    if op in ('>', '<'):
+        def numeric(answers, follow_ups):
+            value = follow_ups.get(field)
+            if not value:
+                return False
+            try:
+                return compare(float(value), expected)
+            except (TypeError, ValueError):
+                return False
+        return numeric
+    return lambda answers, follow_ups: compare(follow_ups.get(field), expected)
+
+def _atoms(condition):
+    """Split a condition into the atomic conditions that must all hold."""
+    if condition is None:
+        return []
+    if condition[0] == 'all':
+        return [atom for part in condition[1:] for atom in _atoms(part)]
+    return [condition]
+
+class RuleTable:
+    """
+    A rule table compiled into deduplicated predicates and text fragments.
+
+    Each distinct condition is evaluated once per render. The resulting tuple
+    of truth values is the cache key for the joined text, so a given
+    combination of triggered rules is rendered only once.
+    """
+
+    def __init__(self, rows, cache_size=1024):
+        index = {}
+        self._predicates = []
+        self._fragments = []
+        for condition, text in rows:
+            required = []
+            for atom in _atoms(condition):
+                if atom not in index:
+                    index[atom] = len(self._predicates)
+                    self._predicates.append(_compile_condition(atom))
+                required.append(index[atom])
+            self._fragments.append((tuple(required), text))
+        self._join = lru_cache(maxsize=cache_size)(self._join_fragments)
+
+    def _join_fragments(self, triggered):
+        return "".join(text for required, text in self._fragments
+                       if all(triggered[i] for i in required))
+
+    def render(self, answers, follow_up_answers):
+        triggered = tuple(predicate(answers, follow_up_answers) for predicate in self._predicates)
+        return self._join(triggered)
+
+# Compiled once at import
+_prediction_tables = {label: RuleTable(rows) for label, rows in PREDICTION_RULES.items()}
+_preventive_table = RuleTable(PREVENTIVE_RULES)
+
+def render_prediction_message(prediction, probability, answers, follow_up_answers):
+    """
+    Build the /api/predict message for a risk band and the user's answers.
+
+    Parameters:
+    -----------
+    prediction : int
+        Predicted class (1 = diabetes risk)
+    probability : float
+        Probability of the positive class
+    answers, follow_up_answers : dict
+        Main and follow-up answers from the session
+    """
+    message = f"Based on the provided information, there is a {probability:.1%} chance of diabetes risk.\n\n"
+    return message + _prediction_tables[int(prediction)].render(answers, follow_up_answers)
+
+def render_preventive_measures(answers, follow_up_answers):
+    """Build the /api/preventive-measures message for the user's profile."""
+    return _preventive_table.render(answers, follow_up_answers)
@@ -0,0 +1,131 @@
+import argparse
+import os
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from pipeline import FEATURE_COLUMNS, PIPELINE_PATH, load_pipeline
+
+# Per-process pipeline, populated once by init_worker
+_pipeline = None
+
+def init_worker(pipeline_path=PIPELINE_PATH):
+    """Load the pipeline once for the current process (memory-mapped, so workers share pages)."""
+    global _pipeline
+    _pipeline = load_pipeline(pipeline_path)
+
+def score_chunk(chunk):
+    """
+    Score one chunk of patient rows.
+
+    Parameters:
+    -----------
+    chunk : pandas.DataFrame
+        Rows containing at least the eight feature columns
+
+    Returns:
+    --------
+    pandas.DataFrame
+        The input rows with 'Prediction' and 'Probability' columns appended
+    """
+    probabilities = _pipeline.predict_proba(chunk[FEATURE_COLUMNS].to_numpy(dtype=np.float64))
+    result = chunk.copy()
+    result['Prediction'] = _pipeline.classes_.take(np.argmax(probabilities, axis=1))
+    result['Probability'] = probabilities[:, 1]
+    return result
+
+def score_csv(input_path, output_path, chunk_size=10000, workers=None, pipeline_path=PIPELINE_PATH):
+    """
+    Stream a CSV through the model chunk by chunk and append results to a CSV.
+
+    Chunks are fanned out over a process pool whose workers each load the
+    pipeline once. At most two chunks per worker are in flight, so memory stays
+    bounded by the chunk size rather than the input size.
+
+    Parameters:
+    -----------
+    input_path : str
+        CSV file with the eight feature columns (extra columns are passed through)
+    output_path : str
+        Destination CSV, overwritten if it exists
+    chunk_size : int
+        Number of rows read and scored per chunk
+    workers : int or None
+        Number of worker processes; None uses all cores, 0 scores in-process
+    pipeline_path : str
+        Path to the pipeline artifact written by train_model.py
+
+    Returns:
+    --------
+    int
+        Number of rows scored
+
+    Raises:
+    -------
+    ValueError
+        If the input lacks any of the feature columns
+    """
+    # Checked here rather than per chunk, where a worker would fail with a bare KeyError
+    missing = [col for col in FEATURE_COLUMNS if col not in pd.read_csv(input_path, nrows=0).columns]
+    if missing:
+        raise ValueError(f"{input_path} is missing required columns: {', '.join(missing)}")
+
+    reader = pd.read_csv(input_path, chunksize=chunk_size)
+    if os.path.exists(output_path):
+        os.remove(output_path)
+
+    rows_scored = 0
+    header = True
+
+    def write(result):
+        nonlocal rows_scored, header
+        result.to_csv(output_path, mode='a', header=header, index=False)
+        header = False
+        rows_scored += len(result)
+
+    if workers == 0:
+        init_worker(pipeline_path)
+        for chunk in reader:
+            write(score_chunk(chunk))
+        return rows_scored
+
+    workers = workers or os.cpu_count() or 1
+    max_pending = workers * 2
+    with ProcessPoolExecutor(max_workers=workers, initializer=init_worker,
+                             initargs=(pipeline_path,)) as executor:
+        pending = deque()
+        for chunk in reader:
+            pending.append(executor.submit(score_chunk, chunk))
+            # Write results in input order once the pipeline is full
+            if len(pending) >= max_pending:
+                write(pending.popleft().result())
+        while pending:
+            write(pending.popleft().result())
+
+    return rows_scored
+
+def main():
+    parser = argparse.ArgumentParser(description='Score a CSV of patient rows with the diabetes model.')
+    parser.add_argument('input', help='input CSV with the eight feature columns')
+    parser.add_argument('output', help='output CSV with Prediction and Probability columns appended')
+    parser.add_argument('--chunk-size', type=int, default=10000, help='rows per chunk (default: 10000)')
+    parser.add_argument('--workers', type=int, default=None,
+                        help='worker processes (default: all cores, 0 = no pool)')
+    parser.add_argument('--pipeline', default=PIPELINE_PATH, help='path to the pipeline artifact')
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    try:
+        rows = score_csv(args.input, args.output, chunk_size=args.chunk_size, workers=args.workers,
+                         pipeline_path=args.pipeline)
+    except ValueError as e:
+        parser.error(str(e))
+    elapsed = time.perf_counter() - start
+    print(f"Scored {rows} rows in {elapsed:.2f}s ({rows / max(elapsed, 1e-9):.0f} rows/s)")
+    print(f"Results saved to {args.output}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,148 @@
+import copy
+import json
+import os
+import secrets
+
+from flask.sessions import SessionInterface, SessionMixin
+from werkzeug.datastructures import CallbackDict
+
+from ttl_cache import TTLCache
+
+class MemorySessionStore:
+    """
+    In-process session store with LRU and TTL eviction.
+
+    Session dicts are kept as Python objects, so nothing is serialized per
+    request. They are deep-copied on the way in and out, so as with
+    RedisSessionStore a request changes the stored state only when it saves,
+    even though the conversation updates nested answer dicts in place. State
+    lives in the worker process: with several gunicorn workers, use
+    RedisSessionStore or sticky routing.
+    """
+
+    def __init__(self, max_entries=10000, ttl=7200):
+        self.ttl = ttl
+        self._cache = TTLCache(max_entries=max_entries, ttl=ttl)
+
+    def load(self, sid):
+        return copy.deepcopy(self._cache.get(sid))
+
+    def save(self, sid, data):
+        self._cache.set(sid, copy.deepcopy(data))
+
+    def delete(self, sid):
+        self._cache.pop(sid)
+
+class RedisSessionStore:
+    """
+    Session store backed by a Redis-compatible server, shared by all workers.
+
+    Requires the optional ``redis`` package. Session dicts are stored as JSON
+    with the TTL refreshed on every save.
+    """
+
+    def __init__(self, url='redis://localhost:6379/0', ttl=7200, prefix='session:'):
+        try:
+            import redis
+        except ImportError:
+            raise RuntimeError("SESSION_BACKEND=redis requires the 'redis' package (pip install redis)")
+        self.ttl = ttl
+        self.prefix = prefix
+        self._client = redis.Redis.from_url(url)
+
+    def load(self, sid):
+        payload = self._client.get(self.prefix + sid)
+        return None if payload is None else json.loads(payload)
+
+    def save(self, sid, data):
+        self._client.setex(self.prefix + sid, int(self.ttl), json.dumps(data))
+
+    def delete(self, sid):
+        self._client.delete(self.prefix + sid)
+
+def create_session_store():
+    """
+    Build the session store selected by environment variables.
+
+    SESSION_BACKEND      'memory' (default) or 'redis'
+    SESSION_TTL          idle lifetime of a conversation in seconds (default 7200)
+    SESSION_MAX_ENTRIES  capacity of the in-memory store (default 10000)
+    SESSION_REDIS_URL    Redis URL (default redis://localhost:6379/0)
+    """
+    backend = os.getenv('SESSION_BACKEND', 'memory').lower()
+    ttl = int(os.getenv('SESSION_TTL', 7200))
+    if backend == 'redis':
+        return RedisSessionStore(url=os.getenv('SESSION_REDIS_URL', 'redis://localhost:6379/0'), ttl=ttl)
+    if backend == 'memory':
+        return MemorySessionStore(max_entries=int(os.getenv('SESSION_MAX_ENTRIES', 10000)), ttl=ttl)
+    raise ValueError(f"Unknown SESSION_BACKEND: {backend}")
+
+class ServerSideSession(CallbackDict, SessionMixin):
+    """Session dict whose contents live in a server-side store, keyed by sid."""
+
+    def __init__(self, initial=None, sid=None, new=False):
+        def on_update(self):
+            self.modified = True
+        CallbackDict.__init__(self, initial, on_update)
+        self.sid = sid
+        self.new = new
+        self.modified = False
+
+def reload_session(store, session):
+    """
+    Replace a session's contents with what the store holds now.
+
+    For requests that block for a long time (voice long-polls): without it,
+    the state loaded when the request began would be saved back at its end,
+    undoing any request on the same session that finished in the meantime.
+    """
+    if session.new:
+        return
+    data = store.load(session.sid)
+    session.clear()
+    session.update(data or {})
+
+class ServerSideSessionInterface(SessionInterface):
+    """
+    Flask session interface that keeps conversation state on the server.
+
+    The cookie carries only a random session ID. The state is written back to
+    the store after every request that has one, because the routes mutate
+    nested values (e.g. session['answers'][field]) that Flask cannot detect.
+    """
+
+    def __init__(self, store):
+        self.store = store
+
+    def open_session(self, app, request):
+        sid = request.cookies.get(app.config['SESSION_COOKIE_NAME'])
+        if sid:
+            data = self.store.load(sid)
+            if data is not None:
+                return ServerSideSession(data, sid=sid)
+        return ServerSideSession(sid=secrets.token_urlsafe(32), new=True)
+
+    def save_session(self, app, session, response):
+        name = app.config['SESSION_COOKIE_NAME']
+        domain = self.get_cookie_domain(app)
+        path = self.get_cookie_path(app)
+
+        if not session:
+            if session.modified and not session.new:
+                self.store.delete(session.sid)
+                response.delete_cookie(name, domain=domain, path=path)
+            return
+
+        self.store.save(session.sid, dict(session))
+        # The ID never changes, so the cookie only needs sending once (or to refresh its expiry)
+        if session.new or (session.permanent and app.config['SESSION_REFRESH_EACH_REQUEST']):
+            response.set_cookie(
+                name,
+                session.sid,
+                expires=self.get_expiration_time(app, session),
+                httponly=self.get_cookie_httponly(app),
+                domain=domain,
+                path=path,
+                secure=self.get_cookie_secure(app),
+                samesite=self.get_cookie_samesite(app),
+            )
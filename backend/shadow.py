@@ -0,0 +1,228 @@
+import logging
+import os
+import threading
+from collections import deque
+
+from metrics import Counter, Histogram, record_error
+
+logger = logging.getLogger(__name__)
+
+# Absolute difference between the two models' positive-class probabilities
+DELTA_BUCKETS = (0.01, 0.02, 0.05, 0.1, 0.2, 0.3, 0.5, 1.0)
+
+SHADOW_PREDICTIONS = Counter('shadow_predictions_total',
+                             'Requests re-scored by the other model, by serving arm and outcome '
+                             '(agree, disagree, dropped, stale).', ('arm', 'outcome'))
+SHADOW_DELTA = Histogram('shadow_probability_delta',
+                         'Absolute difference between live and candidate positive-class probability.',
+                         ('arm',), buckets=DELTA_BUCKETS)
+
+class _PairStats:
+    """Running comparison of one (live, candidate) version pair."""
+
+    __slots__ = ('scored', 'agreements', 'delta_sum', 'delta_max', 'served')
+
+    def __init__(self):
+        self.scored = 0
+        self.agreements = 0
+        self.delta_sum = 0.0
+        self.delta_max = 0.0
+        self.served = {'live': 0, 'candidate': 0}
+
+    def as_dict(self):
+        return {
+            'served': dict(self.served),
+            'scored': self.scored,
+            'agreements': self.agreements,
+            'agreement_rate': self.agreements / self.scored if self.scored else None,
+            'mean_abs_delta': self.delta_sum / self.scored if self.scored else None,
+            'max_abs_delta': self.delta_max,
+        }
+
+class ShadowEvaluator:
+    """
+    Compares the live model with a candidate on real traffic, off the request path.
+
+    The serving request only appends its features and result to a bounded
+    queue. A background thread drains the queue in batches, scores each batch
+    with the model that did *not* serve it (the candidate for live traffic,
+    the live model for sessions routed to the candidate) in one vectorized
+    call, and records agreement and probability deltas.
+
+    When the queue is full, new rows are dropped and counted rather than
+    slowing the request down.
+
+    Parameters:
+    -----------
+    manager : model_registry.ModelManager
+        Source of the live and candidate models
+    batch_size : int
+        Rows scored per model call
+    max_pending : int
+        Queue capacity
+    flush_interval : float
+        Longest a queued row waits before its batch is scored
+    """
+
+    def __init__(self, manager, batch_size=64, max_pending=10000, flush_interval=0.5):
+        self.manager = manager
+        self.batch_size = batch_size
+        self.max_pending = max_pending
+        self.flush_interval = flush_interval
+        self._queue = deque()
+        self._wake = threading.Event()
+        self._stats = {}
+        self._stats_lock = threading.Lock()
+        self._dropped = 0
+        self._stale = 0
+        self._worker_pid = None
+        self._worker_lock = threading.Lock()
+        self._stop = threading.Event()
+
+    @property
+    def active(self):
+        return self.manager.candidate is not None
+
+    def submit(self, features, version, prediction, probability):
+        """
+        Queue a served prediction for comparison; returns immediately.
+
+        Parameters:
+        -----------
+        features : sequence of float
+            The feature row the serving model scored, in pipeline column order
+        version : str
+            Version that served the request
+        prediction, probability : int, float
+            What that version returned
+
+        Returns:
+        --------
+        bool
+            Whether the row was queued (False without a candidate or when full)
+        """
+        candidate = self.manager.candidate
+        if candidate is None:
+            return False
+        live = self.manager.version
+        arm = 'candidate' if version == candidate.version else 'live'
+        # One lock around the bound check and the append, so concurrent requests cannot overfill the queue
+        with self._stats_lock:
+            self._pair(live, candidate.version).served[arm] += 1
+            queued = len(self._queue) < self.max_pending
+            if queued:
+                self._queue.append((live, candidate.version, version, features, prediction, probability))
+            else:
+                self._dropped += 1
+        if not queued:
+            SHADOW_PREDICTIONS.inc(arm=arm, outcome='dropped')
+            return False
+        self._ensure_worker()
+        if len(self._queue) >= self.batch_size:
+            self._wake.set()
+        return True
+
+    def _pair(self, live, candidate):
+        stats = self._stats.get((live, candidate))
+        if stats is None:
+            stats = self._stats[(live, candidate)] = _PairStats()
+        return stats
+
+    def _ensure_worker(self):
+        # Threads do not survive fork, so each gunicorn worker starts its own scorer
+        if self._worker_pid == os.getpid():
+            return
+        with self._worker_lock:
+            if self._worker_pid == os.getpid():
+                return
+            self._worker_pid = os.getpid()
+            threading.Thread(target=self._run, name='shadow-scorer', daemon=True).start()
+
+    def _run(self):
+        while not self._stop.is_set():
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            try:
+                self.flush()
+            except Exception as e:
+                record_error('shadow', e)
+                logger.exception("Shadow scoring failed")
+
+    def flush(self):
+        """
+        Score everything queued so far.
+
+        Returns:
+        --------
+        int
+            Number of rows compared
+        """
+        compared = 0
+        while self._queue:
+            batch = []
+            while self._queue and len(batch) < self.batch_size:
+                batch.append(self._queue.popleft())
+            compared += self._score(batch)
+        return compared
+
+    def _score(self, batch):
+        import numpy as np
+
+        # Group rows by the version that must re-score them
+        groups = {}
+        for row in batch:
+            live, candidate, served = row[:3]
+            other = candidate if served == live else live
+            groups.setdefault((live, candidate, other), []).append(row)
+
+        compared = 0
+        for (live, candidate, other), rows in groups.items():
+            arm = 'live' if other == candidate else 'candidate'
+            handle = self.manager.acquire_version(other)
+            if handle is None:
+                # The version was swapped out while the rows waited
+                self._stale += len(rows)
+                SHADOW_PREDICTIONS.inc(len(rows), arm=arm, outcome='stale')
+                continue
+            try:
+                pipeline = handle.pipeline
+                probabilities = pipeline.predict_proba(np.array([row[3] for row in rows], dtype=np.float64))
+                predictions = pipeline.classes_.take(probabilities.argmax(axis=1))
+            finally:
+                handle.release()
+
+            deltas = np.abs(probabilities[:, 1] - np.array([row[5] for row in rows]))
+            agree = predictions == np.array([row[4] for row in rows])
+            for delta in deltas:
+                SHADOW_DELTA.observe(float(delta), arm=arm)
+            agreements = int(agree.sum())
+            SHADOW_PREDICTIONS.inc(agreements, arm=arm, outcome='agree')
+            SHADOW_PREDICTIONS.inc(len(rows) - agreements, arm=arm, outcome='disagree')
+            with self._stats_lock:
+                stats = self._pair(live, candidate)
+                stats.scored += len(rows)
+                stats.agreements += agreements
+                stats.delta_sum += float(deltas.sum())
+                stats.delta_max = max(stats.delta_max, float(deltas.max()))
+            compared += len(rows)
+        return compared
+
+    def stats(self):
+        """Agreement and probability-delta summary per (live, candidate) pair."""
+        candidate = self.manager.candidate
+        with self._stats_lock:
+            comparisons = [dict(live=live, candidate=cand, **stats.as_dict())
+                           for (live, cand), stats in self._stats.items()]
+        return {
+            'live_version': self.manager.version,
+            'candidate_version': candidate.version if candidate is not None else None,
+            'candidate_percent': self.manager.candidate_percent if candidate is not None else 0,
+            'pending': len(self._queue),
+            'dropped': self._dropped,
+            'stale': self._stale,
+            'comparisons': comparisons,
+        }
+
+    def stop(self):
+        self._stop.set()
+        self._wake.set()
@@ -0,0 +1,185 @@
+import json
+import os
+import threading
+
+# Vocabulary for spoken numbers; parse_number_words turns these back into digits
+_UNITS = ['zero', 'one', 'two', 'three', 'four', 'five', 'six', 'seven', 'eight', 'nine',
+          'ten', 'eleven', 'twelve', 'thirteen', 'fourteen', 'fifteen', 'sixteen',
+          'seventeen', 'eighteen', 'nineteen']
+_TENS = ['twenty', 'thirty', 'forty', 'fifty', 'sixty', 'seventy', 'eighty', 'ninety']
+_NUMBER_VALUES = {word: i for i, word in enumerate(_UNITS)}
+_NUMBER_VALUES.update({word: 20 + 10 * i for i, word in enumerate(_TENS)})
+NUMBER_WORDS = _UNITS + _TENS + ['hundred', 'point', 'and']
+
+def parse_number_words(text):
+    """
+    Convert a spoken number such as "one hundred forty five" or "zero point six two"
+    to a float. Returns None if the text contains no number words.
+    """
+    words = [word for word in text.lower().replace('-', ' ').split() if word != 'and']
+    if not any(word in _NUMBER_VALUES for word in words):
+        return None
+
+    whole, current, decimals, in_decimals = 0, 0, '', False
+    for word in words:
+        if word == 'point':
+            in_decimals = True
+        elif word in _NUMBER_VALUES:
+            if in_decimals:
+                decimals += str(_NUMBER_VALUES[word])
+            else:
+                current += _NUMBER_VALUES[word]
+        elif word == 'hundred' and not in_decimals:
+            whole += max(current, 1) * 100
+            current = 0
+        elif whole or current or decimals:
+            break
+    value = whole + current
+    return float(f"{value}.{decimals}") if decimals else float(value)
+
+def build_grammar(choices=(), numeric=False):
+    """
+    Phrase list for a grammar-restricted recognizer.
+
+    Parameters:
+    -----------
+    choices : iterable of str
+        Words accepted for the current question (e.g. yes/no or an enumeration)
+    numeric : bool
+        Whether spoken numbers are expected
+
+    Returns:
+    --------
+    list of str or None
+        Vocabulary including the '[unk]' token, or None for an unrestricted question
+    """
+    words = list(choices) + (NUMBER_WORDS if numeric else [])
+    if not words:
+        return None
+    return sorted(set(words)) + ['[unk]']
+
+class SpeechBackend:
+    """Interface for speech-to-text engines used by the voice pipeline."""
+
+    name = 'base'
+
+    def warm_up(self):
+        """Load models ahead of the first request (called once per worker)."""
+
+    def recognize(self, audio, grammar=None):
+        """
+        Transcribe 16 kHz mono AudioData.
+
+        Raises speech_recognition.UnknownValueError when nothing intelligible was
+        heard and speech_recognition.RequestError when the engine is unavailable.
+        """
+        raise NotImplementedError
+
+class GoogleSpeechBackend(SpeechBackend):
+    """Google Web Speech API via speech_recognition (needs network; ignores grammar)."""
+
+    name = 'google'
+
+    def __init__(self):
+        import speech_recognition as sr
+        self._recognizer = sr.Recognizer()
+
+    def recognize(self, audio, grammar=None):
+        return self._recognizer.recognize_google(audio)
+
+class VoskSpeechBackend(SpeechBackend):
+    """
+    Offline recognition with Vosk, loaded once per worker process.
+
+    The acoustic model is shared by all requests. Recognizers are kept warm in a
+    small pool per grammar and reset between utterances, so only the first
+    utterance for a given question pays the construction cost.
+
+    Parameters:
+    -----------
+    model_path : str
+        Directory of an unpacked Vosk model (e.g. vosk-model-small-en-us)
+    pool_size : int
+        Idle recognizers kept per grammar
+    """
+
+    name = 'vosk'
+
+    def __init__(self, model_path, pool_size=2):
+        self.model_path = model_path
+        self.pool_size = pool_size
+        self._model = None
+        self._pools = {}
+        self._lock = threading.Lock()
+
+    def warm_up(self):
+        with self._lock:
+            if self._model is None:
+                try:
+                    import vosk
+                except ImportError:
+                    raise RuntimeError("SPEECH_BACKEND=vosk requires the 'vosk' package (pip install vosk)")
+                vosk.SetLogLevel(-1)
+                self._model = vosk.Model(self.model_path)
+        return self._model
+
+    def _acquire(self, grammar_key):
+        with self._lock:
+            pool = self._pools.get(grammar_key)
+            if pool:
+                return pool.pop()
+        from vosk import KaldiRecognizer
+        model = self.warm_up()
+        if grammar_key is None:
+            return KaldiRecognizer(model, 16000)
+        return KaldiRecognizer(model, 16000, grammar_key)
+
+    def _release(self, grammar_key, recognizer):
+        recognizer.Reset()
+        with self._lock:
+            pool = self._pools.setdefault(grammar_key, [])
+            if len(pool) < self.pool_size:
+                pool.append(recognizer)
+
+    def recognize(self, audio, grammar=None):
+        grammar_key = json.dumps(grammar) if grammar else None
+        recognizer = self._acquire(grammar_key)
+        try:
+            recognizer.AcceptWaveform(audio.get_raw_data(convert_rate=16000, convert_width=2))
+            text = json.loads(recognizer.FinalResult()).get('text', '')
+        finally:
+            self._release(grammar_key, recognizer)
+
+        text = ' '.join(word for word in text.split() if word != '[unk]')
+        if not text:
+            import speech_recognition as sr
+            raise sr.UnknownValueError()
+        return text
+
+class StubSpeechBackend(SpeechBackend):
+    """Returns a fixed transcript; for local development, tests and load tests."""
+
+    name = 'stub'
+
+    def __init__(self, text='yes'):
+        self.text = text
+
+    def recognize(self, audio, grammar=None):
+        return self.text
+
+def create_speech_backend():
+    """
+    Build the backend selected by environment variables.
+
+    SPEECH_BACKEND     'google' (default), 'vosk' or 'stub'
+    VOSK_MODEL_PATH    model directory for the vosk backend (default 'vosk-model')
+    SPEECH_STUB_TEXT   transcript returned by the stub backend (default 'yes')
+    """
+    backend = os.getenv('SPEECH_BACKEND', 'google').lower()
+    if backend == 'google':
+        return GoogleSpeechBackend()
+    if backend == 'vosk':
+        return VoskSpeechBackend(os.getenv('VOSK_MODEL_PATH', 'vosk-model'))
+    if backend == 'stub':
+        return StubSpeechBackend(os.getenv('SPEECH_STUB_TEXT', 'yes'))
+    raise ValueError(f"Unknown SPEECH_BACKEND: {backend}")
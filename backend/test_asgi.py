@@ -0,0 +1,111 @@
+import asyncio
+import io
+import threading
+import wave
+
+import numpy as np
+import pytest
+
+import app as routes
+from app import create_app
+from asgi import create_asgi_app
+from load_test import SCENARIOS, AsgiClient, FlaskClient, call_asgi, run_load_test
+from session_store import MemorySessionStore
+from test_predict_batch import serving_model, serving_registry  # noqa: F401 (fixtures)
+from voice_jobs import VoiceJobQueue
+
+@pytest.fixture(scope='module')
+def loop():
+    loop = AsgiClient.start_loop()
+    yield loop
+    loop.call_soon_threadsafe(loop.stop)
+
+@pytest.fixture
+def asgi_app(serving_model):
+    return create_asgi_app(store=MemorySessionStore(), warm_up=False)
+
+def wav_upload(boundary='XyZ'):
+    buffer = io.BytesIO()
+    with wave.open(buffer, 'wb') as wav:
+        wav.setnchannels(1)
+        wav.setsampwidth(2)
+        wav.setframerate(16000)
+        wav.writeframes(np.zeros(1600, dtype='<i2').tobytes())
+    body = (f'--{boundary}\r\nContent-Disposition: form-data; name="audio"; filename="a.wav"\r\n'
+            f'Content-Type: audio/wav\r\n\r\n').encode() + buffer.getvalue() + f'\r\n--{boundary}--\r\n'.encode()
+    return body, [('Content-Type', f'multipart/form-data; boundary={boundary}')]
+
+def test_same_responses_as_flask(asgi_app, loop):
+    flask_client = FlaskClient(create_app({'TESTING': True}))
+    asgi_client = AsgiClient(asgi_app, loop)
+    script = [('POST', '/api/reset', None), ('GET', '/api/current-question', None),
+              ('POST', '/api/process-text', {'text': 'female'}), ('POST', '/api/process-text', {'text': 'abc'}),
+              ('POST', '/api/process-text', {'text': '2'}), ('POST', '/api/preventive-measures', None),
+              ('GET', '/api/predict', None), ('POST', '/api/predict/batch', {'rows': [[1, 120, 70, 20, 80, 32.0, 0.4, 33]]}),
+              ('POST', '/api/process-text', None)]
+    for method, path, payload in script:
+        assert asgi_client.request(method, path, payload) == flask_client.request(method, path, payload), path
+
+def test_whole_conversations(asgi_app, loop):
+    result = run_load_test(lambda: AsgiClient(asgi_app, loop), conversations=len(SCENARIOS), concurrency=3)
+    assert result['failed_conversations'] == 0
+    assert result['endpoints']['GET /api/predict']['count'] == len(SCENARIOS)
+    assert result['total']['errors'] == 0
+
+def test_routing_cookies_and_cors(asgi_app):
+    async def scenario():
+        status, headers, _ = await call_asgi(asgi_app, 'GET', '/api/current-question', headers=[('Origin', 'http://ui')])
+        headers = dict(headers)
+        assert status == 200
+        assert headers['access-control-allow-origin'] == 'http://ui'
+        assert headers['access-control-allow-credentials'] == 'true'
+        assert 'HttpOnly' in headers['set-cookie']
+
+        status, headers, _ = await call_asgi(asgi_app, 'OPTIONS', '/api/process-text', headers=[
+            ('Origin', 'http://ui'), ('Access-Control-Request-Method', 'POST'),
+            ('Access-Control-Request-Headers', 'content-type')])
+        assert status == 200 and dict(headers)['access-control-allow-headers'] == 'content-type'
+
+        assert (await call_asgi(asgi_app, 'GET', '/api/process-text'))[0] == 405
+        assert (await call_asgi(asgi_app, 'GET', '/api/nope'))[0] == 404
+        status, _, body = await call_asgi(asgi_app, 'GET', '/metrics')
+        assert status == 200 and b'route="/api/current-question"' in body
+
+    asyncio.run(scenario())
+
+def test_voice_waits_do_not_hold_the_event_loop(asgi_app, loop, monkeypatch):
+    release = threading.Event()
+
+    def slow_transcribe(audio_data, grammar=None):
+        release.wait(30)
+        return 'female'
+
+    queue = VoiceJobQueue(slow_transcribe, max_workers=100, max_pending=100)
+    monkeypatch.setattr(routes.voice, '_value', queue)
+    body, headers = wav_upload()
+
+    async def conversation(index):
+        status, response_headers, _ = await call_asgi(asgi_app, 'GET', '/api/current-question')
+        cookie = dict(response_headers)['set-cookie'].split(';', 1)[0]
+        if index % 2:
+            # Half the sessions wait on recognition while the other half keep talking
+            status, _, content = await call_asgi(asgi_app, 'POST', '/api/process-voice', body,
+                                                 headers + [('Cookie', cookie)])
+            return 'voice', content
+        status, _, content = await call_asgi(asgi_app, 'POST', '/api/process-text', b'{"text": "male"}',
+                                             [('Content-Type', 'application/json'), ('Cookie', cookie)])
+        return 'text', content
+
+    async def scenario():
+        tasks = [asyncio.ensure_future(conversation(index)) for index in range(200)]
+        text_tasks, voice_tasks = tasks[::2], tasks[1::2]
+        # Every text request completes while 100 voice requests are still waiting
+        _, pending = await asyncio.wait(text_tasks, timeout=10)
+        assert not pending
+        assert not any(task.done() for task in voice_tasks)
+        release.set()
+        results = await asyncio.gather(*tasks)
+        assert all(b'"transcript": "female"' in content for kind, content in results if kind == 'voice')
+
+    asyncio.run_coroutine_threadsafe(scenario(), loop).result(60)
+    queue.shutdown()
@@ -0,0 +1,49 @@
+from conversation import FOLLOW_UP_STEPS, MAIN_STEPS, advance, current_step
+
+def run(state, *answers):
+    return [advance(state, answer) for answer in answers][-1]
+
+def test_male_skips_pregnancies():
+    state = {}
+    response = advance(state, 'male')
+    assert state['answers'] == {'Gender': 'male', 'Pregnancies': 0}
+    assert response['next_feature'] == 'Glucose'
+    assert current_step(state) is MAIN_STEPS['Glucose']
+
+def test_follow_up_branch_uses_its_own_prompts():
+    state = {}
+    response = run(state, 'female', '2', '55')
+    assert response['is_follow_up'] and response['next_follow_up'] == 'GlucoseSymptoms'
+    assert 'dizziness' in response['question_text']
+
+    # An invalid answer repeats the prompt of the branch actually being asked
+    response = advance(state, 'maybe')
+    assert response['status'] == 'error'
+    assert response['question_text'] == FOLLOW_UP_STEPS[('Glucose.low', 'GlucoseSymptoms')].prompt
+
+    response = run(state, 'yep', 'three', 'no', 'n')
+    assert state['follow_up_answers'] == {'GlucoseSymptoms': 'yes', 'GlucoseLastMeal': 3.0,
+                                          'GlucoseMedication': 'no', 'GlucoseHistory': 'no'}
+    assert response['message'].startswith('Thank you for providing that information.')
+    assert response['next_feature'] == 'BloodPressure'
+
+def test_elderly_follow_ups_before_completion():
+    state = {}
+    response = run(state, 'f', '1', '100', '120', '20', '10', '22', '0.5', '70')
+    assert response['next_follow_up'] == 'AgeActivity'
+    response = run(state, 'active', 'no', '2', 'yes', 'yearly')
+    assert response['is_complete'] and response['status'] == 'success'
+    assert current_step(state) is None
+    assert advance(state, 'yes')['status'] == 'error'
+
+def test_invalid_main_answer_keeps_state():
+    state = {}
+    advance(state, 'female')
+    response = advance(state, '-1')
+    assert response['message'] == 'Please provide a valid number of pregnancies (0-17).'
+    assert response['current_question'] == 'Pregnancies'
+
+def test_grammar_follows_validator():
+    assert MAIN_STEPS['Gender'].grammar == ['boy', 'female', 'girl', 'male', 'man', 'woman', '[unk]']
+    assert 'hundred' in MAIN_STEPS['Glucose'].grammar
+    assert 'nope' in FOLLOW_UP_STEPS[('BloodPressure.high', 'BPStress')].grammar
@@ -0,0 +1,72 @@
+import mmap
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from dataset import content_hash, load_bundle, load_dataset, read_schema, save_dataset
+
+def is_mapped(array):
+    while array is not None:
+        if isinstance(array, mmap.mmap):
+            return True
+        array = getattr(array, 'base', None)
+    return False
+
+def test_csv_is_converted_once_and_memory_mapped(tmp_path):
+    csv_path = str(tmp_path / 'data.csv')
+    pd.read_csv('diabetes.csv').to_csv(csv_path, index=False)
+    expected = pd.read_csv(csv_path)
+
+    df = load_dataset(csv_path)
+    pd.testing.assert_frame_equal(df, expected)
+    assert all(is_mapped(df[column].to_numpy()) for column in df.columns)
+    schema = read_schema(csv_path)
+    assert schema['rows'] == len(expected)
+    assert [c['name'] for c in schema['columns']] == list(expected.columns)
+    assert schema['sha256'] == content_hash(expected)
+
+    # Unchanged CSV: the bundle is reused rather than rebuilt
+    mtime = os.stat(tmp_path / 'data.npyds' / 'schema.json').st_mtime_ns
+    load_dataset(csv_path)
+    assert os.stat(tmp_path / 'data.npyds' / 'schema.json').st_mtime_ns == mtime
+
+    # Edited CSV: the bundle is rebuilt
+    expected.head(10).to_csv(csv_path, index=False)
+    assert len(load_dataset(csv_path)) == 10
+
+def test_bundle_round_trip_and_verification(tmp_path):
+    df = pd.DataFrame({'a': np.arange(5, dtype=np.int64), 'b': np.linspace(0, 1, 5), 'c': [True, False] * 2 + [True]})
+    path = save_dataset(df, str(tmp_path / 'small.npyds'))
+    loaded = load_bundle(path, verify=True)
+    pd.testing.assert_frame_equal(loaded, df)
+    # Columns are shared with the mapped files, not copied
+    assert is_mapped(loaded['b'].to_numpy())
+    assert not is_mapped(load_bundle(path, mmap_mode=None)['b'].to_numpy())
+
+    column = np.load(os.path.join(path, '001.npy'))
+    column[0] = 42.0
+    np.save(os.path.join(path, '001.npy'), column)
+    with pytest.raises(ValueError, match='Content hash'):
+        load_bundle(path, verify=True)
+
+    with pytest.raises(ValueError, match='not numeric'):
+        save_dataset(pd.DataFrame({'name': ['x', 'y']}), str(tmp_path / 'text.npyds'))
+
+def test_concurrent_rebuilds_and_reads(tmp_path):
+    df = pd.DataFrame({'a': np.arange(1000, dtype=np.int64), 'b': np.linspace(0, 1, 1000)})
+    path = save_dataset(df, str(tmp_path / 'shared.npyds'))
+
+    def rebuild(_):
+        save_dataset(df, path)
+
+    def read(_):
+        pd.testing.assert_frame_equal(load_bundle(path, mmap_mode=None), df)
+
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        futures = [pool.submit(rebuild if i % 4 == 0 else read, i) for i in range(200)]
+        for future in futures:
+            future.result()
+    assert sorted(os.listdir(tmp_path)) == ['shared.npyds', 'shared.npyds.lock']
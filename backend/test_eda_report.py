@@ -0,0 +1,52 @@
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+from eda_report import build_report, grouped_statistics
+
+def test_grouped_statistics_match_describe():
+    df = pd.read_csv('diabetes.csv')
+    summary = grouped_statistics(df)
+    assert list(summary.index.get_level_values('group').unique()) == [0, 1, 'all']
+
+    for feature in ['Glucose', 'Insulin', 'Age']:
+        for outcome in (0, 1):
+            expected = df[df['Outcome'] == outcome][feature].describe()
+            np.testing.assert_allclose(summary.loc[(outcome, feature), expected.index].astype(float), expected)
+        expected = df[feature].describe()
+        np.testing.assert_allclose(summary.loc[('all', feature), expected.index].astype(float), expected)
+    assert summary.loc[('all', 'Insulin'), 'zeros'] == (df['Insulin'] == 0).sum()
+
+def test_grouped_statistics_edge_cases():
+    # A row without a target, a group with one value and a group with none
+    df = pd.DataFrame({'a': [1.0, 2.0, 3.0, 4.0, np.nan], 'b': [np.nan, np.nan, 5.0, 6.0, 0.0],
+                       'Outcome': [0, 0, 1, np.nan, 2]})
+    summary = grouped_statistics(df)
+    assert list(summary.index.get_level_values('group').unique()) == [0, 1, 2, 'all']
+    for feature in ['a', 'b']:
+        for outcome in (0, 1, 2):
+            expected = df[df['Outcome'] == outcome][feature].describe()
+            np.testing.assert_allclose(summary.loc[(outcome, feature), expected.index].astype(float), expected)
+        expected = df[feature].describe()
+        np.testing.assert_allclose(summary.loc[('all', feature), expected.index].astype(float), expected)
+    assert summary.loc[('all', 'b'), ['zeros', 'missing']].tolist() == [1, 2]
+
+def test_report_writes_figures_json_and_html(tmp_path):
+    csv_path = str(tmp_path / 'sample.csv')
+    pd.read_csv('diabetes.csv').head(120).to_csv(csv_path, index=False)
+    output_dir = str(tmp_path / 'report')
+
+    report = build_report([('sample', csv_path)], output_dir, jobs=2)
+
+    dataset = report['datasets'][0]
+    assert dataset['rows'] == 120
+    assert len(dataset['figures']) == 6
+    assert all(os.path.getsize(figure['path']) > 0 for figure in dataset['figures'])
+    assert set(dataset['statistics']) == {'0', '1', 'all'}
+    assert {'sample_statistics', 'figures', 'total'} <= set(report['timings'])
+    with open(os.path.join(output_dir, 'report.json')) as f:
+        assert json.load(f)['datasets'][0]['class_distribution'] == dataset['class_distribution']
+    with open(os.path.join(output_dir, 'report.html')) as f:
+        assert 'sample_01_histograms.png' in f.read()
@@ -0,0 +1,61 @@
+import time
+
+import numpy as np
+import pandas as pd
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.model_selection import train_test_split
+from sklearn.preprocessing import StandardScaler
+
+from forest_engine import compile_forest
+
+def load_processed_data():
+    """Scaled features and labels from processed_diabetes.csv, split as in train_model.py."""
+    df = pd.read_csv('processed_diabetes.csv')
+    X = StandardScaler().fit_transform(df.drop('Outcome', axis=1))
+    y = df['Outcome']
+    return train_test_split(X, y, test_size=0.2, random_state=42)
+
+def test_forest_engine_matches_sklearn():
+    X_train, X_test, y_train, y_test = load_processed_data()
+    model = RandomForestClassifier(n_estimators=100, random_state=42)
+    model.fit(X_train, y_train)
+    engine = compile_forest(model)
+
+    X_all = np.vstack([X_train, X_test])
+    assert np.array_equal(engine.predict_proba(X_all), model.predict_proba(X_all))
+    assert np.array_equal(engine.predict(X_all), model.predict(X_all))
+
+    # Single-row path agrees with the batch path
+    for row in X_test[:20]:
+        prediction, probability = engine.predict_one(row)
+        assert prediction == model.predict(row.reshape(1, -1))[0]
+        assert probability == model.predict_proba(row.reshape(1, -1))[0][1]
+
+def test_forest_engine_depth_limited_forest():
+    X_train, X_test, y_train, y_test = load_processed_data()
+    model = RandomForestClassifier(n_estimators=25, max_depth=4, min_samples_leaf=3,
+                                   class_weight='balanced', random_state=0)
+    model.fit(X_train, y_train)
+    engine = compile_forest(model)
+
+    assert engine.max_depth <= 4
+    assert np.array_equal(engine.predict_proba(X_test), model.predict_proba(X_test))
+
+if __name__ == "__main__":
+    X_train, X_test, y_train, y_test = load_processed_data()
+    model = RandomForestClassifier(n_estimators=100, random_state=42).fit(X_train, y_train)
+    engine = compile_forest(model)
+    row = X_test[:1]
+
+    for name, predict in [("sklearn", lambda: (model.predict(row), model.predict_proba(row))),
+                          ("compiled", lambda: engine.predict_one(row))]:
+        runs = 200
+        start = time.perf_counter()
+        for _ in range(runs):
+            predict()
+        elapsed = (time.perf_counter() - start) / runs
+        print(f"{name}: {elapsed * 1e6:.1f} µs per single prediction")
+
+    test_forest_engine_matches_sklearn()
+    test_forest_engine_depth_limited_forest()
+    print("Compiled forest matches sklearn exactly.")
@@ -0,0 +1,61 @@
+import numpy as np
+import pandas as pd
+from sklearn.impute import KNNImputer
+
+from imputer import KDTreeImputer
+from pipeline import ZERO_NOT_ALLOWED
+
+def load_rows():
+    return pd.read_csv('diabetes.csv')[ZERO_NOT_ALLOWED].replace(0, np.nan)
+
+def test_matches_brute_force_knn():
+    rows = load_rows()
+    imputer = KDTreeImputer(n_neighbors=5)
+    reference = imputer.fit_transform(rows)
+    assert np.array_equal(reference, KNNImputer(n_neighbors=5, weights='distance').fit_transform(rows))
+
+    rng = np.random.default_rng(0)
+    queries = reference[rng.integers(0, len(reference), 1000)] + rng.normal(0, 3, (1000, 5))
+    queries[rng.random(queries.shape) < 0.4] = np.nan
+    queries[:5] = reference[:5]
+    queries[:5, 3] = np.nan
+
+    expected = KNNImputer(n_neighbors=5, weights='distance').fit(reference).transform(queries)
+    imputed = imputer.transform(queries)
+    assert not np.isnan(imputed).any()
+    assert np.array_equal(imputed[:5, 3], reference[:5, 3])
+
+    # Results differ only where several donors tie for the k-th nearest place
+    for i in np.flatnonzero(~np.isclose(imputed, expected).all(axis=1)):
+        present = ~np.isnan(queries[i])
+        distances = np.sort(np.sqrt(((reference[:, present] - queries[i, present]) ** 2).sum(axis=1)))
+        assert np.isclose(distances[4], distances[5])
+
+def test_single_rows_match_batch():
+    imputer = KDTreeImputer().fit(load_rows())
+    batch = np.array([
+        [120, 70, np.nan, np.nan, 32.0],
+        [np.nan, np.nan, np.nan, np.nan, np.nan],
+        [150, 80, 30, 100, 33.0],
+        [np.nan, 90, 25, np.nan, np.nan],
+    ])
+    imputed = imputer.transform(batch)
+    assert np.array_equal(imputed[1], imputer.means_)
+    assert np.array_equal(imputed[2], batch[2])
+    for row, expected in zip(batch, imputed):
+        assert np.array_equal(imputer.transform(row)[0], expected)
+
+def test_one_neighbor_and_fewer_rows_than_neighbors():
+    rows = load_rows().dropna().to_numpy()
+    queries = rows[:50] + np.random.default_rng(0).normal(0, 0.5, (50, 5))
+    queries[::2, 0] = np.nan
+    queries[1::2, 3] = np.nan
+
+    imputer = KDTreeImputer(n_neighbors=1).fit(rows)
+    expected = KNNImputer(n_neighbors=1, weights='distance').fit(rows).transform(queries)
+    assert np.allclose(imputer.transform(queries), expected)
+
+    few = rows[:3]
+    imputer = KDTreeImputer(n_neighbors=5).fit(few)
+    expected = KNNImputer(n_neighbors=5, weights='distance').fit(few).transform(queries)
+    assert np.allclose(imputer.transform(queries), expected)
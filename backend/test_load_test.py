@@ -0,0 +1,22 @@
+from load_test import SCENARIOS, FlaskClient, compare, run_load_test
+from test_predict_batch import serving_model, serving_registry  # noqa: F401 (fixtures)
+
+def test_every_scenario_completes(serving_model):
+    from app import create_app
+    app = create_app({'TESTING': True})
+    result = run_load_test(lambda: FlaskClient(app), conversations=len(SCENARIOS), concurrency=2)
+    assert result['failed_conversations'] == 0
+    assert result['scenarios'] == {name: 1 for name in SCENARIOS}
+    assert result['endpoints']['GET /api/predict']['count'] == len(SCENARIOS)
+    assert result['total']['errors'] == 0
+
+def test_compare_flags_latency_and_throughput_regressions():
+    def run(p95, rps):
+        return {'endpoints': {'POST /api/process-text': {'p50_ms': 1.0, 'p95_ms': p95, 'p99_ms': 10.0}},
+                'total': {'rps_per_worker': rps}}
+    baseline = run(p95=4.0, rps=500.0)
+    assert compare(baseline, run(p95=4.4, rps=450.0)) == []
+    assert compare(baseline, run(p95=6.0, rps=300.0)) == [
+        "POST /api/process-text p95_ms: 4.00 -> 6.00",
+        "rps_per_worker: 500.0 -> 300.0",
+    ]
@@ -0,0 +1,40 @@
+import logging
+
+import pytest
+
+from metrics import Counter, Histogram, Registry, SampledFilter
+
+def test_counter_and_histogram_exposition():
+    registry = Registry()
+    requests = Counter('requests_total', 'Requests.', ('route',), registry=registry)
+    latency = Histogram('latency_seconds', 'Latency.', ('stage',), buckets=(0.01, 0.1), registry=registry)
+
+    requests.inc(route='/api/predict')
+    requests.inc(2, route='/api/predict')
+    for value in (0.005, 0.05, 3.0):
+        latency.observe(value, stage='inference')
+
+    assert requests.value(route='/api/predict') == 3
+    assert latency.count(stage='inference') == 3
+    text = registry.render()
+    assert '# TYPE requests_total counter\nrequests_total{route="/api/predict"} 3\n' in text
+    assert 'latency_seconds_bucket{stage="inference",le="0.01"} 1\n' in text
+    assert 'latency_seconds_bucket{stage="inference",le="0.1"} 2\n' in text
+    assert 'latency_seconds_bucket{stage="inference",le="+Inf"} 3\n' in text
+    assert 'latency_seconds_count{stage="inference"} 3\n' in text
+
+def test_timer_records_on_exception_and_labels_are_checked():
+    latency = Histogram('stage_seconds', 'Stages.', ('stage',), registry=None)
+    with pytest.raises(ZeroDivisionError):
+        with latency.time(stage='render'):
+            1 / 0
+    assert latency.count(stage='render') == 1
+    with pytest.raises(ValueError):
+        latency.observe(1.0, route='x')
+
+def test_sampled_filter_keeps_warnings():
+    drop_all = SampledFilter(sample_rate=0.0)
+    record = lambda level: logging.LogRecord('app', level, __file__, 1, 'message', None, None)
+    assert not drop_all.filter(record(logging.INFO))
+    assert drop_all.filter(record(logging.WARNING))
+    assert SampledFilter(sample_rate=1.0).filter(record(logging.DEBUG))
@@ -0,0 +1,58 @@
+import pytest
+
+from model_registry import ModelManager, activate, current_version, list_versions, load_version, publish
+from pipeline import build_pipeline, save_pipeline
+from test_pipeline import fit_reference_pipeline
+
+ROW = [2, 150, 80, 30, 100, 33.0, 0.5, 45]
+
+@pytest.fixture(scope='module')
+def pipeline():
+    return build_pipeline(*fit_reference_pipeline(), metadata={'accuracy': 0.75})
+
+def test_publish_and_activate(tmp_path, pipeline):
+    registry = str(tmp_path)
+    assert publish(pipeline, registry, metrics={'accuracy': 0.75}) == 'v0001'
+    assert publish(pipeline, registry, make_current=False) == 'v0002'
+    assert list_versions(registry) == ['v0001', 'v0002']
+    assert current_version(registry) == 'v0001'
+
+    loaded, metadata = load_version('v0001', registry)
+    assert metadata['metrics'] == {'accuracy': 0.75}
+    assert metadata['feature_columns'] == pipeline.feature_columns
+    assert loaded.predict_one(ROW) == pipeline.predict_one(ROW)
+
+    activate('v0002', registry)
+    assert current_version(registry) == 'v0002'
+    with pytest.raises(ValueError):
+        activate('v0009', registry)
+
+def test_corrupted_artifact_is_rejected(tmp_path, pipeline):
+    registry = str(tmp_path)
+    publish(pipeline, registry)
+    with open(tmp_path / 'v0001' / 'pipeline.joblib', 'ab') as f:
+        f.write(b'\0')
+    with pytest.raises(ValueError, match='Checksum'):
+        load_version('v0001', registry)
+
+def test_swap_keeps_in_flight_requests_on_their_version(tmp_path, pipeline):
+    registry = str(tmp_path)
+    publish(pipeline, registry)
+    manager = ModelManager(registry, poll_interval=0)
+
+    with manager.acquire() as in_flight:
+        assert in_flight.version == 'v0001'
+        publish(pipeline, registry)
+        assert manager.reload()
+        assert manager.version == 'v0002'
+        # The retired version stays usable until its last request finishes
+        assert in_flight.pipeline.predict_one(ROW) == pipeline.predict_one(ROW)
+    assert in_flight.pipeline is None
+    assert not manager.reload()
+
+def test_falls_back_to_standalone_artifact(tmp_path, pipeline):
+    path = save_pipeline(pipeline, str(tmp_path / 'pipeline.joblib'))
+    manager = ModelManager(str(tmp_path / 'registry'), poll_interval=0, fallback_path=path)
+    with manager.acquire() as handle:
+        assert handle.version == 'unversioned'
+        assert handle.prediction_cache.predict_one(ROW)[0] in (0, 1)
@@ -0,0 +1,38 @@
+import numpy as np
+import pandas as pd
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.preprocessing import StandardScaler
+
+from imputer import KDTreeImputer
+from pipeline import FEATURE_COLUMNS, ZERO_NOT_ALLOWED, build_pipeline, load_pipeline, save_pipeline
+
+def fit_reference_pipeline():
+    """Fit the same transformers and forest as preprocess_data.py/train_model.py, without writing files."""
+    df = pd.read_csv('diabetes.csv')
+    df[ZERO_NOT_ALLOWED] = df[ZERO_NOT_ALLOWED].replace(0, np.nan)
+    imputer = KDTreeImputer(n_neighbors=5)
+    df[ZERO_NOT_ALLOWED] = imputer.fit_transform(df[ZERO_NOT_ALLOWED])
+    scaler = StandardScaler()
+    X = scaler.fit_transform(df[FEATURE_COLUMNS])
+    model = RandomForestClassifier(n_estimators=30, random_state=42).fit(X, df['Outcome'])
+    return imputer, scaler, model
+
+def test_pipeline_matches_sklearn_path(tmp_path):
+    imputer, scaler, model = fit_reference_pipeline()
+    path = save_pipeline(build_pipeline(imputer, scaler, model), str(tmp_path / 'pipeline.joblib'))
+    pipeline = load_pipeline(path)
+
+    # Tree arrays are memory-mapped rather than copied into the process
+    assert isinstance(pipeline.forest.threshold, np.memmap)
+
+    raw = pd.read_csv('diabetes.csv')[FEATURE_COLUMNS]
+    expected_input = raw.copy()
+    expected_input[ZERO_NOT_ALLOWED] = expected_input[ZERO_NOT_ALLOWED].replace(0, np.nan)
+    expected_input[ZERO_NOT_ALLOWED] = imputer.transform(expected_input[ZERO_NOT_ALLOWED])
+    expected = model.predict_proba(scaler.transform(expected_input).astype(np.float64))
+
+    assert np.array_equal(pipeline.predict_proba(raw.to_numpy()), expected)
+
+    prediction, probability = pipeline.predict_one(raw.to_numpy()[0])
+    assert probability == expected[0][1]
+    assert prediction == model.classes_[np.argmax(expected[0])]
@@ -0,0 +1,91 @@
+import io
+
+import pytest
+
+import app as routes
+from app import create_app
+from model_registry import ModelManager, publish
+from pipeline import FEATURE_COLUMNS, build_pipeline
+from test_pipeline import fit_reference_pipeline
+
+ROW = [1, 120, 70, 20, 80, 32.0, 0.4, 33]
+
+@pytest.fixture(scope='module')
+def serving_registry(tmp_path_factory):
+    """A registry holding one freshly fitted pipeline, so no locally trained artifacts are needed."""
+    registry = str(tmp_path_factory.mktemp('registry'))
+    publish(build_pipeline(*fit_reference_pipeline()), registry)
+    return registry
+
+@pytest.fixture
+def serving_model(serving_registry, monkeypatch):
+    """Point the app's model (and the shadow evaluator built on it) at serving_registry."""
+    manager = ModelManager(serving_registry, poll_interval=0)
+    monkeypatch.setattr(routes.model, '_value', manager)
+    monkeypatch.setattr(routes.shadow, '_value', None)
+    return manager
+
+@pytest.fixture
+def client(serving_model):
+    return create_app({'TESTING': True}).test_client()
+
+def post_rows(client, rows):
+    return client.post('/api/predict/batch', json=rows).get_json()
+
+def assert_error(payload, message):
+    assert payload['status'] == 'error'
+    assert payload['message'] == message
+
+def test_object_and_array_rows_score_the_same(client):
+    as_lists = post_rows(client, [ROW, ROW[::-1]])
+    as_objects = post_rows(client, {'rows': [dict(zip(FEATURE_COLUMNS, row)) for row in (ROW, ROW[::-1])]})
+    assert as_lists['status'] == 'success' and as_lists['count'] == 2
+    assert as_lists['predictions'] == as_objects['predictions']
+    assert as_lists['probabilities'] == as_objects['probabilities']
+
+    csv = ','.join(FEATURE_COLUMNS) + '\n' + ','.join(map(str, ROW)) + '\n'
+    uploaded = client.post('/api/predict/batch', data={'file': (io.BytesIO(csv.encode()), 'rows.csv')},
+                           content_type='multipart/form-data').get_json()
+    assert uploaded['probabilities'] == as_lists['probabilities'][:1]
+
+def test_rows_must_be_a_non_empty_list(client):
+    message = "Please provide a non-empty JSON array of feature rows or a CSV file."
+    assert_error(post_rows(client, []), message)
+    assert_error(post_rows(client, {'rows': 'all of them'}), message)
+    assert_error(post_rows(client, {'patients': [ROW]}), message)
+    assert_error(client.post('/api/predict/batch', data='not json').get_json(), message)
+
+def test_row_shapes_are_checked(client):
+    message = f"Each row must be an object of features or an array of {len(FEATURE_COLUMNS)} values."
+    assert_error(post_rows(client, [ROW[:-1]]), message)
+    assert_error(post_rows(client, [ROW, dict(zip(FEATURE_COLUMNS, ROW))]), message)
+    assert_error(post_rows(client, [ROW, 5]), message)
+
+    partial = dict(zip(FEATURE_COLUMNS, ROW))
+    del partial['Glucose']
+    assert_error(post_rows(client, [dict(zip(FEATURE_COLUMNS, ROW)), partial]),
+                 "Rows are missing required features: Glucose")
+
+    csv = 'Pregnancies,Glucose\n1,120\n'
+    uploaded = client.post('/api/predict/batch', data={'file': (io.BytesIO(csv.encode()), 'rows.csv')},
+                           content_type='multipart/form-data').get_json()
+    assert uploaded['status'] == 'error'
+    assert uploaded['message'].startswith("CSV is missing required columns: BloodPressure")
+
+def test_values_must_be_finite_numbers(client):
+    assert_error(post_rows(client, [ROW[:-1] + ['old']]), "All feature values must be numeric.")
+    assert_error(post_rows(client, [ROW, ROW[:-1] + [None], ROW]), "Missing or non-numeric values in rows: 1")
+
+def test_batch_size_is_limited(client, monkeypatch):
+    monkeypatch.setattr(routes, 'BATCH_MAX_ROWS', 2)
+    assert post_rows(client, [ROW, ROW])['status'] == 'success'
+    assert_error(post_rows(client, [ROW] * 3), "Batch too large: 3 rows (maximum is 2).")
+
+def test_malformed_batches_do_not_load_the_model(monkeypatch):
+    def unavailable():
+        raise AssertionError('the model should not be loaded')
+
+    monkeypatch.setattr(routes, 'model', routes.LazyResource(unavailable))
+    client = create_app({'TESTING': True}).test_client()
+    assert_error(post_rows(client, [ROW[:-1]]),
+                 f"Each row must be an object of features or an array of {len(FEATURE_COLUMNS)} values.")
@@ -1,6 +1,12 @@
-import joblib
 import numpy as np
 import pandas as pd
+from functools import lru_cache
+from pipeline import FEATURE_COLUMNS, load_pipeline
+
+@lru_cache(maxsize=None)
+def get_pipeline():
+    """Load the serving pipeline once and reuse it across calls."""
+    return load_pipeline()
 
 def predict_diabetes(input_data):
     """
@@ -16,21 +22,14 @@ def predict_diabetes(input_data):
     tuple
         (prediction, probability) where prediction is 0 or 1 and probability is the confidence
     """
-    # Load the model and scaler
-    model = joblib.load('diabetes_model.pkl')
-    scaler = joblib.load('feature_scaler.pkl')
+    # Load the pipeline (cached after the first call)
+    pipeline = get_pipeline()
     
     # Convert input dictionary to array
-    feature_names = ['Pregnancies', 'Glucose', 'BloodPressure', 'SkinThickness',
-                     'Insulin', 'BMI', 'DiabetesPedigreeFunction', 'Age']
-    input_array = np.array([[input_data[feature] for feature in feature_names]])
-    
-    # Scale the input data
-    input_scaled = scaler.transform(input_array)
+    input_array = np.array([input_data[feature] for feature in FEATURE_COLUMNS], dtype=np.float64)
     
-    # Make prediction
-    prediction = model.predict(input_scaled)[0]
-    probability = model.predict_proba(input_scaled)[0][1]
+    # Impute, scale and predict in one pass
+    prediction, probability = pipeline.predict_one(input_array)
     
     return prediction, probability
 
@@ -41,7 +40,7 @@ if __name__ == "__main__":
         'Glucose': 148,
         'BloodPressure': 72,
         'SkinThickness': 35,
-        'Insulin': 0,  # This will be imputed during preprocessing
+        'Insulin': 0,  # This will be imputed by the pipeline
         'BMI': 33.6,
         'DiabetesPedigreeFunction': 0.627,
         'Age': 50
@@ -60,10 +59,7 @@ if __name__ == "__main__":
     print(f"Probability of Diabetes: {probability:.1%}")
     
     # Print feature importance
-    model = joblib.load('diabetes_model.pkl')
-    feature_names = ['Pregnancies', 'Glucose', 'BloodPressure', 'SkinThickness',
-                     'Insulin', 'BMI', 'DiabetesPedigreeFunction', 'Age']
-    importances = model.feature_importances_
+    importances = get_pipeline().metadata['feature_importances']
     print("\nFeature Importance:")
-    for name, importance in zip(feature_names, importances):
+    for name, importance in zip(FEATURE_COLUMNS, importances):
         print(f"{name}: {importance:.3f}") 
\ No newline at end of file
@@ -0,0 +1,28 @@
+import numpy as np
+
+from prediction_cache import PredictionCache
+from test_pipeline import fit_reference_pipeline
+from pipeline import build_pipeline
+
+def test_prediction_cache_rounds_and_counts():
+    pipeline = build_pipeline(*fit_reference_pipeline())
+    cache = PredictionCache(pipeline, max_entries=8, ttl=60)
+
+    row = [6, 148.2, 72, 35, 0, 33.64, 0.6271, 50]
+    first = cache.predict_one(row)
+    # Same profile after rounding to the validated precision
+    second = cache.predict_one([6, 148.4, 72, 35, 0, 33.6, 0.627, 50])
+
+    assert first == second
+    assert cache.key(row) == (6, 148, 72, 35, 0, 33.6, 0.627, 50)
+    prediction, probability = pipeline.predict_one(np.array(cache.key(row)))
+    assert first == (int(prediction), float(probability))
+
+    stats = cache.stats()
+    assert stats['hits'] == 1 and stats['misses'] == 1 and stats['size'] == 1
+
+def test_prediction_cache_can_be_disabled():
+    pipeline = build_pipeline(*fit_reference_pipeline())
+    cache = PredictionCache(pipeline, max_entries=0)
+    assert cache.predict_one([1, 85, 66, 29, 0, 26.6, 0.351, 31]) is not None
+    assert cache.stats() == {'enabled': False}
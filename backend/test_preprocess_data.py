@@ -0,0 +1,54 @@
+import os
+
+import joblib
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.preprocessing import StandardScaler
+
+from pipeline import FEATURE_COLUMNS, ZERO_NOT_ALLOWED
+from preprocess_data import preprocess_streaming, sample_rows
+
+DATA = os.path.abspath('diabetes.csv')
+
+class ChunkCollector:
+    def __init__(self):
+        self.chunks = []
+
+    def write(self, chunk):
+        self.chunks.append(chunk.copy())
+
+    def close(self):
+        pass
+
+def test_sample_is_bounded_and_reproducible():
+    sample = sample_rows(DATA, sample_size=100, chunk_size=64, seed=1)
+    assert list(sample.columns) == ZERO_NOT_ALLOWED
+    assert len(sample) == 100
+    assert sample.equals(sample_rows(DATA, sample_size=100, chunk_size=64, seed=1))
+    # Zeros are read as missing values
+    assert sample.isna().any().any() and not (sample == 0).any().any()
+
+def test_streaming_matches_in_memory_statistics(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    collector = ChunkCollector()
+    result = preprocess_streaming(DATA, None, chunk_size=100, sample_size=300, writer=collector)
+
+    output = pd.concat(collector.chunks, ignore_index=True)
+    assert result['rows'] == len(output) == len(pd.read_csv(DATA))
+    assert len(collector.chunks) == 8
+    assert not output.isna().any().any()
+
+    # Incremental scaler statistics equal a one-shot fit on the same rows
+    scaler = joblib.load('feature_scaler.pkl')
+    expected = StandardScaler().fit(output[FEATURE_COLUMNS])
+    assert np.allclose(scaler.mean_, expected.mean_) and np.allclose(scaler.scale_, expected.scale_)
+    assert len(joblib.load('feature_imputer.pkl').reference_) == 300
+
+def test_writes_parquet(tmp_path, monkeypatch):
+    pytest.importorskip('pyarrow')
+    monkeypatch.chdir(tmp_path)
+    preprocess_streaming(DATA, 'out.parquet', chunk_size=200, sample_size=300)
+    output = pd.read_parquet('out.parquet')
+    assert len(output) == len(pd.read_csv(DATA))
+    assert not output.isna().any().any()
@@ -0,0 +1,62 @@
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.ensemble import RandomForestClassifier
+
+from rebalance import (IndexView, load_views, oversample, ratio_indices, ratio_views, save_indices, smote,
+                       undersample)
+
+@pytest.fixture
+def df():
+    return pd.read_csv('processed_diabetes.csv')
+
+def test_ratio_indices_hit_every_ratio(df):
+    y = df['Outcome'].to_numpy()
+    ratios = np.linspace(0, 1, 11)
+    indices = ratio_indices(y, ratios, size=1000, seed=3)
+
+    assert indices.shape == (11, 1000)
+    np.testing.assert_allclose((y[indices] == 1).mean(axis=1), ratios)
+    # Rows are drawn without replacement until a class runs out (268 positives, 500 negatives)
+    positives = indices[2][y[indices[2]] == 1]
+    assert len(positives) == 200 and len(np.unique(positives)) == 200
+    assert len(np.unique(indices[2][y[indices[2]] == 0])) == 500
+    assert np.array_equal(indices, ratio_indices(y, ratios, size=1000, seed=3))
+
+    with pytest.raises(ValueError):
+        ratio_indices(y, [1.5])
+
+def test_over_under_sampling_and_smote(df):
+    y = df['Outcome'].to_numpy()
+    assert np.bincount(y[oversample(y)]).tolist() == [500, 500]
+    under = undersample(y)
+    assert np.bincount(y[under]).tolist() == [268, 268]
+    assert len(np.unique(under)) == len(under)
+
+    X = df.drop(columns='Outcome').to_numpy()
+    synthetic, labels = smote(X, y, k_neighbors=3)
+    assert synthetic.shape == (232, X.shape[1]) and (labels == 1).all()
+    # Interpolated rows stay inside the minority class's bounding box
+    minority = X[y == 1]
+    assert (synthetic >= minority.min(axis=0) - 1e-9).all() and (synthetic <= minority.max(axis=0) + 1e-9).all()
+
+def test_views_round_trip_and_train_by_weight(df, tmp_path):
+    views = ratio_views(df, [0.75, 0.25])
+    assert views[0.75].fraction() == pytest.approx(0.75, abs=1e-3)
+    assert pd.concat(views[0.25].batches(100)).equals(views[0.25].materialize())
+
+    path = tmp_path / 'indices.npz'
+    save_indices(path, df, list(views), np.stack([view.indices for view in views.values()]))
+    reloaded = load_views(path, df)
+    assert np.array_equal(reloaded[0.25].indices, views[0.25].indices)
+    with pytest.raises(ValueError):
+        load_views(path, df.head(100))
+
+    # Row counts as sample weights reproduce training on the gathered rows
+    view = IndexView(df, views[0.75].indices)
+    X, y = df.drop(columns='Outcome'), df['Outcome']
+    gathered = view.materialize()
+    kwargs = dict(n_estimators=5, bootstrap=False, random_state=0)
+    by_rows = RandomForestClassifier(**kwargs).fit(gathered.drop(columns='Outcome'), gathered['Outcome'])
+    by_weight = RandomForestClassifier(**kwargs).fit(X, y, sample_weight=view.sample_weight())
+    assert (by_rows.predict(X) == by_weight.predict(X)).mean() > 0.95
@@ -0,0 +1,33 @@
+from recommendations import render_prediction_message, render_preventive_measures
+
+def test_high_risk_message_includes_triggered_rules_only():
+    answers = {'Glucose': 150, 'BloodPressure': 120, 'BMI': 31, 'Age': 70}
+    follow_ups = {'GlucoseFasting': 'no', 'GlucoseDiet': 'poor', 'BMISedentary': 9.0,
+                  'AgeMedication': 0.0}
+    message = render_prediction_message(1, 0.82, answers, follow_ups)
+
+    assert message.startswith("Based on the provided information, there is a 82.0% chance of diabetes risk.\n\n")
+    assert ("• Regarding your glucose levels:\n"
+            "  - Consider getting a fasting glucose test\n"
+            "  - Consider consulting a nutritionist for dietary guidance\n"
+            "  - Monitor your blood sugar regularly\n\n") in message
+    assert "Regarding your blood pressure" not in message
+    assert "  - Try to reduce sitting time and take regular breaks\n" in message
+    # Zero is treated as unanswered, as before
+    assert "Regular medication review" not in message
+    assert message.endswith("any of these recommendations?")
+
+def test_low_risk_message():
+    message = render_prediction_message(0, 0.1, {'Glucose': 125, 'BloodPressure': 100, 'BMI': 22, 'Age': 40}, {})
+    assert "• Consider monitoring your glucose levels periodically\n\nGeneral recommendations:\n1. Maintain a healthy lifestyle\n" in message
+
+def test_preventive_measures_sections():
+    response = render_preventive_measures({'Glucose': 100, 'BloodPressure': 135, 'BMI': 22, 'Age': 25},
+                                          {'GlucoseFamily': 'yes'})
+    assert "Additional Measures for High-Risk Individuals:\n" in response
+    assert "Special Considerations for Young Adults:\n" in response
+    assert "Additional Blood Pressure Management Tips:\n• Reduce sodium intake\n" in response
+    assert "Additional Weight Management Tips" not in response
+    # Identical profiles share one rendered string
+    assert response is render_preventive_measures({'Glucose': 90, 'BloodPressure': 131, 'BMI': 20, 'Age': 22},
+                                                  {'GlucoseFamily': 'yes'})
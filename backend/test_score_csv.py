@@ -0,0 +1,34 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from pipeline import FEATURE_COLUMNS, build_pipeline, load_pipeline, save_pipeline
+from score_csv import score_csv
+from test_pipeline import fit_reference_pipeline
+
+@pytest.fixture(scope='module')
+def pipeline_path(tmp_path_factory):
+    return save_pipeline(build_pipeline(*fit_reference_pipeline()),
+                         str(tmp_path_factory.mktemp('model') / 'pipeline.joblib'))
+
+def test_chunks_are_scored_in_input_order(tmp_path, pipeline_path):
+    rows = pd.read_csv('diabetes.csv').head(250)
+    rows.insert(0, 'PatientId', np.arange(len(rows)))
+    rows.to_csv(tmp_path / 'input.csv', index=False)
+    expected = load_pipeline(pipeline_path).predict_proba(rows[FEATURE_COLUMNS].to_numpy(dtype=np.float64))[:, 1]
+
+    for workers in (0, 2):
+        output = str(tmp_path / f'scored_{workers}.csv')
+        assert score_csv(str(tmp_path / 'input.csv'), output, chunk_size=40, workers=workers,
+                         pipeline_path=pipeline_path) == len(rows)
+        scored = pd.read_csv(output)
+        assert list(scored.columns) == list(rows.columns) + ['Prediction', 'Probability']
+        assert list(scored['PatientId']) == list(range(len(rows)))
+        assert np.allclose(scored['Probability'], expected)
+        assert list(scored['Prediction']) == list((expected > 0.5).astype(int))
+
+def test_missing_feature_columns_are_reported(tmp_path, pipeline_path):
+    pd.read_csv('diabetes.csv').head(5).drop(columns=['Glucose', 'Age']).to_csv(tmp_path / 'input.csv', index=False)
+    with pytest.raises(ValueError, match='missing required columns: Glucose, Age'):
+        score_csv(str(tmp_path / 'input.csv'), str(tmp_path / 'scored.csv'), workers=2,
+                  pipeline_path=pipeline_path)
@@ -0,0 +1,79 @@
+from flask import Flask, jsonify, session
+
+from session_store import MemorySessionStore, ServerSideSessionInterface
+from ttl_cache import TTLCache
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+def test_ttl_cache_evicts_least_recently_used():
+    cache = TTLCache(max_entries=2, ttl=60)
+    cache.set('a', 1)
+    cache.set('b', 2)
+    cache.get('a')
+    cache.set('c', 3)
+    assert cache.get('a') == 1
+    assert cache.get('b') is None
+    assert cache.get('c') == 3
+
+def test_ttl_cache_expires_entries():
+    clock = FakeClock()
+    cache = TTLCache(max_entries=10, ttl=5, clock=clock)
+    cache.set('a', 1)
+    clock.now = 4.9
+    assert cache.get('a') == 1
+    clock.now = 5.0
+    assert cache.get('a') is None
+    assert len(cache) == 0
+
+def make_app(store):
+    app = Flask(__name__)
+    app.session_interface = ServerSideSessionInterface(store)
+
+    @app.route('/answer/<value>', methods=['POST'])
+    def answer(value):
+        if 'answers' not in session:
+            session['answers'] = []
+        # Nested mutation only, as in process_text
+        session['answers'].append(value)
+        return jsonify(answers=session['answers'])
+
+    @app.route('/reset', methods=['POST'])
+    def reset():
+        session.clear()
+        return jsonify(status='success')
+
+    return app
+
+def test_session_state_lives_server_side():
+    store = MemorySessionStore(max_entries=10, ttl=60)
+    client = make_app(store).test_client()
+
+    first = client.post('/answer/female')
+    cookie = first.headers['Set-Cookie']
+    sid = cookie.split(';')[0].split('=', 1)[1]
+    assert 'female' not in cookie
+    assert store.load(sid) == {'answers': ['female']}
+
+    second = client.post('/answer/45')
+    assert second.get_json()['answers'] == ['female', '45']
+    # The ID is only sent once
+    assert 'Set-Cookie' not in second.headers
+
+    client.post('/reset')
+    assert store.load(sid) is None
+
+def test_memory_store_keeps_its_own_copy():
+    store = MemorySessionStore(max_entries=10, ttl=60)
+    state = {'answers': {'Gender': 'female'}}
+    store.save('sid', state)
+    state['answers']['Age'] = 45
+
+    loaded = store.load('sid')
+    loaded['answers']['Glucose'] = 120
+    # Nested changes reach the store only through save, as with Redis
+    assert store.load('sid') == {'answers': {'Gender': 'female'}}
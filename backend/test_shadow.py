@@ -0,0 +1,83 @@
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from model_registry import ModelManager, publish, set_candidate
+from pipeline import build_pipeline
+from shadow import ShadowEvaluator
+from test_pipeline import fit_reference_pipeline
+
+ROWS = [
+    [2, 150, 80, 30, 100, 33.0, 0.5, 45],
+    [0, 90, 70, 20, 80, 22.0, 0.2, 25],
+    [6, 190, 90, 40, 200, 40.0, 1.1, 60],
+]
+
+@pytest.fixture(scope='module')
+def pipeline():
+    return build_pipeline(*fit_reference_pipeline())
+
+@pytest.fixture
+def manager(tmp_path, pipeline):
+    registry = str(tmp_path)
+    publish(pipeline, registry)
+    publish(pipeline, registry, make_current=False)
+    set_candidate('v0002', registry)
+    return ModelManager(registry, poll_interval=0, candidate_percent=50)
+
+@pytest.fixture
+def evaluator(manager):
+    evaluator = ShadowEvaluator(manager)
+    # Score on demand with flush() instead of on the background thread
+    evaluator._ensure_worker = lambda: None
+    return evaluator
+
+def serve(manager, evaluator, row, candidate=False):
+    with manager.acquire(candidate=candidate) as handle:
+        prediction, probability = handle.prediction_cache.predict_one(row)
+        return evaluator.submit(handle.prediction_cache.key(row), handle.version, prediction, probability)
+
+def test_identical_models_always_agree(manager, evaluator):
+    for row in ROWS:
+        assert serve(manager, evaluator, row)
+    assert serve(manager, evaluator, ROWS[0], candidate=True)
+    assert evaluator.flush() == 4
+
+    stats = evaluator.stats()
+    assert (stats['live_version'], stats['candidate_version']) == ('v0001', 'v0002')
+    [pair] = stats['comparisons']
+    assert pair['served'] == {'live': 3, 'candidate': 1}
+    assert pair['scored'] == 4
+    assert pair['agreement_rate'] == 1.0
+    assert pair['max_abs_delta'] == pytest.approx(0.0)
+
+def test_full_queue_drops_instead_of_blocking(manager, evaluator):
+    evaluator.max_pending = 2
+    assert [serve(manager, evaluator, row) for row in ROWS] == [True, True, False]
+    assert evaluator.stats()['dropped'] == 1
+
+def test_concurrent_submits_respect_the_bound(manager, evaluator):
+    evaluator.max_pending = 50
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        queued = list(pool.map(lambda i: evaluator.submit((i,), 'v0001', 0, 0.1), range(400)))
+    stats = evaluator.stats()
+    assert sum(queued) == stats['pending'] == 50
+    assert stats['dropped'] == 350
+
+def test_rows_for_an_unloaded_version_are_stale(manager, evaluator):
+    serve(manager, evaluator, ROWS[0])
+    set_candidate(None, manager.registry_dir)
+    manager.reload()
+    assert manager.candidate is None
+    assert evaluator.flush() == 0
+    assert evaluator.stats()['stale'] == 1
+    assert not serve(manager, evaluator, ROWS[0])
+
+def test_routing_is_stable_and_follows_the_percentage(manager):
+    sids = [f'session-{i}' for i in range(2000)]
+    routed = [manager.routes_to_candidate(sid) for sid in sids]
+    assert routed == [manager.routes_to_candidate(sid) for sid in sids]
+    assert 0.45 < sum(routed) / len(sids) < 0.55
+
+    manager.candidate_percent = 0
+    assert not any(manager.routes_to_candidate(sid) for sid in sids)
@@ -0,0 +1,23 @@
+import pytest
+
+from speech_backends import StubSpeechBackend, build_grammar, parse_number_words
+
+@pytest.mark.parametrize('text, expected', [
+    ('one hundred forty five', 145.0),
+    ('two hundred and ten', 210.0),
+    ('thirty', 30.0),
+    ('zero point six two seven', 0.627),
+    ('my bmi is twenty eight point four', 28.4),
+    ('yes', None),
+])
+def test_parse_number_words(text, expected):
+    assert parse_number_words(text) == expected
+
+def test_build_grammar():
+    assert build_grammar(['no', 'yes']) == ['no', 'yes', '[unk]']
+    numeric = build_grammar(numeric=True)
+    assert 'hundred' in numeric and 'point' in numeric and numeric[-1] == '[unk]'
+    assert build_grammar() is None
+
+def test_stub_backend_ignores_audio():
+    assert StubSpeechBackend('one hundred').recognize(audio=None, grammar=['yes']) == 'one hundred'
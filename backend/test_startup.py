@@ -0,0 +1,13 @@
+import numpy as np
+
+from bench_startup import IMPORT_BUDGET_MS, startup_profile
+
+# Shared CI machines are slower and noisier than the machines the budget was set on
+CI_MARGIN = 2.0
+
+def test_app_import_defers_heavy_modules():
+    assert startup_profile()['heavy_modules'] == []
+
+def test_app_import_fits_the_budget():
+    import_ms = np.median([startup_profile()['import_ms'] for _ in range(3)])
+    assert import_ms < IMPORT_BUDGET_MS * CI_MARGIN
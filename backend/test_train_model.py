@@ -0,0 +1,86 @@
+import json
+import os
+import shutil
+
+import numpy as np
+import pandas as pd
+from sklearn.metrics import accuracy_score, roc_auc_score
+
+from train_model import (METRICS, _evaluate, candidate_params, load_training_data, pareto_frontier, prepare_folds,
+                         search, select_model, train, tree_counts, truncate_forest)
+
+GRID = {'n_estimators': [5, 10], 'max_depth': [None, 4], 'min_samples_leaf': [1], 'class_weight': [None]}
+
+def test_folds_are_stratified_and_preprocessed_once():
+    X, y = load_training_data()
+    folds = prepare_folds(X, y, n_splits=3, n_jobs=1)
+    assert len(folds) == 3
+    assert sum(len(y_val) for _, _, _, y_val in folds) == len(y)
+    for X_train, y_train, X_val, y_val in folds:
+        assert not np.isnan(X_train).any() and not np.isnan(X_val).any()
+        # The scaler saw only the training rows of its fold
+        assert np.allclose(X_train.mean(axis=0), 0)
+        assert abs(y_val.mean() - y.mean()) < 0.02
+
+def test_search_ranks_every_candidate():
+    X, y = load_training_data()
+    folds = prepare_folds(X, y, n_splits=3, n_jobs=1)
+    candidates = candidate_params(GRID)
+    leaderboard = search(folds, candidates, scoring='roc_auc', n_jobs=1)
+
+    assert len(leaderboard) == len(candidates) == 4
+    assert list(leaderboard['rank']) == [1, 2, 3, 4]
+    assert leaderboard['mean_roc_auc'].is_monotonic_decreasing
+    assert all(f'mean_{metric}' in leaderboard for metric in METRICS)
+    assert sorted(json.loads(p)['n_estimators'] for p in leaderboard['params']) == [5, 5, 10, 10]
+
+    assert len(candidate_params(GRID, n_iter=2)) == 2
+
+def test_truncated_forests_are_benchmarked():
+    X, y = load_training_data()
+    folds = prepare_folds(X, y, n_splits=2, n_jobs=1)
+    leaderboard = search(folds, [{'n_estimators': 40}], n_jobs=1)
+
+    assert tree_counts(40) == [40, 20, 10]
+    assert sorted(leaderboard['n_trees']) == [10, 20, 40]
+    by_size = leaderboard.set_index('n_trees')
+    assert by_size.loc[10, 'model_kb'] < by_size.loc[20, 'model_kb'] < by_size.loc[40, 'model_kb']
+    assert (leaderboard['single_row_us'] > 0).all()
+
+    # Scoring the first trees from the running sums matches the truncated forest itself
+    results, model = _evaluate({'n_estimators': 40}, 0, folds[0], 42, keep_model=True)
+    _, _, X_val, y_val = folds[0]
+    for result in results:
+        probabilities = truncate_forest(model, result['n_trees']).predict_proba(X_val)
+        assert result['accuracy'] == accuracy_score(y_val, model.classes_.take(probabilities.argmax(axis=1)))
+        assert np.isclose(result['roc_auc'], roc_auc_score(y_val, probabilities[:, 1]))
+    assert _evaluate({'n_estimators': 5}, 1, folds[1], 42)[1] is None
+
+def test_frontier_and_tolerance_selection():
+    leaderboard = pd.DataFrame({
+        'rank': [1, 2, 3, 4],
+        'mean_accuracy': [0.78, 0.775, 0.77, 0.74],
+        'single_row_us': [200.0, 80.0, 90.0, 40.0],
+        'batch_us_per_row': [100.0, 20.0, 25.0, 5.0],
+        'model_kb': [500.0, 60.0, 70.0, 10.0],
+    })
+    assert list(pareto_frontier(leaderboard)) == [True, True, False, True]
+
+    assert select_model(leaderboard)['rank'] == 1
+    assert select_model(leaderboard, tolerance=0.01)['rank'] == 2
+    assert select_model(leaderboard, tolerance=0.05, cost='model_kb')['rank'] == 4
+
+def test_train_end_to_end(tmp_path, monkeypatch, capsys):
+    shutil.copy('diabetes.csv', tmp_path)
+    monkeypatch.chdir(tmp_path)
+
+    result = train(folds=2, n_jobs=1, prune_top=0, publish_version=False,
+                   param_grid={'n_estimators': [10], 'max_depth': [4], 'min_samples_leaf': [1],
+                               'class_weight': [None]})
+
+    assert result['version'] is None
+    assert 'Evaluating 1 candidates x 2 folds...' in capsys.readouterr().out
+    assert result['params'] == {'class_weight': None, 'max_depth': 4, 'min_samples_leaf': 1, 'n_estimators': 10}
+    assert 0.5 < result['accuracy'] <= 1.0
+    for path in ('diabetes_model.pkl', 'diabetes_pipeline.joblib', 'training_leaderboard.csv'):
+        assert os.path.exists(path)
@@ -0,0 +1,45 @@
+import io
+import wave
+
+import numpy as np
+import pytest
+
+from metrics import ERRORS
+from voice import TARGET_RATE, VoiceError, decode_audio, transcribe_audio
+
+def make_wav(samples, rate, width=2):
+    """Encode an int array of shape (n_frames, n_channels) as a PCM WAV file."""
+    buffer = io.BytesIO()
+    with wave.open(buffer, 'wb') as wav:
+        wav.setnchannels(samples.shape[1])
+        wav.setsampwidth(width)
+        wav.setframerate(rate)
+        wav.writeframes(samples.astype('<i2').tobytes())
+    return buffer.getvalue()
+
+def test_decode_wav_in_process_downmixes_and_resamples():
+    rate = 44100
+    t = np.arange(rate) / rate
+    tone = (np.sin(2 * np.pi * 440 * t) * 16000).astype(np.int16)
+    stereo = np.column_stack([tone, tone])
+
+    audio = decode_audio(make_wav(stereo, rate))
+
+    assert audio.sample_rate == TARGET_RATE
+    assert audio.sample_width == 2
+    pcm = np.frombuffer(audio.get_raw_data(), dtype='<i2')
+    assert len(pcm) == TARGET_RATE
+    # The 440 Hz tone survives resampling
+    spectrum = np.abs(np.fft.rfft(pcm))
+    assert abs(np.argmax(spectrum) - 440) <= 1
+
+def test_decode_target_format_is_passed_through():
+    pcm = (np.arange(1600, dtype=np.int16) % 200 - 100).reshape(-1, 1)
+    audio = decode_audio(make_wav(pcm, TARGET_RATE))
+    assert audio.get_raw_data() == pcm.tobytes()
+
+def test_decode_failures_are_counted():
+    before = ERRORS.value(stage='audio_decode', error='VoiceError')
+    with pytest.raises(VoiceError):
+        transcribe_audio(b'', backend=object())
+    assert ERRORS.value(stage='audio_decode', error='VoiceError') == before + 1
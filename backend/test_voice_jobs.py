@@ -0,0 +1,114 @@
+import io
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from voice import VoiceError
+from voice_jobs import QueueFullError, VoiceJobQueue
+
+def stub_transcribe(audio_data, grammar=None):
+    """Local stand-in for decode + recognition: the 'audio' is the transcript."""
+    if audio_data == b'':
+        raise VoiceError("Could not understand the audio. Please speak clearly and try again.")
+    return audio_data.decode()
+
+def test_voice_job_returns_transcript():
+    queue = VoiceJobQueue(stub_transcribe, max_workers=1)
+    job = queue.submit(b'one hundred forty', owner='session-a')
+
+    assert job.wait(5)
+    assert job.status == 'done'
+    assert job.transcript == 'one hundred forty'
+    assert queue.get(job.id, owner='session-a') is job
+    # Jobs are only visible to the session that uploaded them
+    assert queue.get(job.id, owner='session-b') is None
+    queue.shutdown()
+
+def test_voice_job_reports_recognition_errors():
+    queue = VoiceJobQueue(stub_transcribe, max_workers=1)
+    job = queue.submit(b'')
+
+    assert job.wait(5)
+    assert job.status == 'failed'
+    assert job.error.startswith("Could not understand the audio")
+    queue.shutdown()
+
+def test_voice_queue_is_bounded():
+    release = threading.Event()
+
+    def slow_transcribe(audio_data, grammar=None):
+        release.wait(5)
+        return 'yes'
+
+    queue = VoiceJobQueue(slow_transcribe, max_workers=1, max_pending=2)
+    first = queue.submit(b'1')
+    second = queue.submit(b'2')
+    with pytest.raises(QueueFullError):
+        queue.submit(b'3')
+    # Long-poll times out while the worker is busy
+    assert not first.wait(0.05)
+
+    release.set()
+    assert first.wait(5) and second.wait(5)
+    queue.submit(b'4').wait(5)
+    queue.shutdown()
+
+def test_voice_answer_for_an_earlier_question_is_not_applied():
+    from app import voice_job_response
+    from conversation import advance, current_step
+
+    queue = VoiceJobQueue(stub_transcribe, max_workers=1)
+    state = {}
+    job = queue.submit(b'male')
+    job.step = current_step(state)
+    assert job.wait(5)
+
+    # The question is answered by text before the voice result is polled
+    advance(state, 'female')
+    stale = voice_job_response(job, state)
+    assert stale['status'] == 'error'
+    assert stale['message'].startswith('This voice answer was for an earlier question')
+    assert current_step(state).field == 'Pregnancies'
+
+    job = queue.submit(b'2')
+    job.step = current_step(state)
+    assert job.wait(5)
+    assert voice_job_response(job, state)['status'] == 'success'
+    assert voice_job_response(job, state) is job.response
+    queue.shutdown()
+
+def test_text_answer_during_a_long_poll_is_kept(monkeypatch):
+    import app as routes
+    from app import create_app
+
+    release = threading.Event()
+
+    def slow_transcribe(audio_data, grammar=None):
+        release.wait(5)
+        return audio_data.decode()
+
+    queue = VoiceJobQueue(slow_transcribe, max_workers=1)
+    monkeypatch.setattr(routes.voice, '_value', queue)
+    flask_app = create_app({'TESTING': True})
+    voice_client, text_client = flask_app.test_client(), flask_app.test_client()
+
+    created = voice_client.post('/api/voice-jobs', data={'audio': (io.BytesIO(b'female'), 'answer.wav')},
+                                content_type='multipart/form-data')
+    job_id = created.get_json()['job_id']
+    # A second client on the same session, so the text answer can be sent while the poll is open
+    sid = created.headers['Set-Cookie'].split(';')[0].split('=', 1)[1]
+    text_client.set_cookie('localhost', 'session', sid)
+
+    with ThreadPoolExecutor(max_workers=1) as pool:
+        poll = pool.submit(voice_client.get, f'/api/voice-jobs/{job_id}?wait=5')
+        time.sleep(0.2)
+        # Answered by text while the voice request is still waiting for its transcript
+        assert text_client.post('/api/process-text', json={'text': 'male'}).get_json()['status'] == 'success'
+        release.set()
+        stale = poll.result().get_json()
+
+    assert stale['message'].startswith('This voice answer was for an earlier question')
+    assert voice_client.get('/api/current-question').get_json()['field'] != 'Gender'
+    queue.shutdown()
@@ -0,0 +1,79 @@
+import os
+
+import pytest
+
+from workflow import Stage, dependencies, run
+
+def double(source, target):
+    with open(source) as f:
+        value = int(f.read())
+    with open(target, 'w') as f:
+        f.write(str(value * 2))
+
+def add(first, second, target):
+    with open(first) as a, open(second) as b:
+        total = int(a.read()) + int(b.read())
+    with open(target, 'w') as f:
+        f.write(str(total))
+
+def fail(target):
+    raise RuntimeError('boom')
+
+def read(path):
+    with open(path) as f:
+        return int(f.read())
+
+def toy_stages():
+    return [
+        Stage('left', 'test_workflow:double', inputs=['a.txt'], outputs=['a2.txt'],
+              params={'source': 'a.txt', 'target': 'a2.txt'}),
+        Stage('right', 'test_workflow:double', inputs=['b.txt'], outputs=['b2.txt'],
+              params={'source': 'b.txt', 'target': 'b2.txt'}),
+        Stage('total', 'test_workflow:add', inputs=['a2.txt', 'b2.txt'], outputs=['total.txt'],
+              params={'first': 'a2.txt', 'second': 'b2.txt', 'target': 'total.txt'}),
+    ]
+
+@pytest.fixture
+def workspace(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / 'a.txt').write_text('1')
+    (tmp_path / 'b.txt').write_text('10')
+    return tmp_path
+
+def statuses(results):
+    return {name: result['status'] for name, result in results.items()}
+
+def test_stages_run_once_and_rerun_only_downstream_of_changes(workspace):
+    assert dependencies(toy_stages()) == {'left': [], 'right': [], 'total': ['left', 'right']}
+
+    results = run(toy_stages(), jobs=2, log=lambda message: None)
+    assert statuses(results) == {'left': 'ran', 'right': 'ran', 'total': 'ran'}
+    assert read('total.txt') == 22
+
+    assert set(statuses(run(toy_stages(), log=lambda message: None)).values()) == {'cached'}
+
+    # Changing one input reruns its stage and everything downstream of it
+    (workspace / 'a.txt').write_text('5')
+    results = run(toy_stages(), log=lambda message: None)
+    assert statuses(results) == {'left': 'ran', 'right': 'cached', 'total': 'ran'}
+    assert read('total.txt') == 30
+
+    # Returning to earlier inputs is a cache hit that restores the earlier outputs
+    (workspace / 'a.txt').write_text('1')
+    os.remove('b2.txt')
+    results = run(toy_stages(), log=lambda message: None)
+    assert set(statuses(results).values()) == {'cached'}
+    assert read('b2.txt') == 20
+    assert read('total.txt') == 22
+
+def test_targets_force_and_failures(workspace):
+    results = run(toy_stages(), targets=['left'], log=lambda message: None)
+    assert statuses(results) == {'left': 'ran'}
+    assert statuses(run(toy_stages(), targets=['left'], force=['left'], log=lambda message: None)) == {'left': 'ran'}
+
+    stages = toy_stages()
+    stages[1] = Stage('right', 'test_workflow:fail', inputs=['b.txt'], outputs=['b2.txt'],
+                      params={'target': 'b2.txt'})
+    results = run(stages, log=lambda message: None)
+    assert statuses(results) == {'left': 'cached', 'right': 'failed', 'total': 'skipped'}
+    assert 'boom' in results['right']['error']
@@ -1,35 +1,439 @@
+import argparse
+import copy
+import json
+import time
+
+import joblib
+import numpy as np
 import pandas as pd
-from sklearn.model_selection import train_test_split
+from joblib import Parallel, delayed
 from sklearn.ensemble import RandomForestClassifier
-from sklearn.metrics import classification_report, accuracy_score
-import joblib
-from preprocess_data import preprocess_diabetes_data
-
-# Preprocess the data
-X, y = preprocess_diabetes_data('diabetes.csv')
-
-# Split the dataset into training and testing sets
-X_train, X_test, y_train, y_test = train_test_split(
-    X, y, test_size=0.2, random_state=42)
-
-# Initialize and train the model
-model = RandomForestClassifier(n_estimators=100, random_state=42)
-model.fit(X_train, y_train)
-
-# Evaluate the model
-y_pred = model.predict(X_test)
-print("\nModel Performance:")
-print("Accuracy:", accuracy_score(y_test, y_pred))
-print("\nClassification Report:\n", classification_report(y_test, y_pred))
-
-# Save the trained model
-joblib.dump(model, 'diabetes_model.pkl')
-print("\nModel saved as 'diabetes_model.pkl'")
-
-# Print feature importance
-feature_names = ['Pregnancies', 'Glucose', 'BloodPressure', 'SkinThickness',
-                 'Insulin', 'BMI', 'DiabetesPedigreeFunction', 'Age']
-importances = model.feature_importances_
-print("\nFeature Importance:")
-for name, importance in zip(feature_names, importances):
-    print(f"{name}: {importance:.3f}")
+from sklearn.metrics import accuracy_score, classification_report, f1_score, roc_auc_score
+from sklearn.model_selection import ParameterGrid, ParameterSampler, StratifiedKFold, train_test_split
+from sklearn.preprocessing import StandardScaler
+
+from dataset import load_dataset
+from forest_engine import compile_forest
+from imputer import KDTreeImputer
+from model_registry import REGISTRY_DIR, publish
+from pipeline import FEATURE_COLUMNS, ZERO_NOT_ALLOWED, build_pipeline, save_pipeline
+
+# Hyperparameters searched by default: 54 forests per fold
+PARAM_GRID = {
+    'n_estimators': [50, 100, 200],
+    'max_depth': [None, 8, 12],
+    'min_samples_leaf': [1, 3, 5],
+    'class_weight': [None, 'balanced'],
+}
+
+METRICS = ('accuracy', 'f1', 'roc_auc')
+
+# Smaller forests scored for free from every fit by keeping only its first trees
+TREE_FRACTIONS = (0.25, 0.5)
+MIN_TREES = 10
+
+# Cost-complexity pruning strengths tried on the best few candidates
+PRUNE_ALPHAS = (0.001, 0.003, 0.01)
+
+# Serving cost columns; lower is better
+COSTS = ('single_row_us', 'batch_us_per_row', 'model_kb')
+
+LEADERBOARD_PATH = 'training_leaderboard.csv'
+
+def load_training_data(file_path='diabetes.csv'):
+    """
+    Read the raw dataset.
+
+    Returns:
+    --------
+    tuple
+        (X, y) with X the unprocessed FEATURE_COLUMNS and y the Outcome column
+    """
+    df = load_dataset(file_path)
+    return df[FEATURE_COLUMNS], df['Outcome']
+
+def fit_preprocessing(X):
+    """
+    Fit the serving preprocessing (zero handling, KNN imputation, scaling) on raw rows.
+
+    Mirrors preprocess_data.py, but only ever sees the rows it is given, so a
+    fold's validation rows do not leak into its imputer or scaler.
+
+    Returns:
+    --------
+    tuple
+        (imputer, scaler, X_scaled)
+    """
+    X = X.copy()
+    X[ZERO_NOT_ALLOWED] = X[ZERO_NOT_ALLOWED].replace(0, np.nan)
+    imputer = KDTreeImputer(n_neighbors=5)
+    X[ZERO_NOT_ALLOWED] = imputer.fit_transform(X[ZERO_NOT_ALLOWED])
+    scaler = StandardScaler()
+    return imputer, scaler, scaler.fit_transform(X)
+
+def apply_preprocessing(imputer, scaler, X):
+    """Transform raw rows with preprocessing fitted by fit_preprocessing."""
+    X = X.copy()
+    X[ZERO_NOT_ALLOWED] = X[ZERO_NOT_ALLOWED].replace(0, np.nan)
+    X[ZERO_NOT_ALLOWED] = imputer.transform(X[ZERO_NOT_ALLOWED])
+    return scaler.transform(X)
+
+def _prepare_fold(X_train, y_train, X_val, y_val):
+    imputer, scaler, X_train_scaled = fit_preprocessing(X_train)
+    return X_train_scaled, y_train.to_numpy(), apply_preprocessing(imputer, scaler, X_val), y_val.to_numpy()
+
+def prepare_folds(X, y, n_splits=5, random_state=42, n_jobs=-1):
+    """
+    Split into stratified folds and preprocess each one once.
+
+    KNN imputation is the expensive step, so it is fitted per fold here and the
+    scaled arrays are shared by every hyperparameter candidate.
+
+    Returns:
+    --------
+    list of tuple
+        (X_train, y_train, X_val, y_val) scaled arrays per fold
+    """
+    splitter = StratifiedKFold(n_splits=n_splits, shuffle=True, random_state=random_state)
+    return Parallel(n_jobs=n_jobs)(
+        delayed(_prepare_fold)(X.iloc[train], y.iloc[train], X.iloc[val], y.iloc[val])
+        for train, val in splitter.split(X, y)
+    )
+
+def tree_counts(n_estimators):
+    """Forest sizes evaluated for a fit with n_estimators trees, largest first."""
+    counts = {n_estimators}
+    counts.update(int(n_estimators * fraction) for fraction in TREE_FRACTIONS
+                  if int(n_estimators * fraction) >= MIN_TREES)
+    return sorted(counts, reverse=True)
+
+def truncate_forest(model, n_trees):
+    """A shallow copy of a fitted forest that uses only its first n_trees trees."""
+    if n_trees >= len(model.estimators_):
+        return model
+    truncated = copy.copy(model)
+    truncated.estimators_ = model.estimators_[:n_trees]
+    truncated.n_estimators = n_trees
+    return truncated
+
+def benchmark_forest(engine, X, single_rows=200, batch_rows=1000):
+    """
+    Measure what serving a compiled forest costs.
+
+    Parameters:
+    -----------
+    engine : forest_engine.CompiledForest
+        The forest as the app runs it
+    X : numpy.ndarray
+        Scaled rows to score
+    single_rows : int
+        predict_one calls timed individually; the median is reported
+    batch_rows : int
+        Rows in one timed predict_proba call
+
+    Returns:
+    --------
+    dict
+        single_row_us, batch_us_per_row, model_kb and n_nodes
+    """
+    engine.predict_one(X[0])
+    timings = []
+    for row in X[np.arange(single_rows) % len(X)]:
+        start = time.perf_counter()
+        engine.predict_one(row)
+        timings.append(time.perf_counter() - start)
+    batch = X[np.arange(batch_rows) % len(X)]
+    start = time.perf_counter()
+    engine.predict_proba(batch)
+    batch_seconds = time.perf_counter() - start
+    return {
+        'single_row_us': float(np.median(timings)) * 1e6,
+        'batch_us_per_row': batch_seconds / batch_rows * 1e6,
+        'model_kb': engine.nbytes / 1024,
+        'n_nodes': int(len(engine.threshold)),
+    }
+
+def _evaluate(params, fold_index, fold, random_state, keep_model=False):
+    """Fit one candidate on one fold and score it at every size in tree_counts; returns (results, model or None)."""
+    X_train, y_train, X_val, y_val = fold
+    model = RandomForestClassifier(random_state=random_state, n_jobs=1, **params)
+    start = time.perf_counter()
+    model.fit(X_train, y_train)
+    fit_seconds = time.perf_counter() - start
+
+    # Running sums of per-tree probabilities score every truncated forest in one pass
+    cumulative = np.cumsum([tree.predict_proba(X_val) for tree in model.estimators_], axis=0)
+    results = []
+    for n_trees in tree_counts(len(model.estimators_)):
+        probabilities = cumulative[n_trees - 1] / n_trees
+        predictions = model.classes_.take(probabilities.argmax(axis=1))
+        result = {
+            'n_trees': n_trees,
+            'fold': fold_index,
+            'accuracy': accuracy_score(y_val, predictions),
+            'f1': f1_score(y_val, predictions),
+            'roc_auc': roc_auc_score(y_val, probabilities[:, 1]),
+            'fit_seconds': fit_seconds,
+        }
+        results.append(result)
+    return results, model if keep_model else None
+
+def candidate_params(param_grid=None, n_iter=None, random_state=42):
+    """All combinations of param_grid, or n_iter of them sampled at random."""
+    param_grid = param_grid or PARAM_GRID
+    if n_iter is not None and n_iter < len(ParameterGrid(param_grid)):
+        return list(ParameterSampler(param_grid, n_iter=n_iter, random_state=random_state))
+    return list(ParameterGrid(param_grid))
+
+def search(folds, candidates, scoring='accuracy', n_jobs=-1, random_state=42):
+    """
+    Cross-validate every candidate on every fold in parallel.
+
+    Each (candidate, fold) pair is one single-threaded fit, so the work spreads
+    over all cores through joblib's loky process pool. Every fit is also scored
+    with only its first trees (see TREE_FRACTIONS). The first fold's models
+    are then compiled and benchmarked for serving latency and size in this
+    process, one at a time, once the pool has finished.
+
+    Parameters:
+    -----------
+    folds : list of tuple
+        Output of prepare_folds
+    candidates : list of dict
+        RandomForestClassifier keyword arguments
+    scoring : str
+        One of METRICS; the leaderboard is ranked by its mean
+    n_jobs : int
+        Worker processes; -1 uses every core
+
+    Returns:
+    --------
+    pandas.DataFrame
+        One row per (candidate, n_trees) with the mean and standard deviation
+        of each metric over the folds and the serving costs in COSTS, best first
+    """
+    evaluated = Parallel(n_jobs=n_jobs, backend='loky')(
+        delayed(_evaluate)(params, index, fold, random_state, keep_model=index == 0)
+        for params in candidates for index, fold in enumerate(folds)
+    )
+    results = [fold_results for fold_results, _ in evaluated]
+
+    # Timed here, one forest at a time, so the latencies are not skewed by fits running on the other cores
+    X_val = folds[0][2]
+    for fold_results, model in evaluated:
+        if model is not None:
+            for result in fold_results:
+                result.update(benchmark_forest(compile_forest(truncate_forest(model, result['n_trees'])), X_val))
+
+    rows = []
+    for position, params in enumerate(candidates):
+        scores = pd.DataFrame([result for fold_results in results[position * len(folds):(position + 1) * len(folds)]
+                               for result in fold_results])
+        for n_trees, group in scores.groupby('n_trees', sort=False):
+            row = {'params': json.dumps(params, sort_keys=True), 'n_trees': int(n_trees)}
+            for metric in METRICS:
+                row[f'mean_{metric}'] = group[metric].mean()
+                row[f'std_{metric}'] = group[metric].std(ddof=0)
+            row['fit_seconds'] = group['fit_seconds'].mean()
+            benchmarked = group[group['fold'] == 0].iloc[0]
+            for column in COSTS + ('n_nodes',):
+                row[column] = benchmarked[column]
+            rows.append(row)
+
+    leaderboard = pd.DataFrame(rows).sort_values([f'mean_{scoring}', COSTS[0]], ascending=[False, True],
+                                                 kind='mergesort')
+    leaderboard.insert(0, 'rank', range(1, len(leaderboard) + 1))
+    return leaderboard.reset_index(drop=True)
+
+def pruning_candidates(leaderboard, top=3, alphas=PRUNE_ALPHAS):
+    """Cost-complexity pruned variants of the best top distinct parameter sets."""
+    best = leaderboard.drop_duplicates('params').head(top)['params']
+    return [dict(json.loads(params), ccp_alpha=alpha) for params in best for alpha in alphas]
+
+def merge_leaderboards(*leaderboards, scoring='accuracy'):
+    """Combine search results and re-rank them."""
+    merged = pd.concat(leaderboards, ignore_index=True).drop(columns='rank')
+    merged = merged.sort_values([f'mean_{scoring}', COSTS[0]], ascending=[False, True], kind='mergesort')
+    merged.insert(0, 'rank', range(1, len(merged) + 1))
+    return merged.reset_index(drop=True)
+
+def pareto_frontier(leaderboard, scoring='accuracy', costs=COSTS):
+    """
+    Flag the candidates no other candidate beats on both quality and cost.
+
+    A candidate is dominated when another one scores at least as well on
+    scoring and costs no more on every column in costs, and is strictly
+    better on at least one of them.
+
+    Returns:
+    --------
+    pandas.Series
+        Boolean mask aligned with leaderboard
+    """
+    score = leaderboard[f'mean_{scoring}'].to_numpy()
+    cost = leaderboard[list(costs)].to_numpy()
+    at_least_as_good = (score[:, None] >= score[None, :]) & (cost[:, None, :] <= cost[None, :, :]).all(axis=2)
+    strictly_better = (score[:, None] > score[None, :]) | (cost[:, None, :] < cost[None, :, :]).any(axis=2)
+    dominated = (at_least_as_good & strictly_better).any(axis=0)
+    return pd.Series(~dominated, index=leaderboard.index, name='pareto')
+
+def select_model(leaderboard, scoring='accuracy', tolerance=0.0, cost='single_row_us'):
+    """
+    Pick the cheapest candidate whose score is within tolerance of the best.
+
+    Parameters:
+    -----------
+    leaderboard : pandas.DataFrame
+        Output of search or merge_leaderboards
+    scoring : str
+        One of METRICS
+    tolerance : float
+        Largest acceptable drop in mean score from the top candidate;
+        0 picks the best-scoring model (the cheapest one on ties)
+    cost : str
+        One of COSTS, minimized among the eligible candidates
+
+    Returns:
+    --------
+    pandas.Series
+        The selected leaderboard row
+    """
+    column = f'mean_{scoring}'
+    eligible = leaderboard[leaderboard[column] >= leaderboard[column].max() - tolerance - 1e-12]
+    return eligible.sort_values([cost, column], ascending=[True, False], kind='mergesort').iloc[0]
+
+def print_leaderboard(leaderboard, top=10):
+    columns = (['rank'] + [f'mean_{metric}' for metric in METRICS] + ['n_trees'] + list(COSTS)
+               + ['pareto', 'params'])
+    with pd.option_context('display.max_colwidth', None, 'display.width', 200):
+        print(leaderboard[columns].head(top).to_string(index=False, float_format='{:.4f}'.format))
+
+def print_frontier(leaderboard, scoring='accuracy'):
+    frontier = leaderboard[leaderboard['pareto']].sort_values(COSTS[0])
+    columns = ['rank', f'mean_{scoring}', 'n_trees'] + list(COSTS) + ['params']
+    with pd.option_context('display.max_colwidth', None, 'display.width', 200):
+        print(frontier[columns].to_string(index=False, float_format='{:.4f}'.format))
+
+def train(data='diabetes.csv', folds=5, n_iter=None, scoring='accuracy', n_jobs=-1, test_size=0.2,
+          tolerance=0.0, cost='single_row_us', prune_top=3, top=10, leaderboard_path=LEADERBOARD_PATH,
+          publish_version=True, random_state=42, param_grid=None):
+    """
+    Run the search, refit the selected model and export it.
+
+    Writes diabetes_model.pkl, the serving pipeline artifact and the
+    leaderboard CSV, and publishes a registry version unless publish_version
+    is False. The arguments mirror the command-line options; param_grid
+    replaces PARAM_GRID.
+
+    Returns:
+    --------
+    dict
+        Held-out accuracy, selected parameters and tree count, and the
+        published version (or None)
+    """
+    X, y = load_training_data(data)
+
+    # Split the dataset into training and testing sets
+    X_train, X_test, y_train, y_test = train_test_split(
+        X, y, test_size=test_size, random_state=random_state)
+
+    # Cross-validate the search on the training set only
+    start = time.perf_counter()
+    prepared = prepare_folds(X_train, y_train, folds, random_state, n_jobs)
+    candidates = candidate_params(param_grid, n_iter, random_state)
+    print(f"Evaluating {len(candidates)} candidates x {folds} folds...")
+    leaderboard = search(prepared, candidates, scoring, n_jobs, random_state)
+    if prune_top > 0:
+        pruned = pruning_candidates(leaderboard, prune_top)
+        print(f"Evaluating {len(pruned)} pruned variants of the top {prune_top} candidates...")
+        leaderboard = merge_leaderboards(leaderboard, search(prepared, pruned, scoring, n_jobs,
+                                                             random_state), scoring=scoring)
+    leaderboard['pareto'] = pareto_frontier(leaderboard, scoring)
+    print(f"Search finished in {time.perf_counter() - start:.1f}s\n")
+    print_leaderboard(leaderboard, top)
+    print("\nAccuracy vs. serving cost frontier:")
+    print_frontier(leaderboard, scoring)
+    leaderboard.to_csv(leaderboard_path, index=False)
+    print(f"\nLeaderboard saved as '{leaderboard_path}'")
+
+    # Refit the selected candidate on the whole training set and evaluate it on the held-out rows
+    best = select_model(leaderboard, scoring, tolerance, cost)
+    params = json.loads(best['params'])
+    imputer, scaler, X_train_scaled = fit_preprocessing(X_train)
+    model = RandomForestClassifier(random_state=random_state, n_jobs=1, **params)
+    model = truncate_forest(model.fit(X_train_scaled, y_train), int(best['n_trees']))
+
+    y_pred = model.predict(apply_preprocessing(imputer, scaler, X_test))
+    accuracy = accuracy_score(y_test, y_pred)
+    print(f"\nSelected rank {best['rank']} (tolerance {tolerance} on mean {scoring}, "
+          f"cheapest by {cost}): {best['n_trees']} trees, {best['model_kb']:.0f} KB, "
+          f"{best['single_row_us']:.0f} us/row")
+    print("Parameters:", params)
+    print("\nModel Performance:")
+    print("Accuracy:", accuracy)
+    print("\nClassification Report:\n", classification_report(y_test, y_pred))
+
+    # Save the trained model
+    joblib.dump(model, 'diabetes_model.pkl')
+    print("\nModel saved as 'diabetes_model.pkl'")
+
+    # Bundle preprocessing and the model into the serving pipeline artifact
+    cv = {f'cv_{metric}': float(best[f'mean_{metric}']) for metric in METRICS}
+    costs = {column: float(best[column]) for column in COSTS}
+    pipeline = build_pipeline(imputer, scaler, model,
+                              metadata={'accuracy': float(accuracy), 'params': params,
+                                        'n_trees': int(best['n_trees']), **cv, **costs})
+    pipeline_path = save_pipeline(pipeline)
+    print(f"Pipeline saved as '{pipeline_path}'")
+
+    version = None
+    if publish_version:
+        # Publish a new registry version; running servers swap it in without a restart
+        report = classification_report(y_test, y_pred, output_dict=True)
+        version = publish(pipeline, metrics={
+            'accuracy': float(accuracy),
+            'precision': float(report['weighted avg']['precision']),
+            'recall': float(report['weighted avg']['recall']),
+            'f1': float(report['weighted avg']['f1-score']),
+            'test_size': int(len(y_test)),
+            'cv_folds': folds,
+            **cv,
+            **costs
+        })
+        print(f"Published model version {version} to '{REGISTRY_DIR}'")
+
+    # Print feature importance
+    print("\nFeature Importance:")
+    for name, importance in zip(FEATURE_COLUMNS, model.feature_importances_):
+        print(f"{name}: {importance:.3f}")
+
+    return {'accuracy': float(accuracy), 'params': params, 'n_trees': int(best['n_trees']), 'version': version}
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Cross-validate a random-forest hyperparameter search, then export and publish the best model.')
+    parser.add_argument('--data', default='diabetes.csv', help='raw dataset (default: diabetes.csv)')
+    parser.add_argument('--folds', type=int, default=5, help='stratified cross-validation folds (default: 5)')
+    parser.add_argument('--n-iter', type=int, default=None,
+                        help='sample this many candidates instead of the full grid')
+    parser.add_argument('--scoring', choices=METRICS, default='accuracy', help='ranking metric (default: accuracy)')
+    parser.add_argument('--n-jobs', type=int, default=-1, help='worker processes; -1 uses every core (default)')
+    parser.add_argument('--test-size', type=float, default=0.2, help='held-out share for the final report')
+    parser.add_argument('--tolerance', type=float, default=0.0,
+                        help='accept this much lower mean score for a cheaper model (default: 0, best score)')
+    parser.add_argument('--cost', choices=COSTS, default='single_row_us',
+                        help='serving cost minimized within the tolerance (default: single_row_us)')
+    parser.add_argument('--prune-top', type=int, default=3,
+                        help='also try cost-complexity pruning on this many of the best candidates (0 disables)')
+    parser.add_argument('--top', type=int, default=10, help='leaderboard rows to print')
+    parser.add_argument('--leaderboard', default=LEADERBOARD_PATH,
+                        help=f'CSV to write the full leaderboard to (default: {LEADERBOARD_PATH})')
+    parser.add_argument('--no-publish', action='store_true', help='do not publish a registry version')
+    parser.add_argument('--random-state', type=int, default=42)
+    args = parser.parse_args()
+
+    train(args.data, args.folds, args.n_iter, args.scoring, args.n_jobs, args.test_size, args.tolerance,
+          args.cost, args.prune_top, args.top, args.leaderboard, not args.no_publish, args.random_state)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,206 @@
+import io
+import logging
+import math
+import wave
+
+import numpy as np
+import speech_recognition as sr
+from scipy.signal import resample_poly
+
+from metrics import record_error, timed
+
+try:
+    import soundfile
+except ImportError:  # optional: WAV is still decoded in-process without it
+    soundfile = None
+
+logger = logging.getLogger(__name__)
+
+# Format handed to the recognizer: 16 kHz mono signed 16-bit PCM
+TARGET_RATE = 16000
+SAMPLE_WIDTH = 2
+
+class VoiceError(Exception):
+    """A voice upload could not be turned into text; the message is shown to the user."""
+
+def _read_wav(audio_data):
+    """
+    Parse a PCM WAV file with the standard library.
+
+    Returns:
+    --------
+    tuple or None
+        (samples, sample_rate) with samples as an int16 array for 16-bit input
+        or a float32 array in [-1, 1] of shape (n_frames, n_channels),
+        or None if the data is not a PCM WAV file
+    """
+    try:
+        with wave.open(io.BytesIO(audio_data), 'rb') as wav:
+            channels = wav.getnchannels()
+            width = wav.getsampwidth()
+            rate = wav.getframerate()
+            frames = wav.readframes(wav.getnframes())
+    except (wave.Error, EOFError):
+        return None
+
+    if width == 2:
+        samples = np.frombuffer(frames, dtype='<i2')
+    elif width == 1:
+        samples = (np.frombuffer(frames, dtype=np.uint8).astype(np.float32) - 128) / 128
+    elif width == 3:
+        raw = np.frombuffer(frames, dtype=np.uint8).reshape(-1, 3).astype(np.int32)
+        ints = raw[:, 0] | (raw[:, 1] << 8) | (raw[:, 2] << 16)
+        ints[ints >= 1 << 23] -= 1 << 24
+        samples = ints.astype(np.float32) / (1 << 23)
+    elif width == 4:
+        samples = np.frombuffer(frames, dtype='<i4').astype(np.float32) / (1 << 31)
+    else:
+        return None
+    return samples.reshape(-1, channels), rate
+
+def _read_soundfile(audio_data):
+    """Decode FLAC/OGG/MP3/... with libsndfile when the optional soundfile package is installed."""
+    if soundfile is None:
+        return None
+    try:
+        samples, rate = soundfile.read(io.BytesIO(audio_data), dtype='float32', always_2d=True)
+    except Exception:
+        return None
+    return samples, rate
+
+def to_audio_data(samples, sample_rate):
+    """
+    Down-mix, resample and quantize decoded samples into recognizer input.
+
+    Parameters:
+    -----------
+    samples : numpy.ndarray
+        Shape (n_frames, n_channels); int16 or float in [-1, 1]
+    sample_rate : int
+        Sample rate of the input
+
+    Returns:
+    --------
+    speech_recognition.AudioData
+        16 kHz mono 16-bit PCM, with no WAV container
+    """
+    if samples.dtype == np.int16 and samples.shape[1] == 1 and sample_rate == TARGET_RATE:
+        # Already in the target format: hand the buffer over untouched
+        return sr.AudioData(samples.tobytes(), TARGET_RATE, SAMPLE_WIDTH)
+
+    if samples.dtype == np.int16:
+        samples = samples.astype(np.float32) / 32768
+    mono = samples.mean(axis=1) if samples.shape[1] > 1 else samples[:, 0]
+
+    if sample_rate != TARGET_RATE:
+        divisor = math.gcd(int(sample_rate), TARGET_RATE)
+        mono = resample_poly(mono, TARGET_RATE // divisor, int(sample_rate) // divisor)
+
+    pcm = np.clip(np.rint(mono * 32768), -32768, 32767).astype('<i2')
+    return sr.AudioData(pcm.tobytes(), TARGET_RATE, SAMPLE_WIDTH)
+
+def decode_audio_ffmpeg(audio_data):
+    """Decode any ffmpeg-supported format (e.g. browser webm/opus) via pydub."""
+    from pydub import AudioSegment
+
+    try:
+        # Convert webm/ogg to wav using pydub
+        audio = AudioSegment.from_file(io.BytesIO(audio_data))
+        logger.debug("Loaded audio with pydub")
+    except Exception as e:
+        logger.warning("Error converting audio format: %s", e)
+        raise VoiceError(f'Error converting audio format: {str(e)}')
+
+    try:
+        # Export as WAV with specific parameters
+        wav_io = io.BytesIO()
+        audio.export(wav_io, format='wav', parameters=[
+            "-ac", "1",  # mono
+            "-ar", "16000",  # sample rate
+            "-acodec", "pcm_s16le"  # codec
+        ])
+        wav_io.seek(0)
+        logger.debug("Converted audio to WAV with ffmpeg")
+    except Exception as e:
+        logger.warning("Error exporting to WAV: %s", e)
+        raise VoiceError(f'Error converting to WAV format: {str(e)}')
+
+    recognizer = sr.Recognizer()
+    with sr.AudioFile(wav_io) as source:
+        return recognizer.record(source)
+
+def decode_audio(audio_data):
+    """
+    Decode an uploaded recording into 16 kHz mono PCM.
+
+    WAV (and, with soundfile installed, FLAC/OGG/MP3) is decoded, down-mixed and
+    resampled in-process. Anything else, such as the webm/opus the browser
+    records, falls back to ffmpeg through pydub.
+
+    Parameters:
+    -----------
+    audio_data : bytes
+        Raw bytes of the uploaded file
+
+    Returns:
+    --------
+    speech_recognition.AudioData
+    """
+    decoded = _read_wav(audio_data) or _read_soundfile(audio_data)
+    if decoded is None:
+        return decode_audio_ffmpeg(audio_data)
+
+    samples, sample_rate = decoded
+    if len(samples) == 0:
+        raise VoiceError("The audio recording is empty. Please try again.")
+    logger.debug("Decoded audio in-process")
+    return to_audio_data(samples, sample_rate)
+
+def transcribe_audio(audio_data, grammar=None, backend=None):
+    """
+    Decode an upload and run speech recognition on it.
+
+    Parameters:
+    -----------
+    audio_data : bytes
+        Raw bytes of the uploaded file
+    grammar : list of str, optional
+        Vocabulary for the current question (see speech_backends.build_grammar);
+        backends that cannot restrict their vocabulary ignore it
+    backend : SpeechBackend
+        Engine to run; see speech_backends.create_speech_backend
+
+    Returns:
+    --------
+    str
+        The recognized text
+
+    Raises:
+    -------
+    VoiceError
+        With a user-facing message when decoding or recognition fails
+    """
+    try:
+        with timed('audio_decode'):
+            audio = decode_audio(audio_data)
+    except VoiceError as e:
+        record_error('audio_decode', e)
+        raise
+    try:
+        logger.debug("Starting speech recognition (%s)", backend.name)
+        with timed('speech_recognition'):
+            text = backend.recognize(audio, grammar=grammar)
+        logger.debug("Recognized text: %s", text)
+        return text
+    except sr.UnknownValueError as e:
+        record_error('speech_recognition', e)
+        logger.info("Speech recognition could not understand audio")
+        raise VoiceError("Could not understand the audio. Please speak clearly and try again.")
+    except sr.RequestError as e:
+        record_error('speech_recognition', e)
+        logger.warning("Error with speech recognition service: %s", e)
+        raise VoiceError("Error with speech recognition service. Please try again.")
+    except Exception as e:
+        record_error('speech_recognition', e)
+        logger.exception("Error during speech recognition")
+        raise VoiceError(f"Error processing speech: {str(e)}")
@@ -0,0 +1,127 @@
+import logging
+import secrets
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from metrics import record_error
+from ttl_cache import TTLCache
+from voice import VoiceError
+
+logger = logging.getLogger(__name__)
+
+class QueueFullError(Exception):
+    """Too many voice jobs are already waiting for a worker."""
+
+class VoiceJob:
+    """
+    One uploaded utterance moving through decode and recognition.
+
+    status is 'queued', 'running', 'done' or 'failed'. Once the transcript has
+    been applied to the conversation, the resulting response is kept in
+    ``response`` so repeated polls return it without advancing the dialog twice.
+    """
+
+    def __init__(self, job_id, owner):
+        self.id = job_id
+        self.owner = owner
+        self.status = 'queued'
+        self.transcript = None
+        self.error = None
+        self.response = None
+        # The conversation step the audio answers, set by the caller (app.py)
+        self.step = None
+        # The worker's concurrent.futures.Future, for callers awaiting the job (asgi.py)
+        self.future = None
+        self.lock = threading.Lock()
+        self._finished = threading.Event()
+
+    @property
+    def finished(self):
+        return self._finished.is_set()
+
+    def wait(self, timeout=None):
+        """Block until the job finishes or the timeout expires; returns whether it finished."""
+        return self._finished.wait(timeout)
+
+    def _finish(self, status, transcript=None, error=None):
+        self.transcript = transcript
+        self.error = error
+        self.status = status
+        self._finished.set()
+
+class VoiceJobQueue:
+    """
+    Bounded worker pool that turns uploaded audio into transcripts off the request thread.
+
+    Parameters:
+    -----------
+    transcribe : callable
+        Takes the uploaded bytes and a grammar (or None) and returns the
+        transcript, raising VoiceError with a user-facing message on failure
+        (e.g. voice.transcribe_audio bound to a speech backend)
+    max_workers : int
+        Threads running decode and recognition
+    max_pending : int
+        Jobs allowed to wait or run at once; submit raises QueueFullError beyond it
+    ttl : float
+        Seconds a job and its result are kept for polling
+    """
+
+    def __init__(self, transcribe, max_workers=2, max_pending=32, ttl=300):
+        self.transcribe = transcribe
+        self.max_pending = max_pending
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='voice')
+        self._jobs = TTLCache(max_entries=max(max_pending * 16, 1024), ttl=ttl)
+        self._slots = threading.BoundedSemaphore(max_pending)
+
+    def submit(self, audio_data, owner=None, grammar=None):
+        """
+        Queue an upload for transcription.
+
+        Parameters:
+        -----------
+        audio_data : bytes
+            Raw bytes of the uploaded file
+        owner : str, optional
+            Session ID allowed to read and apply the result
+        grammar : list of str, optional
+            Vocabulary expected for the question being answered
+
+        Returns:
+        --------
+        VoiceJob
+        """
+        if not self._slots.acquire(blocking=False):
+            record_error('voice_job', 'QueueFull')
+            raise QueueFullError("Voice processing is busy. Please try again in a moment.")
+        job = VoiceJob(secrets.token_urlsafe(16), owner)
+        self._jobs.set(job.id, job)
+        try:
+            job.future = self._executor.submit(self._run, job, audio_data, grammar)
+        except Exception:
+            self._slots.release()
+            raise
+        return job
+
+    def get(self, job_id, owner=None):
+        """Return the job if it exists and belongs to owner, else None."""
+        job = self._jobs.get(job_id)
+        if job is None or job.owner != owner:
+            return None
+        return job
+
+    def _run(self, job, audio_data, grammar):
+        try:
+            job.status = 'running'
+            job._finish('done', transcript=self.transcribe(audio_data, grammar))
+        except VoiceError as e:
+            job._finish('failed', error=str(e))
+        except Exception as e:
+            record_error('voice_job', e)
+            logger.exception("Unexpected error in voice job %s", job.id)
+            job._finish('failed', error=f"Error processing voice input: {str(e)}")
+        finally:
+            self._slots.release()
+
+    def shutdown(self, wait=True):
+        self._executor.shutdown(wait=wait)
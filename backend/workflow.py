@@ -0,0 +1,304 @@
+import argparse
+import hashlib
+import importlib
+import json
+import os
+import shutil
+import tempfile
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+CACHE_DIR = '.workflow_cache'
+MANIFEST_NAME = 'manifest.json'
+
+class Stage:
+    """
+    One step of the offline pipeline.
+
+    Parameters:
+    -----------
+    name : str
+        Unique stage name
+    func : str
+        'module:function' called with params as keyword arguments
+    inputs : list of str
+        Files or directories the stage reads; a stage producing one of them
+        becomes an upstream dependency
+    outputs : list of str
+        Files or directories the stage writes
+    params : dict
+        Keyword arguments for func; part of the cache key
+    code : list of str
+        Source files whose changes should invalidate the cache
+    """
+
+    def __init__(self, name, func, inputs=(), outputs=(), params=None, code=()):
+        self.name = name
+        self.func = func
+        self.inputs = list(inputs)
+        self.outputs = list(outputs)
+        self.params = dict(params or {})
+        self.code = list(code)
+
+def _hash_path(path, digest):
+    if os.path.isdir(path):
+        for root, dirs, files in os.walk(path):
+            dirs.sort()
+            for name in sorted(files):
+                full = os.path.join(root, name)
+                digest.update(os.path.relpath(full, path).encode() + b'\0')
+                _hash_path(full, digest)
+        return
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+
+def hash_path(path):
+    """SHA-256 of a file's bytes, or of a directory's relative names and file bytes."""
+    digest = hashlib.sha256()
+    _hash_path(path, digest)
+    return digest.hexdigest()
+
+def stage_key(stage, hashes):
+    """Content address of a stage run: its function, parameters, input and code hashes."""
+    described = {
+        'name': stage.name,
+        'func': stage.func,
+        'params': stage.params,
+        'inputs': {path: hashes(path) for path in stage.inputs},
+        'code': {path: hashes(path) for path in stage.code},
+    }
+    return hashlib.sha256(json.dumps(described, sort_keys=True, default=str).encode()).hexdigest()
+
+def _copy(source, target):
+    # copy2 keeps modification times, which dataset.py uses to tell a bundle is fresh
+    if os.path.isdir(target):
+        shutil.rmtree(target)
+    if os.path.dirname(target):
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+    if os.path.isdir(source):
+        shutil.copytree(source, target, copy_function=shutil.copy2)
+    else:
+        shutil.copy2(source, target)
+
+def _entry_dir(cache_dir, stage, key):
+    return os.path.join(cache_dir, stage.name, key)
+
+def restore(stage, key, cache_dir=CACHE_DIR):
+    """Copy a cached run's outputs into the workspace; False if the key is not cached."""
+    entry = _entry_dir(cache_dir, stage, key)
+    if not os.path.exists(os.path.join(entry, MANIFEST_NAME)):
+        return False
+    for output in stage.outputs:
+        cached = os.path.join(entry, 'outputs', output)
+        if os.path.exists(output) and hash_path(output) == hash_path(cached):
+            continue
+        _copy(cached, output)
+    return True
+
+def store(stage, key, seconds, cache_dir=CACHE_DIR):
+    """Save a finished run's outputs under its key, written to a staging directory first."""
+    missing = [output for output in stage.outputs if not os.path.exists(output)]
+    if missing:
+        raise RuntimeError(f"Stage {stage.name} did not write {', '.join(missing)}")
+    parent = os.path.join(cache_dir, stage.name)
+    os.makedirs(parent, exist_ok=True)
+    staging = tempfile.mkdtemp(dir=parent, prefix='.staging-')
+    for output in stage.outputs:
+        _copy(output, os.path.join(staging, 'outputs', output))
+    with open(os.path.join(staging, MANIFEST_NAME), 'w') as f:
+        json.dump({'stage': stage.name, 'func': stage.func, 'params': stage.params,
+                   'outputs': stage.outputs, 'seconds': seconds}, f, indent=2, default=str)
+    entry = _entry_dir(cache_dir, stage, key)
+    if os.path.exists(entry):
+        shutil.rmtree(staging)
+    else:
+        os.rename(staging, entry)
+
+def _execute(func, params):
+    module_name, function_name = func.split(':')
+    start = time.perf_counter()
+    getattr(importlib.import_module(module_name), function_name)(**params)
+    return time.perf_counter() - start
+
+def dependencies(stages):
+    """Map each stage name to the names of the stages producing its inputs."""
+    producers = {}
+    for stage in stages:
+        for output in stage.outputs:
+            if output in producers:
+                raise ValueError(f"{output} is written by both {producers[output]} and {stage.name}")
+            producers[output] = stage.name
+    return {stage.name: sorted({producers[path] for path in stage.inputs if path in producers} - {stage.name})
+            for stage in stages}
+
+def run(stages, targets=None, jobs=None, force=(), cache_dir=CACHE_DIR, log=print):
+    """
+    Bring the requested stages up to date.
+
+    A stage whose key (see stage_key) is cached has its outputs restored
+    instead of running. The others run in a process pool as soon as their
+    upstream stages have finished, so independent stages run in parallel.
+    A failed stage is reported and its downstream stages are skipped.
+
+    Parameters:
+    -----------
+    stages : list of Stage
+        The whole pipeline
+    targets : list of str, optional
+        Stage names to bring up to date, with everything upstream of them;
+        defaults to every stage
+    jobs : int, optional
+        Worker processes (default: one per CPU)
+    force : iterable of str
+        Stage names to run even when cached
+
+    Returns:
+    --------
+    dict
+        Stage name -> {'status': 'cached' | 'ran' | 'failed' | 'skipped', 'key', 'seconds'}
+    """
+    by_name = {stage.name: stage for stage in stages}
+    upstream = dependencies(stages)
+    wanted, queue = set(), list(targets or by_name)
+    while queue:
+        name = queue.pop()
+        if name not in by_name:
+            raise ValueError(f"Unknown stage: {name}")
+        if name not in wanted:
+            wanted.add(name)
+            queue.extend(upstream[name])
+
+    file_hashes = {}
+
+    def hashes(path):
+        if path not in file_hashes:
+            if not os.path.exists(path):
+                raise FileNotFoundError(f"Missing input {path}")
+            file_hashes[path] = hash_path(path)
+        return file_hashes[path]
+
+    results, running = {}, {}
+    with ProcessPoolExecutor(max_workers=jobs) as pool:
+        while len(results) < len(wanted):
+            progressed = False
+            for name in sorted(wanted - set(results) - set(running)):
+                states = [results.get(dep, {}).get('status') for dep in upstream[name]]
+                if any(state in ('failed', 'skipped') for state in states):
+                    results[name] = {'status': 'skipped', 'key': None, 'seconds': 0.0}
+                    log(f"[skipped] {name} (upstream failed)")
+                    progressed = True
+                    continue
+                if not all(state in ('cached', 'ran') for state in states):
+                    continue
+                stage = by_name[name]
+                for output in stage.outputs:
+                    file_hashes.pop(output, None)
+                key = stage_key(stage, hashes)
+                if name not in force and restore(stage, key, cache_dir):
+                    results[name] = {'status': 'cached', 'key': key, 'seconds': 0.0}
+                    log(f"[cached]  {name}")
+                    progressed = True
+                    continue
+                log(f"[run]     {name}")
+                running[name] = (key, pool.submit(_execute, stage.func, stage.params))
+            if progressed:
+                continue
+            if not running:
+                break
+
+            finished, _ = wait([future for _, future in running.values()], return_when=FIRST_COMPLETED)
+            for name, (key, future) in list(running.items()):
+                if future not in finished:
+                    continue
+                del running[name]
+                stage = by_name[name]
+                try:
+                    seconds = future.result()
+                    store(stage, key, seconds, cache_dir)
+                    results[name] = {'status': 'ran', 'key': key, 'seconds': seconds}
+                    log(f"[done]    {name} in {seconds:.1f}s")
+                except Exception as e:
+                    results[name] = {'status': 'failed', 'key': key, 'seconds': 0.0, 'error': repr(e)}
+                    log(f"[failed]  {name}: {e!r}")
+                for output in stage.outputs:
+                    file_hashes.pop(output, None)
+    return results
+
+# Modules the stages below import; editing any of them reruns the stages that list it
+_PREPROCESS_CODE = ['preprocess_data.py', 'imputer.py', 'dataset.py', 'pipeline.py']
+_TRAIN_CODE = ['train_model.py', 'imputer.py', 'dataset.py', 'pipeline.py', 'forest_engine.py']
+_EDA_CODE = ['eda_plots.py', 'dataset.py']
+_REPORT_CODE = ['eda_report.py', 'dataset.py']
+
+def default_stages():
+    """The offline pipeline: dataset conversion, preprocessing, training, EDA plots and report."""
+    from eda_plots import plot_paths
+
+    return [
+        Stage('convert_raw', 'dataset:convert_csv', inputs=['diabetes.csv'], outputs=['diabetes.npyds'],
+              params={'csv_path': 'diabetes.csv'}, code=['dataset.py']),
+        Stage('preprocess', 'preprocess_data:preprocess_diabetes_data', inputs=['diabetes.npyds'],
+              outputs=['processed_diabetes.csv', 'processed_diabetes.npyds', 'feature_imputer.pkl',
+                       'feature_scaler.pkl'],
+              params={'file_path': 'diabetes.csv'}, code=_PREPROCESS_CODE),
+        # Publishing to the registry is left to train_model.py, so a cache hit never re-publishes
+        Stage('train', 'train_model:train', inputs=['diabetes.npyds'],
+              outputs=['diabetes_model.pkl', 'diabetes_pipeline.joblib', 'training_leaderboard.csv'],
+              params={'data': 'diabetes.csv', 'publish_version': False}, code=_TRAIN_CODE),
+        Stage('eda_raw', 'eda_plots:plot_dataset', inputs=['diabetes.npyds'], outputs=plot_paths('raw'),
+              params={'path': 'diabetes.csv', 'label': 'raw'}, code=_EDA_CODE),
+        Stage('eda_processed', 'eda_plots:plot_dataset', inputs=['processed_diabetes.npyds'],
+              outputs=plot_paths('processed'), params={'path': 'processed_diabetes.csv', 'label': 'processed'},
+              code=_EDA_CODE),
+        Stage('eda_report', 'eda_report:write_report', inputs=['diabetes.npyds', 'processed_diabetes.npyds'],
+              outputs=['eda_report'], params={'output_dir': 'eda_report'}, code=_REPORT_CODE),
+    ]
+
+def _parse_override(text):
+    target, _, value = text.partition('=')
+    stage, _, param = target.partition('.')
+    if not stage or not param or not _:
+        raise argparse.ArgumentTypeError(f"Expected STAGE.PARAM=VALUE, got {text!r}")
+    try:
+        value = json.loads(value)
+    except json.JSONDecodeError:
+        pass
+    return stage, param, value
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Run the preprocessing, training and EDA stages, reusing cached outputs whose inputs are unchanged.')
+    parser.add_argument('targets', nargs='*', help='stages to bring up to date (default: all)')
+    parser.add_argument('--jobs', type=int, default=None, help='parallel stages (default: one per CPU)')
+    parser.add_argument('--force', action='append', default=[], metavar='STAGE', help='rerun a stage even if cached')
+    parser.add_argument('--set', action='append', default=[], type=_parse_override, metavar='STAGE.PARAM=VALUE',
+                        help='override a stage parameter (JSON value), e.g. --set train.n_iter=10')
+    parser.add_argument('--cache-dir', default=CACHE_DIR, help=f'cache location (default: {CACHE_DIR})')
+    parser.add_argument('--list', action='store_true', help='list the stages and their dependencies')
+    args = parser.parse_args()
+
+    stages = default_stages()
+    by_name = {stage.name: stage for stage in stages}
+    for stage, param, value in args.set:
+        if stage not in by_name:
+            parser.error(f"Unknown stage: {stage}")
+        by_name[stage].params[param] = value
+
+    if args.list:
+        for name, upstream in dependencies(stages).items():
+            print(f"{name}: after {', '.join(upstream) or '-'}")
+        return
+
+    start = time.perf_counter()
+    results = run(stages, args.targets or None, args.jobs, args.force, args.cache_dir)
+    counts = {}
+    for result in results.values():
+        counts[result['status']] = counts.get(result['status'], 0) + 1
+    print(f"\n{len(results)} stages in {time.perf_counter() - start:.1f}s: "
+          + ', '.join(f"{count} {status}" for status, count in sorted(counts.items())))
+    if counts.get('failed'):
+        raise SystemExit(1)
+
+if __name__ == "__main__":
+    main()
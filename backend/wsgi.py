@@ -0,0 +1,18 @@
+import logging
+import os
+
+from dotenv import load_dotenv
+
+from app import create_app, warm_up
+from metrics import configure_logging
+
+# Entry point for gunicorn (see gunicorn.conf.py). With preload_app the master
+# imports this module once, so warm-up runs before the workers are forked.
+load_dotenv()
+configure_logging()
+app = create_app()
+
+if os.getenv('WARM_UP', 'true').lower() in ('1', 'true', 'yes'):
+    timings = warm_up()
+    logging.getLogger(__name__).info("Warm-up finished: %s",
+                                     ', '.join(f"{name} {ms:.0f}" for name, ms in timings.items()))